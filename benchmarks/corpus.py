@@ -0,0 +1,76 @@
+"""
+Synthetic documents for the md2pdf benchmark suite.
+
+Every generator is deterministic so results are comparable between runs.
+"""
+
+from pathlib import Path
+from typing import List
+
+TYPES = ['string', 'integer', 'boolean', 'float', 'list[string]', 'object']
+
+
+WARMUP_SIZED = """# Hello
+
+A short document, the size of a typical first request.
+
+```python
+print("hello")
+```
+"""
+
+
+def table_heavy(tables: int = 4, rows: int = 2000) -> str:
+    """API-reference style document made of a few very long tables."""
+    parts = ["# API Reference\n"]
+    for t in range(tables):
+        parts.append(f"\n## Resource {t + 1}\n\nParameters accepted by the resource.\n")
+        parts.append("| Name | Type | Default | Description |")
+        parts.append("|------|------|---------|-------------|")
+        for r in range(rows):
+            parts.append(
+                f"| `param_{t}_{r}` | {TYPES[r % len(TYPES)]} | `{r % 7}` | "
+                f"Controls behaviour number {r} of resource {t + 1}. |"
+            )
+    return '\n'.join(parts) + '\n'
+
+
+def prose(paragraphs: int = 50) -> str:
+    """Plain prose: headings and paragraphs only."""
+    parts = ["# Handbook\n"]
+    for p in range(paragraphs):
+        if p % 10 == 0:
+            parts.append(f"\n## Section {p // 10 + 1}\n")
+        parts.append(
+            f"Paragraph {p} explains one more aspect of the system in ordinary sentences. "
+            "It is long enough to wrap over several lines on an A4 page and includes "
+            "*emphasis*, **strong text** and `inline code` the way real manuals do.\n"
+        )
+    return '\n'.join(parts)
+
+
+def code_heavy(blocks: int = 40, lines: int = 20, language: str = 'python') -> str:
+    """Tutorial-style document dominated by fenced code blocks (unlabeled if ``language`` is empty)."""
+    parts = ["# Code Samples\n"]
+    for b in range(blocks):
+        parts.append(f"\n## Example {b + 1}\n\nThe following snippet shows step {b + 1}.\n")
+        body = '\n'.join(f"    total_{i} = compute(value_{i}, factor={i % 5})  # step {i}" for i in range(lines))
+        parts.append(f"```{language}\ndef example_{b}():\n{body}\n    return total_0\n```")
+    return '\n'.join(parts) + '\n'
+
+
+def write_corpus(directory: Path, name: str, content: str) -> Path:
+    """Write a generated document and return its path."""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.md"
+    path.write_text(content, encoding='utf-8')
+    return path
+
+
+def corpus_files(directory: Path) -> List[Path]:
+    """Write the standard mixed corpus used by cross-cutting benchmarks: tables, prose and code."""
+    return [
+        write_corpus(directory, 'tables', table_heavy(tables=2, rows=500)),
+        write_corpus(directory, 'prose', prose(paragraphs=200)),
+        write_corpus(directory, 'code', code_heavy(blocks=40)),
+    ]
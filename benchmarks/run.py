@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for md2pdf.
+
+Usage:
+    python benchmarks/run.py                      # run every benchmark
+    python benchmarks/run.py tables --repeat 5    # run selected benchmarks
+    python benchmarks/run.py --record results.jsonl
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import click
+
+# Make the in-tree package importable when run from a checkout
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import corpus  # noqa: E402
+from md2pdf.converter import MarkdownToPDFConverter  # noqa: E402
+from md2pdf.constants import (  # noqa: E402
+    CODE_LANG_GUESS_POLICIES, DEFAULT_CODE_LANG_GUESS, MARKDOWN_EXTENSION_CONFIGS, SOURCE_DATE_EPOCH_ENV,
+    TRANSFER_METHODS
+)
+from md2pdf.estimate import estimate_conversion, measure_conversion  # noqa: E402
+from md2pdf import archives, markdown_ext  # noqa: E402
+from md2pdf.markdown_ext import with_code_lang_guess  # noqa: E402
+from md2pdf.style_report import bench_styles as bench_style_costs  # noqa: E402
+from md2pdf.styles import list_builtin_styles  # noqa: E402
+from md2pdf.transfer import Fragment, export_fragment, join_fragments, map_fragments, release_fragments  # noqa: E402
+from md2pdf.utils import validate_input_files  # noqa: E402
+from md2pdf.yaml_styles import YAMLStyleLoader, yaml_style_loader  # noqa: E402
+
+BENCHMARKS: Dict[str, Callable[[Path, int], List[dict]]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark function under ``name``."""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def best_of(repeat: int, func: Callable[[], None]) -> float:
+    """Run ``func`` ``repeat`` times and return the fastest wall-clock time."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@benchmark('tables')
+def bench_tables(workdir: Path, repeat: int) -> List[dict]:
+    """Layout time of long tables with and without --split-tables."""
+    source = corpus.write_corpus(workdir, 'tables', corpus.table_heavy(tables=4, rows=2000))
+    converter = MarkdownToPDFConverter()
+    results = []
+
+    for split_at in (None, 200, 50):
+        output = workdir / f"tables-{split_at or 'nosplit'}.pdf"
+        seconds = best_of(repeat, lambda: converter.convert_files_to_pdf(
+            [source], output, style='default', split_tables_at=split_at
+        ))
+        results.append({
+            'benchmark': 'tables',
+            'variant': f"split={split_at}" if split_at else 'no-split',
+            'seconds': seconds,
+            'input_bytes': source.stat().st_size,
+            'pdf_bytes': output.stat().st_size,
+        })
+
+    return results
+
+
+@benchmark('cold-start')
+def bench_cold_start(workdir: Path, repeat: int) -> List[dict]:
+    """Time to first PDF for a fresh process, with and without md2pdf warmup."""
+    source = corpus.write_corpus(workdir, 'hello', corpus.WARMUP_SIZED)
+    project_root = str(Path(__file__).resolve().parent.parent)
+    results = []
+
+    def run(args: List[str], env: dict) -> None:
+        subprocess.run([sys.executable, '-m', 'md2pdf', *args], check=True, env=env,
+                       cwd=project_root, stdout=subprocess.DEVNULL)
+
+    for variant in ('cold', 'warm'):
+        cache_dir = workdir / f"cache-{variant}"
+        env = {**os.environ, 'MD2PDF_CACHE_DIR': str(cache_dir)}
+        if variant == 'cold':
+            # No bytecode and no md2pdf caches: what an unprepared container pays
+            env.update(PYTHONDONTWRITEBYTECODE='1', PYTHONPYCACHEPREFIX=str(workdir / 'empty-pycache'))
+        else:
+            run(['warmup', '--no-render'], env)
+
+        output = workdir / f"hello-{variant}.pdf"
+        seconds = best_of(repeat, lambda: run([str(source), '-o', str(output)], env))
+        results.append({'benchmark': 'cold-start', 'variant': variant, 'seconds': seconds})
+
+    return results
+
+
+@benchmark('threads')
+def bench_threads(workdir: Path, repeat: int) -> List[dict]:
+    """
+    Hundreds of concurrent conversions across threads, checked for races.
+
+    Threads share one converter, except every fourth conversion, which sets
+    up its own (and so its loggers). Each run starts with an empty YAML style
+    cache, and then checks three things:
+
+    - identical inputs gave byte-identical reproducible PDFs, across thread
+      counts too
+    - every md2pdf logger has exactly one md2pdf handler
+    - the style cache holds what a single-threaded loader compiles
+    """
+    sources = [
+        corpus.write_corpus(workdir, f"doc-{i}", corpus.WARMUP_SIZED.replace('Hello', f'Hello {i}'))
+        for i in range(50)
+    ]
+    styles = ('ibm', 'ocean')
+    converter = MarkdownToPDFConverter()
+    conversions = 200
+    digests: Dict[int, str] = {}
+    results = []
+
+    def convert(index: int) -> Path:
+        output = workdir / f"out-{index}.pdf"
+        own = MarkdownToPDFConverter() if index % 4 == 3 else converter
+        own.convert_files_to_pdf(
+            [sources[index % len(sources)]], output, style=styles[index % len(styles)], reproducible=True
+        )
+        return output
+
+    def check_outputs(outputs: List[Path]) -> None:
+        missing = [path for path in outputs if not path.exists()]
+        if missing:
+            raise RuntimeError(f"{len(missing)} conversion(s) produced no output")
+        for index, path in enumerate(outputs):
+            # Same source and style: the same PDF, whichever thread rendered it
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            if digests.setdefault(index % (len(sources) * len(styles)), digest) != digest:
+                raise RuntimeError(f"Reproducible output differs between identical conversions: {path}")
+
+    def check_loggers() -> None:
+        for name, logger in logging.Logger.manager.loggerDict.items():
+            if name.startswith('md2pdf') and isinstance(logger, logging.Logger):
+                handlers = [h for h in logger.handlers if getattr(h, 'md2pdf_handler', False)]
+                if len(handlers) > 1:
+                    raise RuntimeError(f"Logger {name} has {len(handlers)} md2pdf handlers")
+
+    def check_style_cache() -> None:
+        # The shared loader's cache against a fresh, single-threaded load
+        cached = dict(yaml_style_loader._style_cache)
+        if set(cached) != set(styles):
+            raise RuntimeError(f"Style cache holds {sorted(cached)}, expected {sorted(styles)}")
+        fresh = YAMLStyleLoader(yaml_style_loader.styles_dir)
+        for style in styles:
+            if cached[style] != fresh.load_yaml_style(style):
+                raise RuntimeError(f"Style cache entry for {style} differs from a fresh load")
+
+    previous_epoch = os.environ.get(SOURCE_DATE_EPOCH_ENV)
+    os.environ[SOURCE_DATE_EPOCH_ENV] = '0'
+    try:
+        for threads in (1, 8):
+            def run_all():
+                with yaml_style_loader._cache_lock:
+                    yaml_style_loader._style_cache.clear()
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    outputs = list(executor.map(convert, range(conversions)))
+                check_outputs(outputs)
+                check_loggers()
+                check_style_cache()
+
+            seconds = best_of(repeat, run_all)
+            results.append({
+                'benchmark': 'threads',
+                'variant': f"threads={threads}",
+                'seconds': seconds,
+                'conversions_per_second': round(conversions / seconds, 1),
+            })
+    finally:
+        if previous_epoch is None:
+            del os.environ[SOURCE_DATE_EPOCH_ENV]
+        else:
+            os.environ[SOURCE_DATE_EPOCH_ENV] = previous_epoch
+
+    return results
+
+
+@benchmark('sanitize')
+def bench_sanitize(workdir: Path, repeat: int) -> List[dict]:
+    """Post-processing time of a multi-megabyte body with sanitization and with --trusted-input."""
+    source = corpus.write_corpus(
+        workdir, 'sanitize', corpus.prose(paragraphs=4000) + corpus.table_heavy(tables=4, rows=4000)
+    )
+    converter = MarkdownToPDFConverter()
+    html_content = converter._process_markdown_files([source], True)
+    results = []
+
+    for trusted in (False, True):
+        # A fixed title keeps heading extraction out of the measurement
+        seconds = best_of(repeat, lambda: converter._prepare_body(
+            html_content, 'Benchmark', False, source.stem, None, trusted_input=trusted
+        ))
+        results.append({
+            'benchmark': 'sanitize',
+            'variant': 'trusted-input' if trusted else 'sanitized',
+            'seconds': seconds,
+            'html_bytes': len(html_content.encode('utf-8')),
+            'mb_per_second': None if trusted else round(len(html_content) / seconds / 1e6, 1),
+        })
+
+    return results
+
+
+@benchmark('prune-css')
+def bench_prune_css(workdir: Path, repeat: int) -> List[dict]:
+    """Conversion time of a prose document with the full and the pruned stylesheet."""
+    source = corpus.write_corpus(workdir, 'prune', corpus.prose(paragraphs=400))
+    converter = MarkdownToPDFConverter()
+    results = []
+
+    for style in ('github', 'ibm'):
+        for prune in (False, True):
+            output = workdir / f"prune-{style}-{prune}.pdf"
+            seconds = best_of(repeat, lambda: converter.convert_files_to_pdf(
+                [source], output, style=style, prune_css=prune
+            ))
+            results.append({
+                'benchmark': 'prune-css',
+                'variant': f"{style}{' pruned' if prune else ''}",
+                'seconds': seconds,
+                'pdf_bytes': output.stat().st_size,
+            })
+
+    return results
+
+
+@benchmark('styles')
+def bench_styles(workdir: Path, repeat: int) -> List[dict]:
+    """Time, peak memory and PDF size of the mixed corpus under every style."""
+    sources = corpus.corpus_files(workdir)
+    return [
+        {'benchmark': 'styles', 'variant': result.pop('style'), **result}
+        for result in bench_style_costs(sorted(list_builtin_styles()), sources, repeat=repeat)
+    ]
+
+
+@benchmark('code-lang')
+def bench_code_lang(workdir: Path, repeat: int) -> List[dict]:
+    """Markdown conversion time of unlabeled code blocks under each --code-lang-guess policy."""
+    labeled = corpus.write_corpus(workdir, 'code-labeled', corpus.code_heavy(blocks=200))
+    unlabeled = corpus.write_corpus(workdir, 'code-unlabeled', corpus.code_heavy(blocks=200, language=''))
+    results = []
+
+    runs = [('labeled', labeled, DEFAULT_CODE_LANG_GUESS)]
+    runs.extend((policy, unlabeled, policy) for policy in CODE_LANG_GUESS_POLICIES)
+    runs.append(('memoized-cold', unlabeled, 'memoized'))
+    for variant, source, policy in runs:
+        converter = MarkdownToPDFConverter(
+            markdown_extension_configs=with_code_lang_guess(MARKDOWN_EXTENSION_CONFIGS, policy)
+        )
+
+        def convert():
+            if variant == 'memoized-cold':
+                # A first run: nothing remembered in memory or in a cache directory
+                markdown_ext._memo.clear()
+                markdown_ext._memo_loaded = True
+            converter._process_markdown_files([source], True)
+
+        seconds = best_of(repeat, convert)
+        results.append({
+            'benchmark': 'code-lang',
+            'variant': variant,
+            'seconds': seconds,
+            'input_bytes': source.stat().st_size,
+        })
+
+    return results
+
+
+def _make_fragment(args) -> Fragment:
+    """Produce one large HTML fragment in a worker process."""
+    size, method = args
+    paragraph = '<p>' + 'x' * 96 + '</p>\n'
+    return export_fragment(paragraph * (size // len(paragraph)), method)
+
+
+def _join_fragments(handles: List[Fragment]) -> int:
+    """Assemble fragments into one document in another worker, as project builds do."""
+    return len(join_fragments(handles))
+
+
+@benchmark('transfer')
+def bench_transfer(workdir: Path, repeat: int) -> List[dict]:
+    """Hand-off of large fragments from producing to rendering workers under each transfer method."""
+    fragments, size = 8, 8 * 1024 * 1024
+    results = []
+
+    for method in TRANSFER_METHODS:
+        timings, peaks = [], []
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            for _ in range(repeat):
+                # Parent memory only: fragments pass through it unless they stay in shared buffers
+                tracemalloc.start()
+                start = time.perf_counter()
+                handles = map_fragments(executor, _make_fragment, [(size, method)] * fragments)
+                try:
+                    executor.submit(_join_fragments, handles).result()
+                finally:
+                    release_fragments(handles)
+                timings.append(time.perf_counter() - start)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                del handles
+        results.append({
+            'benchmark': 'transfer',
+            'variant': method,
+            'seconds': min(timings),
+            'parent_peak_mb': round(min(peaks) / (1024 * 1024), 1),
+            'html_bytes': fragments * size,
+        })
+
+    return results
+
+
+@benchmark('archives')
+def bench_archives(workdir: Path, repeat: int) -> List[dict]:
+    """Listing and converting thousands of small files, extracted first or read from the archive."""
+    files, converter = 5000, MarkdownToPDFConverter()
+    chapter = corpus.prose(paragraphs=3)
+    with zipfile.ZipFile(workdir / 'docs.zip', 'w', zipfile.ZIP_DEFLATED) as archive:
+        for i in range(files):
+            archive.writestr(f"docs/chapters/{i:05d}.md", f"# Chapter {i}\n\n{chapter}")
+    with tarfile.open(workdir / 'docs.tar.gz', 'w:gz') as archive, zipfile.ZipFile(workdir / 'docs.zip') as source:
+        for info in source.infolist():
+            member = tarfile.TarInfo(info.filename)
+            member.size = info.file_size
+            archive.addfile(member, source.open(info))
+
+    def extract() -> List[Path]:
+        target = workdir / 'extracted'
+        shutil.rmtree(target, ignore_errors=True)
+        with zipfile.ZipFile(workdir / 'docs.zip') as archive:
+            archive.extractall(target)
+        return validate_input_files([str(target / 'docs' / 'chapters' / '*.md')])
+
+    variants = {
+        'extract-zip': extract,
+        'zip': lambda: validate_input_files([f"{workdir / 'docs.zip'}!docs/chapters/*.md"]),
+        'tar.gz': lambda: validate_input_files([f"{workdir / 'docs.tar.gz'}!docs/chapters/*.md"]),
+    }
+    results = []
+
+    def convert(list_inputs: Callable[[], List[Path]]) -> None:
+        # Archives are indexed afresh on every run
+        archives._load_archive.cache_clear()
+        converter._process_markdown_files(list_inputs(), True)
+
+    for variant, list_inputs in variants.items():
+        seconds = best_of(repeat, lambda: convert(list_inputs))
+        results.append({
+            'benchmark': 'archives',
+            'variant': variant,
+            'seconds': seconds,
+            'files': files,
+            'files_per_second': round(files / seconds),
+        })
+
+    return results
+
+
+@benchmark('estimate')
+def bench_estimate(workdir: Path, repeat: int) -> List[dict]:
+    """Measured runs for `md2pdf calibrate`, next to the current model's predictions."""
+    documents = {
+        'prose-50': corpus.prose(50),
+        'prose-400': corpus.prose(400),
+        'tables-1x300': corpus.table_heavy(tables=1, rows=300),
+        'tables-2x1500': corpus.table_heavy(tables=2, rows=1500),
+        'code-20': corpus.code_heavy(blocks=20),
+        'code-120': corpus.code_heavy(blocks=120),
+        'mixed': corpus.prose(150) + corpus.code_heavy(blocks=30) + corpus.table_heavy(tables=1, rows=500),
+    }
+    results = []
+
+    for name, content in documents.items():
+        source = corpus.write_corpus(workdir, name, content)
+        for page_size in ('A4', 'Letter'):
+            predicted = estimate_conversion([source], style='default', page_size=page_size)
+            # Each measurement runs in a fresh process so peak memory is its own
+            records = [
+                measure_conversion([source], workdir / f"{name}.pdf", style='default', page_size=page_size)
+                for _ in range(repeat)
+            ]
+            record = min(records, key=lambda r: r['seconds'])
+            results.append({
+                'benchmark': 'estimate',
+                'variant': f"{name}/{page_size}",
+                **record,
+                'predicted': {key: predicted[key] for key in ('pages', 'seconds', 'peak_memory_mb')},
+            })
+
+    return results
+
+
+@click.command()
+@click.argument('names', nargs=-1)
+@click.option('--repeat', '-r', default=3, type=click.IntRange(min=1), help='Runs per measurement (best is kept)')
+@click.option('--record', type=click.Path(dir_okay=False), help='Append results as JSON lines to this file')
+def main(names: tuple, repeat: int, record: str):
+    """Run md2pdf benchmarks and print a results table."""
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise click.BadParameter(f"Unknown benchmark(s): {', '.join(sorted(unknown))}. "
+                                 f"Available: {', '.join(BENCHMARKS)}")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='md2pdf-bench-') as tmp:
+        for name in names or BENCHMARKS:
+            workdir = Path(tmp) / name
+            workdir.mkdir()
+            results.extend(BENCHMARKS[name](workdir, repeat))
+
+    for result in results:
+        extras = ', '.join(f"{k}={v}" for k, v in result.items() if k not in ('benchmark', 'variant', 'seconds'))
+        click.echo(f"{result['benchmark']:<12} {result['variant']:<24} {result['seconds']:>9.3f}s  {extras}")
+
+    if record:
+        with open(record, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps({'recorded_at': time.time(), **result}) + '\n')
+
+
+if __name__ == '__main__':
+    main()
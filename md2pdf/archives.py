@@ -0,0 +1,342 @@
+"""
+Markdown inputs read from archives and gzip files without extracting them.
+
+An input written ``docs.zip!chapters/*.md`` names the members of an archive
+(zip, or tar, plain or compressed with gzip, bzip2 or xz) that match the glob
+after the ``!``; an archive given alone stands for all of its Markdown
+members. A ``notes.md.gz`` input is a gzip-compressed Markdown file. Either
+way the input is an :class:`ArchiveMember`, which offers the parts of the
+:class:`~pathlib.Path` interface the converter uses, and its bytes are read
+from the archive in memory.
+
+The assets of a document inside an archive are resolved against a
+``file:///path/docs.zip!/chapters/`` base URL, which the converter's URL
+fetcher serves from the same archive through :func:`read_archive_url`.
+"""
+
+import fnmatch
+import functools
+import glob
+import gzip
+import mimetypes
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, FrozenSet, List, Optional, Tuple, Union
+from urllib.parse import quote, unquote, urlsplit
+from urllib.request import url2pathname
+
+from .constants import (
+    ARCHIVE_CACHE_ENTRIES, ARCHIVE_MEMORY_BYTES, ARCHIVE_SEPARATOR, COMPRESSED_SUFFIX, MARKDOWN_EXTENSIONS,
+    TAR_SUFFIXES, ZIP_SUFFIXES
+)
+from .exceptions import FileValidationError
+from .metrics import register_cache
+
+ARCHIVE_SUFFIXES = ZIP_SUFFIXES + TAR_SUFFIXES
+
+
+class ArchiveMember:
+    """
+    A file inside an archive, or a gzip-compressed file (``member`` is None).
+
+    Its string form is the input as written, ``docs.zip!chapters/intro.md``
+    or ``notes.md.gz``; :func:`input_path` turns it back into a member.
+    """
+
+    __slots__ = ('archive', 'member')
+
+    def __init__(self, archive: Path, member: Optional[str] = None):
+        self.archive = archive
+        self.member = member
+
+    @property
+    def name(self) -> str:
+        if self.member is None:
+            return self.archive.name[:-len(COMPRESSED_SUFFIX)]
+        return PurePosixPath(self.member).name
+
+    @property
+    def stem(self) -> str:
+        return PurePosixPath(self.name).stem
+
+    @property
+    def suffix(self) -> str:
+        return PurePosixPath(self.name).suffix
+
+    def is_file(self) -> bool:
+        return True
+
+    def resolve(self) -> 'ArchiveMember':
+        return ArchiveMember(self.archive.resolve(), self.member)
+
+    def read_bytes(self) -> bytes:
+        """Uncompressed contents."""
+        if self.member is None:
+            try:
+                with gzip.open(self.archive, 'rb') as f:
+                    return f.read()
+            except (OSError, EOFError) as e:
+                raise FileValidationError(f"Cannot read compressed file {self.archive}: {e}")
+        return _open_archive(self.archive).read(self.member)
+
+    def stat(self) -> os.stat_result:
+        """The archive's status, with the uncompressed size of this file as ``st_size``."""
+        st = self.archive.stat()
+        if self.member is None:
+            # The gzip trailer holds the uncompressed size (modulo 4 GiB)
+            with open(self.archive, 'rb') as f:
+                f.seek(-4, os.SEEK_END)
+                size = int.from_bytes(f.read(4), 'little')
+        else:
+            size = _open_archive(self.archive).sizes[self.member]
+        return os.stat_result(st[:6] + (size,) + st[7:10])
+
+    def __str__(self) -> str:
+        if self.member is None:
+            return str(self.archive)
+        return f"{self.archive}{ARCHIVE_SEPARATOR}{self.member}"
+
+    def __repr__(self) -> str:
+        return f"ArchiveMember({str(self)!r})"
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, ArchiveMember) and self.archive == other.archive and self.member == other.member
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.archive, self.member))
+
+
+InputPath = Union[Path, ArchiveMember]
+
+
+class _Archive:
+    """Member index of one archive, and the members' bytes."""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._tar: Optional[tarfile.TarFile] = None
+        self._names: Dict[str, str] = {}
+        self._data: Dict[str, bytes] = {}
+        self.sizes: Dict[str, int] = {}
+
+        lowered = path.name.lower()
+        if lowered.endswith(ZIP_SUFFIXES):
+            self._zip = zipfile.ZipFile(path)
+            for info in self._zip.infolist():
+                if not info.is_dir():
+                    self._add(info.filename, info.file_size)
+        elif lowered.endswith('.tar'):
+            self._tar = tarfile.open(path)
+            for info in self._tar.getmembers():
+                if info.isfile():
+                    self._add(info.name, info.size, info)
+        else:
+            # Compressed tar streams cannot seek back cheaply: decompress once,
+            # keeping members in memory up to ARCHIVE_MEMORY_BYTES; the others
+            # are read by decompressing the stream again
+            budget = ARCHIVE_MEMORY_BYTES
+            with tarfile.open(path, 'r|*') as tar:
+                for info in tar:
+                    if info.isfile():
+                        self._add(info.name, info.size)
+                        if info.size <= budget:
+                            self._data[_normalize(info.name)] = tar.extractfile(info).read()
+                            budget -= info.size
+
+    def _add(self, name: str, size: int, info: Optional[tarfile.TarInfo] = None) -> None:
+        normalized = _normalize(name)
+        self._names[normalized] = info or name
+        self.sizes[normalized] = size
+
+    @property
+    def names(self) -> List[str]:
+        """Names of the files in the archive, sorted."""
+        return sorted(self.sizes)
+
+    def read(self, name: str) -> bytes:
+        if name not in self.sizes:
+            raise FileNotFoundError(f"No such file in archive: {name}")
+        if name in self._data:
+            return self._data[name]
+        if self._zip is None and self._tar is None:
+            return self._read_stream(name)
+        with self._lock:
+            if self._zip is not None:
+                return self._zip.read(self._names[name])
+            return self._tar.extractfile(self._names[name]).read()
+
+    def _read_stream(self, name: str) -> bytes:
+        """Read a member of a compressed tar archive that was not kept in memory."""
+        data = None
+        with tarfile.open(self._path, 'r|*') as tar:
+            for info in tar:
+                # The last of several members with the same name wins, as in the index
+                if info.isfile() and _normalize(info.name) == name:
+                    data = tar.extractfile(info).read()
+        return data
+
+
+@functools.lru_cache(maxsize=ARCHIVE_CACHE_ENTRIES)
+def _load_archive(path: Path, mtime_ns: int, pid: int) -> _Archive:
+    """Index an archive; keyed by modification time, and by process so forked workers open their own handle."""
+    try:
+        return _Archive(path)
+    except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+        raise FileValidationError(f"Cannot read archive {path}: {e}")
+
+
+register_cache('archive', lambda: tuple(_load_archive.cache_info()[:2]))
+
+
+def _open_archive(path: Path) -> _Archive:
+    return _load_archive(path, path.stat().st_mtime_ns, os.getpid())
+
+
+def is_archive(path: str) -> bool:
+    """Whether a path names a zip or tar archive."""
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_compressed(path: str) -> bool:
+    """Whether a path names a gzip-compressed file that is not a tar archive."""
+    return path.lower().endswith(COMPRESSED_SUFFIX) and not is_archive(path)
+
+
+def split_archive_pattern(pattern: str) -> Optional[Tuple[str, str]]:
+    """
+    Split ``archive!member-glob`` into the archive and the member glob.
+
+    Returns:
+        (archive, member glob), or None if the pattern names no archive member
+    """
+    start = 0
+    while (index := pattern.find(ARCHIVE_SEPARATOR, start)) >= 0:
+        if is_archive(pattern[:index]):
+            return pattern[:index], pattern[index + 1:]
+        start = index + 1
+    return None
+
+
+def expand_archive_pattern(pattern: str, extensions: FrozenSet[str] = MARKDOWN_EXTENSIONS) -> List[ArchiveMember]:
+    """
+    List the archive members an input pattern names, without extracting them.
+
+    Args:
+        pattern: ``archive!member``, ``archive!member-glob`` (``**`` spans
+            directories) or an archive alone, which stands for its members with
+            one of ``extensions``; the archive part may be a glob too
+        extensions: Member extensions selected by an archive alone
+
+    Returns:
+        Members sorted by archive, then by name
+
+    Raises:
+        FileNotFoundError: If no archive or member matches
+        FileValidationError: If an archive cannot be read
+    """
+    archive_pattern, member_pattern = split_archive_pattern(pattern) or (pattern, '')
+    member_pattern = _normalize(member_pattern)
+    magic = glob.has_magic(member_pattern) or not member_pattern
+
+    if glob.has_magic(archive_pattern):
+        archives = sorted(glob.glob(archive_pattern))
+        if not archives:
+            raise FileNotFoundError(f"No files found matching pattern: {archive_pattern}")
+    elif os.path.isfile(archive_pattern):
+        archives = [archive_pattern]
+    else:
+        raise FileNotFoundError(f"File not found: {archive_pattern}")
+
+    members = []
+    for archive in archives:
+        index = _open_archive(Path(archive))
+        if not member_pattern:
+            names = [name for name in index.names if PurePosixPath(name).suffix.lower() in extensions]
+        elif magic:
+            names = [name for name in index.names if _match(name.split('/'), member_pattern.split('/'))]
+        else:
+            names = [member_pattern] if member_pattern in index.sizes else []
+        members.extend(ArchiveMember(Path(archive), name) for name in names)
+
+    if not members:
+        if magic:
+            raise FileNotFoundError(f"No files found matching pattern: {pattern}")
+        raise FileNotFoundError(f"File not found: {pattern}")
+    return members
+
+
+def input_path(name: str) -> InputPath:
+    """Rebuild an input from its string form (the inverse of ``str()``)."""
+    split = split_archive_pattern(name)
+    if split is not None:
+        return ArchiveMember(Path(split[0]), split[1])
+    if is_compressed(name):
+        return ArchiveMember(Path(name))
+    return Path(name)
+
+
+def base_url_for(path: InputPath) -> str:
+    """
+    Base URL for the relative assets of an input.
+
+    The input's directory; for an archive member, a ``file:`` URL of its
+    directory inside the archive, which :func:`read_archive_url` serves.
+    """
+    if not isinstance(path, ArchiveMember):
+        return str(path.parent)
+    if path.member is None:
+        return str(path.archive.parent)
+    directory = posixpath.dirname(path.member)
+    return f"{path.archive.resolve().as_uri()}{ARCHIVE_SEPARATOR}/{quote(directory + '/' if directory else '')}"
+
+
+def read_archive_url(url: str) -> Optional[Tuple[bytes, str]]:
+    """
+    Read a ``file:///path/docs.zip!/member`` URL from its archive.
+
+    Returns:
+        (contents, MIME type), or None if the URL is not inside an archive
+    """
+    location = _archive_location(url)
+    if location is None:
+        return None
+    archive, member = location
+    return _open_archive(archive).read(member), mimetypes.guess_type(member)[0] or 'application/octet-stream'
+
+
+def _archive_location(url: str) -> Optional[Tuple[Path, str]]:
+    """Archive and member of a ``file:///path/docs.zip!/member`` URL."""
+    if not url.lower().startswith('file:'):
+        return None
+    path = urlsplit(url).path
+    start = 0
+    while (index := path.find(ARCHIVE_SEPARATOR + '/', start)) >= 0:
+        archive = url2pathname(path[:index])
+        if is_archive(archive):
+            return Path(archive), posixpath.normpath(unquote(path[index + 2:]))
+        start = index + 1
+    return None
+
+
+def _normalize(name: str) -> str:
+    """Member name without a leading ``./`` or ``/``."""
+    while name.startswith(('./', '/')):
+        name = name[2:] if name.startswith('./') else name[1:]
+    return name
+
+
+def _match(parts: List[str], pattern: List[str]) -> bool:
+    """Glob match of member name segments; a ``**`` segment spans any number of directories."""
+    if not pattern:
+        return not parts
+    if pattern[0] == '**':
+        return any(_match(parts[i:], pattern[1:]) for i in range(len(parts) + 1))
+    return bool(parts) and fnmatch.fnmatchcase(parts[0], pattern[0]) and _match(parts[1:], pattern[1:])
@@ -0,0 +1,479 @@
+"""
+Project builds: render many PDFs that share chapters from a single build file.
+
+A build file (TOML) declares outputs with their inputs and options::
+
+    [defaults]
+    style = "ibm"
+    toc = true
+
+    [outputs.admin-guide]
+    output = "dist/admin-guide.pdf"
+    inputs = ["chapters/intro.md", "chapters/admin/*.md"]
+    page_size = "Letter"
+
+Every unique (file, Markdown configuration) pair is converted exactly once and
+the fragment is reused by all outputs that include it. Outputs whose inputs,
+style and options are unchanged since the last build are skipped.
+
+Every finished output is appended to a journal (``.md2pdf-journal.jsonl``) as
+soon as it completes, so a build that dies part-way resumes where it stopped.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+import markdown
+
+from . import __version__
+from .archives import input_path
+from .constants import (
+    BUILD_JOURNAL_FILE, BUILD_JOURNAL_COMPACT_FACTOR, BUILD_JOURNAL_COMPACT_SLACK,
+    BUILD_TARGET_OPTIONS, CODE_LANG_GUESS_POLICIES, MARKDOWN_EXTENSIONS_LIST,
+    MARKDOWN_EXTENSION_CONFIGS, DEFAULT_MARGIN, DEFAULT_PAGE_SIZE, DEFAULT_STYLE, DEFAULT_SCHEDULE
+)
+from .draft import draft_extension_configs
+from .exceptions import BuildError, Md2PdfError
+from .logger import LoggerMixin
+from .markdown_ext import with_code_lang_guess
+from .scheduling import DocumentStats, estimate_seconds, order_jobs
+from .transfer import Fragment, export_fragment, join_fragments, map_fragments, release_fragments
+from .utils import read_file_content, validate_input_files, validate_output_path, parse_margin
+from .validators import validate_page_size
+
+
+class BuildTarget:
+    """A single output declared in a build file."""
+
+    def __init__(
+        self,
+        name: str,
+        output_path: Path,
+        input_files: List[Path],
+        options: Dict[str, Any],
+        markdown_config: Dict[str, Any]
+    ):
+        self.name = name
+        self.output_path = output_path
+        self.input_files = input_files
+        self.options = options
+        self.markdown_config = markdown_config
+
+
+def load_build_file(build_file: Path) -> List[BuildTarget]:
+    """
+    Load and validate a build file.
+
+    Args:
+        build_file: Path to the TOML build file
+
+    Returns:
+        Build targets in declaration order
+
+    Raises:
+        BuildError: If the build file is missing or invalid
+    """
+    try:
+        with open(build_file, 'rb') as f:
+            data = tomllib.load(f)
+    except OSError as e:
+        raise BuildError(f"Cannot read build file {build_file}: {e}")
+    except tomllib.TOMLDecodeError as e:
+        raise BuildError(f"Invalid build file {build_file}: {e}")
+
+    base_dir = build_file.parent
+    defaults = data.get('defaults', {})
+    base_markdown = data.get('markdown', {})
+    outputs = data.get('outputs', {})
+
+    if not isinstance(outputs, dict) or not outputs:
+        raise BuildError(f"Build file {build_file} declares no [outputs]")
+
+    targets = []
+    for name, spec in outputs.items():
+        if not isinstance(spec, dict):
+            raise BuildError(f"Output '{name}' must be a table")
+
+        options = {**defaults, **spec}
+        unknown = set(options) - BUILD_TARGET_OPTIONS
+        if unknown:
+            raise BuildError(f"Output '{name}' has unknown option(s): {', '.join(sorted(unknown))}")
+        if 'output' not in options or not options.get('inputs'):
+            raise BuildError(f"Output '{name}' requires 'output' and 'inputs'")
+
+        try:
+            input_files = validate_input_files([str(base_dir / pattern) for pattern in options['inputs']])
+            output_path = validate_output_path(str(base_dir / options['output']))
+            target_options = {
+                'style': options.get('style', DEFAULT_STYLE),
+                'title': options.get('title'),
+                'margin': parse_margin(options.get('margin', DEFAULT_MARGIN)),
+                'page_size': validate_page_size(options.get('page_size', DEFAULT_PAGE_SIZE)),
+                'toc': bool(options.get('toc', False)),
+                'merge': bool(options.get('merge', True)),
+                'reproducible': bool(options.get('reproducible', False)),
+                'trusted_input': bool(options.get('trusted_input', False)),
+                'prune_css': bool(options.get('prune_css', False)),
+                'draft': bool(options.get('draft', False)),
+            }
+        except (Md2PdfError, FileNotFoundError, ValueError) as e:
+            raise BuildError(f"Output '{name}': {e}")
+
+        style = target_options['style']
+        if style.endswith('.css') and not Path(style).is_absolute():
+            target_options['style'] = str(base_dir / style)
+
+        markdown_config = {
+            'extensions': MARKDOWN_EXTENSIONS_LIST,
+            'extension_configs': MARKDOWN_EXTENSION_CONFIGS,
+            **base_markdown,
+            **options.get('markdown', {})
+        }
+        code_lang_guess = options.get('code_lang_guess')
+        if code_lang_guess is not None:
+            if code_lang_guess not in CODE_LANG_GUESS_POLICIES:
+                raise BuildError(
+                    f"Output '{name}': unknown code_lang_guess '{code_lang_guess}'. "
+                    f"Valid policies: {', '.join(CODE_LANG_GUESS_POLICIES)}"
+                )
+            markdown_config['extension_configs'] = with_code_lang_guess(
+                markdown_config['extension_configs'], code_lang_guess
+            )
+        if target_options['draft']:
+            # Drafts skip Pygments highlighting
+            markdown_config['extension_configs'] = draft_extension_configs(
+                markdown_config['extensions'], markdown_config['extension_configs']
+            )
+
+        targets.append(BuildTarget(name, output_path, input_files, target_options, markdown_config))
+
+    return targets
+
+
+class BuildJournal:
+    """
+    Append-only record of finished outputs.
+
+    Each line is a JSON object with the output name, its fingerprint and
+    whether it was built or failed; the last line for a name wins. Lines are
+    flushed to disk as outputs finish, and a torn last line left by a crash is
+    ignored on replay.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._torn = False
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Replay the journal into the latest record per output."""
+        records: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._torn = not line.endswith('\n')
+                    try:
+                        record = json.loads(line)
+                        records[record['name']] = record
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            pass
+        return records
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Durably append one record."""
+        line = json.dumps(record, sort_keys=True) + '\n'
+        if self._torn:
+            # Terminate a partial line left by a crash so it stays a single bad line
+            line = '\n' + line
+            self._torn = False
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, records: Dict[str, Dict[str, Any]]) -> None:
+        """Rewrite the journal with one line per output when it has grown long."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = sum(1 for _ in f)
+        except OSError:
+            lines = 0
+        if lines <= BUILD_JOURNAL_COMPACT_FACTOR * len(records) + BUILD_JOURNAL_COMPACT_SLACK:
+            return
+
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in records.values():
+                f.write(json.dumps(record, sort_keys=True) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._torn = False
+
+
+class ProjectBuilder(LoggerMixin):
+    """Builds all outputs of a build file, sharing converted chapters."""
+
+    def __init__(self, build_file: Path, verbose: bool = False):
+        """
+        Initialize the builder.
+
+        Args:
+            build_file: Path to the TOML build file
+            verbose: Enable verbose output
+        """
+        super().__init__(verbose=verbose)
+        self.build_file = build_file
+        self.journal = BuildJournal(build_file.parent / BUILD_JOURNAL_FILE)
+
+    def build(
+        self,
+        target_names: Optional[List[str]] = None,
+        force: bool = False,
+        jobs: Optional[int] = None,
+        schedule: str = DEFAULT_SCHEDULE,
+        retry_failed: bool = False
+    ) -> Dict[str, str]:
+        """
+        Build the declared outputs.
+
+        Args:
+            target_names: Only build these outputs (defaults to all)
+            force: Rebuild outputs even when they are up to date
+            jobs: Number of worker processes (defaults to the CPU count)
+            schedule: Job order: "largest-first", "shortest-first" or "fifo"
+            retry_failed: Only rebuild outputs whose last attempt failed or
+                that were never built; outputs that built are skipped even
+                when out of date (a plain build rebuilds those)
+
+        Returns:
+            Mapping of output name to status ("built", "up-to-date" or "skipped")
+
+        Raises:
+            BuildError: If the build file is invalid or any output fails
+        """
+        targets = load_build_file(self.build_file)
+        if target_names:
+            missing = set(target_names) - {target.name for target in targets}
+            if missing:
+                raise BuildError(f"Unknown output(s): {', '.join(sorted(missing))}")
+            targets = [target for target in targets if target.name in target_names]
+
+        jobs = jobs or os.cpu_count() or 1
+        journal = self.journal.load()
+        content_hashes: Dict[Path, str] = {}
+        stats: Dict[Path, DocumentStats] = {}
+
+        # Dependency graph: each output depends on fragments keyed by
+        # (file, content hash, Markdown configuration)
+        fragment_keys: Dict[str, List[Tuple[str, str, str]]] = {}
+        fingerprints: Dict[str, str] = {}
+        for target in targets:
+            config_hash = _hash_json(target.markdown_config)
+            keys = []
+            for path in target.input_files:
+                if path not in content_hashes:
+                    data = path.read_bytes()
+                    content_hashes[path] = hashlib.sha256(data).hexdigest()
+                    stats[path] = DocumentStats.from_markdown(data.decode('utf-8', errors='replace'))
+                keys.append((str(path), content_hashes[path], config_hash))
+            fragment_keys[target.name] = keys
+            fingerprints[target.name] = _hash_json({
+                'version': __version__,
+                'options': target.options,
+                'fragments': keys,
+                'style': _style_fingerprint(target.options['style']),
+            })
+
+        results = {}
+        stale = []
+        for target in targets:
+            record = journal.get(target.name, {})
+            if retry_failed and record.get('status') == 'built':
+                if record.get('fingerprint') != fingerprints[target.name] or not target.output_path.exists():
+                    self.logger.warning(f"Skipped although out of date (built last time): {target.name}")
+                else:
+                    self.logger.debug(f"Skipped (built last time): {target.name}")
+                results[target.name] = 'skipped'
+            elif (not force and record.get('status') == 'built'
+                  and record.get('fingerprint') == fingerprints[target.name]
+                  and target.output_path.exists()):
+                self.logger.info(f"Up to date: {target.name}")
+                results[target.name] = 'up-to-date'
+            else:
+                stale.append(target)
+
+        if not stale:
+            return results
+
+        fragments = self._convert_fragments(stale, fragment_keys, jobs, stats, schedule)
+        try:
+            # Largest outputs first keeps every worker busy until the end
+            costs = [sum(stats[path].cost for path in target.input_files) for target in stale]
+            estimates = {target.name: cost for target, cost in zip(stale, costs)}
+            stale = order_jobs(stale, costs, schedule)
+
+            render_args = [
+                (
+                    target.name,
+                    [fragments[key] for key in fragment_keys[target.name]],
+                    target.output_path,
+                    target.options,
+                    target.input_files[0].stem,
+                    self.verbose
+                )
+                for target in stale
+            ]
+
+            failures = []
+
+            def record(outcome: Tuple[str, Optional[str], float]) -> None:
+                # Journal each output the moment it finishes so a crash loses no work
+                name, error, seconds = outcome
+                if error:
+                    self.logger.error(f"Failed: {name}: {error}")
+                    failures.append(name)
+                else:
+                    self.logger.info(f"Built: {name} in {seconds:.2f}s ({_describe_estimate(estimates[name])})")
+                    results[name] = 'built'
+                entry = {
+                    'name': name,
+                    'fingerprint': fingerprints[name],
+                    'status': 'failed' if error else 'built',
+                    'seconds': round(seconds, 3),
+                    'finished_at': round(time.time(), 3),
+                }
+                if error:
+                    entry['error'] = error
+                journal[name] = entry
+                self.journal.append(entry)
+
+            if jobs == 1 or len(render_args) == 1:
+                for args in render_args:
+                    record(_render_target(args))
+            else:
+                with ProcessPoolExecutor(max_workers=min(jobs, len(render_args))) as executor:
+                    futures = [executor.submit(_render_target, args) for args in render_args]
+                    for future in as_completed(futures):
+                        record(future.result())
+
+            self.journal.compact(journal)
+
+            if failures:
+                raise BuildError(f"{len(failures)} output(s) failed: {', '.join(failures)}")
+        finally:
+            # Fragments left in shared memory by the workers
+            release_fragments(fragments.values())
+
+        return results
+
+    def _convert_fragments(
+        self,
+        targets: List[BuildTarget],
+        fragment_keys: Dict[str, List[Tuple[str, str, str]]],
+        jobs: int,
+        stats: Dict[Path, DocumentStats],
+        schedule: str
+    ) -> Dict[Tuple[str, str, str], Fragment]:
+        """
+        Convert every unique fragment needed by the given targets once.
+
+        Fragments converted in worker processes stay in shared memory and are
+        read by the render workers directly; the caller releases them.
+        """
+        work = {}
+        for target in targets:
+            for key in fragment_keys[target.name]:
+                work.setdefault(key, (key[0], target.markdown_config))
+
+        self.logger.debug(f"Converting {len(work)} unique fragment(s) for {len(targets)} output(s)")
+
+        keys = order_jobs(list(work), [stats[input_path(key[0])].cost for key in work], schedule)
+        args = [work[key] for key in keys]
+        if jobs == 1 or len(args) == 1:
+            htmls = [Fragment.inline(_convert_fragment(arg)) for arg in args]
+        else:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(args))) as executor:
+                htmls = map_fragments(executor, _export_fragment, args)
+
+        return dict(zip(keys, htmls))
+
+
+def _convert_fragment(args: Tuple[str, Dict[str, Any]]) -> str:
+    """Convert one Markdown file to an HTML fragment; runs inside a worker process."""
+    path, markdown_config = args
+    md = markdown.Markdown(
+        extensions=markdown_config['extensions'],
+        extension_configs=markdown_config['extension_configs']
+    )
+    return md.convert(read_file_content(input_path(path)))
+
+
+def _export_fragment(args: Tuple[str, Dict[str, Any]]) -> Fragment:
+    """Convert one Markdown file and keep the fragment in shared memory; runs inside a worker process."""
+    return export_fragment(_convert_fragment(args))
+
+
+def _render_target(args: Tuple) -> Tuple[str, Optional[str], float]:
+    """Render one output from prebuilt fragments; runs inside a worker process."""
+    from .converter import MarkdownToPDFConverter
+
+    name, html_parts, output_path, options, fallback_title, verbose = args
+    started = time.perf_counter()
+    try:
+        converter = MarkdownToPDFConverter(verbose=verbose)
+        converter.convert_html_to_pdf(
+            html_content=join_fragments(html_parts, converter.file_separator(options['merge'])),
+            output_path=output_path,
+            style=options['style'],
+            title=options['title'],
+            margin=options['margin'],
+            page_size=options['page_size'],
+            generate_toc=options['toc'],
+            fallback_title=fallback_title,
+            reproducible=options['reproducible'],
+            trusted_input=options['trusted_input'],
+            prune_css=options['prune_css'],
+            draft=options['draft']
+        )
+    except Exception as e:
+        return name, str(e), time.perf_counter() - started
+    return name, None, time.perf_counter() - started
+
+
+def _describe_estimate(cost: float) -> str:
+    """Describe a job estimate for the build log, in seconds when history exists."""
+    seconds = estimate_seconds(cost)
+    if seconds is None:
+        return f"estimated cost {cost:,.0f}"
+    return f"estimated {seconds:.2f}s"
+
+
+def _style_fingerprint(style: str) -> str:
+    """Fingerprint a style by its source so edited styles trigger rebuilds."""
+    from .yaml_styles import yaml_style_loader
+
+    if style.endswith('.css'):
+        source = Path(style)
+    else:
+        source = yaml_style_loader.style_path(style)
+
+    if source is not None and source.is_file():
+        return hashlib.sha256(source.read_bytes()).hexdigest()
+    return style
+
+
+def _hash_json(value: Any) -> str:
+    """Stable hash of a JSON-serialisable value."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
@@ -0,0 +1,30 @@
+"""
+On-disk cache location shared by md2pdf's caches.
+
+The cache directory is created by ``md2pdf warmup``; conversions only read
+from (and add to) caches that already exist, so plain CLI runs never create
+directories as a side effect.
+"""
+
+import os
+from pathlib import Path
+
+from .constants import CACHE_DIR_ENV
+
+
+def get_cache_dir() -> Path:
+    """
+    Get the md2pdf cache directory.
+    
+    Uses ``$MD2PDF_CACHE_DIR`` when set, otherwise ``$XDG_CACHE_HOME/md2pdf``
+    or ``~/.cache/md2pdf``.
+    
+    Returns:
+        Path to the cache directory (which may not exist yet)
+    """
+    configured = os.environ.get(CACHE_DIR_ENV)
+    if configured:
+        return Path(configured).expanduser()
+    
+    base = os.environ.get('XDG_CACHE_HOME')
+    return (Path(base) if base else Path.home() / '.cache') / 'md2pdf'
@@ -0,0 +1,411 @@
+"""
+Split large Markdown documents into chunks and convert them in parallel.
+
+Chunks are cut at top-level headings outside fenced code blocks and raw HTML
+blocks (which Markdown leaves unparsed in a single pass). Document-wide
+definitions (reference links, abbreviations and footnotes) are hoisted so every
+chunk sees the definitions it needs, and the per-chunk HTML is stitched back
+together so heading ids and footnotes match a single-pass conversion.
+Documents with a ``[TOC]`` marker are converted in a single pass, since the
+table of contents needs every heading.
+"""
+
+import functools
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import markdown
+from markdown.extensions.footnotes import FootnoteExtension
+from markdown.extensions.toc import TocExtension, unique
+from markdown.util import BLOCK_LEVEL_ELEMENTS
+
+from .constants import CHUNKS_PER_JOB, DEFAULT_TRANSFER
+from .transfer import Fragment, export_fragment, map_fragments, read_fragment, release_fragments
+
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+ATX_H1_RE = re.compile(r'^ {0,3}#(?!#)(?:[ \t]|$)')
+SETEXT_H1_RE = re.compile(r'^ {0,3}=+[ \t]*$')
+FOOTNOTE_DEF_RE = re.compile(r'^ {0,3}\[\^([^\]]*)\]:')
+REFERENCE_DEF_RE = re.compile(r'^ {0,3}\[(?!\^)[^\]]+\]:[ \t]*\S')
+ABBREVIATION_DEF_RE = re.compile(r'^ {0,3}\*\[[^\]]+\]:')
+FOOTNOTE_REF_RE = re.compile(r'\[\^([^\]]*)\]')
+HTML_BLOCK_START_RE = re.compile(r'^ {0,3}<(!--|[a-zA-Z][a-zA-Z0-9-]*)(?=[\s/>]|$)')
+
+FOOTNOTE_DIV_RE = re.compile(r'\n?<div class="footnote">\n<hr />\n<ol>\n(.*)</ol>\n</div>\s*$', re.DOTALL)
+FOOTNOTE_ITEM_RE = re.compile(
+    r'<li id="fn:(?P<label>[^"]+)">\n(?P<body>.*?)</li>\n(?=<li id="fn:|$)', re.DOTALL
+)
+# Heading ids to de-duplicate and footnote links to renumber, in one pass
+CHUNK_REWRITE_RE = re.compile(
+    r'<(?P<tag>h[1-6])(?P<attrs>[^>]*?) id="(?P<id>[^"]*)"'
+    r'|<sup id="fnref\d*:(?P<label>[^"]+)"><a class="footnote-ref" href="#fn:(?P=label)">\d+</a></sup>'
+)
+FOOTNOTE_BACKREFS_RE = re.compile(r'(?:<a class="footnote-backref" href="#fnref\d*:[^"]+" title="[^"]*">&#8617;</a>)+')
+
+
+def split_markdown(content: str, max_chunks: int) -> List[str]:
+    """
+    Split Markdown source into at most ``max_chunks`` self-contained chunks.
+
+    Args:
+        content: Markdown source text
+        max_chunks: Upper bound on the number of chunks to produce
+
+    Returns:
+        List of Markdown chunks in document order
+    """
+    return _split_markdown(content, max_chunks)[0]
+
+
+def _split_markdown(content: str, max_chunks: int) -> Tuple[List[str], List[str]]:
+    """Split Markdown source; also returns the footnote labels in definition order."""
+    lines = content.splitlines()
+    body_lines, shared_defs, footnote_defs = _extract_definitions(lines)
+    sections = _split_sections(body_lines)
+    chunks = _group_sections(sections, max_chunks)
+
+    shared = '\n'.join(shared_defs)
+    referenced = set()
+    result = []
+
+    for index, chunk in enumerate(chunks):
+        text = '\n'.join(chunk)
+        labels = [label for label in dict.fromkeys(FOOTNOTE_REF_RE.findall(text)) if label in footnote_defs]
+        referenced.update(labels)
+        if index == len(chunks) - 1:
+            # Unreferenced footnotes are still listed by a single-pass conversion
+            labels.extend(label for label in footnote_defs if label not in referenced)
+
+        parts = [text]
+        if shared:
+            parts.append(shared)
+        parts.extend(footnote_defs[label] for label in labels)
+        result.append('\n\n'.join(parts) + '\n')
+
+    return result, list(footnote_defs)
+
+
+def convert_markdown_parallel(
+    content: str,
+    extensions: List[str],
+    extension_configs: Dict[str, Dict],
+    jobs: Optional[int] = None,
+    transfer: str = DEFAULT_TRANSFER
+) -> str:
+    """
+    Convert one Markdown document to HTML using several worker processes.
+
+    Args:
+        content: Markdown source text
+        extensions: Markdown extension names
+        extension_configs: Markdown extension configuration
+        jobs: Number of worker processes (defaults to the CPU count)
+        transfer: How workers hand back their HTML (see :func:`~md2pdf.transfer.export_fragment`)
+
+    Returns:
+        HTML equivalent to converting ``content`` in a single pass
+    """
+    if _has_toc_marker(content, extensions, extension_configs):
+        return _convert_chunk((content, extensions, extension_configs))
+
+    jobs = jobs or os.cpu_count() or 1
+    chunks, footnote_labels = _split_markdown(content, jobs * CHUNKS_PER_JOB)
+
+    if len(chunks) == 1:
+        return _convert_chunk((chunks[0], extensions, extension_configs))
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as executor:
+        fragments = map_fragments(
+            executor,
+            _export_chunk,
+            [(chunk, extensions, extension_configs, transfer) for chunk in chunks]
+        )
+
+    # Each chunk is decoded straight from the worker's buffer; join_html_chunks
+    # then copies the text twice more (sliced between rewrites, joined once)
+    try:
+        html_chunks = [read_fragment(fragment) for fragment in fragments]
+    finally:
+        release_fragments(fragments)
+    footnote_order = footnote_labels if _footnotes_in_definition_order(extension_configs) else None
+    return join_html_chunks(html_chunks, footnote_order)
+
+
+def join_html_chunks(html_chunks: List[str], footnote_order: Optional[List[str]] = None) -> str:
+    """
+    Reassemble separately converted chunks into one HTML fragment.
+
+    Heading ids are de-duplicated in document order and footnotes are merged
+    into a single, globally numbered list at the end of the document.
+
+    Args:
+        html_chunks: HTML fragments in document order
+        footnote_order: Footnote labels in definition order, to number
+            footnotes as the footnotes extension does with
+            ``USE_DEFINITION_ORDER``; None numbers them by first reference
+
+    Returns:
+        Combined HTML fragment
+    """
+    used_ids = set()
+    footnotes: Dict[str, str] = {}
+    ends = []
+    for html in html_chunks:
+        match = FOOTNOTE_DIV_RE.search(html)
+        if match:
+            for item in FOOTNOTE_ITEM_RE.finditer(match.group(1)):
+                footnotes.setdefault(item.group('label'), item.group('body'))
+        ends.append(match.start() if match else len(html))
+
+    numbers: Dict[str, int] = {}
+    backrefs: Dict[str, List[str]] = {}
+    for label in footnote_order or ():
+        if label in footnotes:
+            numbers.setdefault(label, len(numbers) + 1)
+
+    def rewrite(match: re.Match) -> str:
+        if match.group('tag'):
+            return f'<{match.group("tag")}{match.group("attrs")} id="{unique(match.group("id"), used_ids)}"'
+        label = match.group('label')
+        number = numbers.setdefault(label, len(numbers) + 1)
+        refs = backrefs.setdefault(label, [])
+        ref_id = f'fnref{len(refs) + 1 if refs else ""}:{label}'
+        refs.append(ref_id)
+        return f'<sup id="{ref_id}"><a class="footnote-ref" href="#fn:{label}">{number}</a></sup>'
+
+    # Text between rewritten ids and footnote links is sliced once and the
+    # document joined once, instead of a substitution pass per rewrite
+    parts: List[str] = []
+    for index, (html, end) in enumerate(zip(html_chunks, ends)):
+        if index:
+            parts.append('\n')
+        position = 0
+        for match in CHUNK_REWRITE_RE.finditer(html, 0, end):
+            parts.append(html[position:match.start()])
+            parts.append(rewrite(match))
+            position = match.end()
+        parts.append(html[position:end])
+
+    if footnotes:
+        parts.append(_footnote_list(footnotes, numbers, backrefs))
+    return ''.join(parts)
+
+
+def _has_toc_marker(content: str, extensions: List[str], extension_configs: Dict[str, Dict]) -> bool:
+    """Whether the toc extension is enabled and the document contains its marker."""
+    if not any(name in ('toc', 'markdown.extensions.toc') for name in extensions):
+        return False
+    config = extension_configs.get('markdown.extensions.toc') or extension_configs.get('toc') or {}
+    marker = config.get('marker', TocExtension().getConfig('marker'))
+    return bool(marker) and marker in content
+
+
+def _footnotes_in_definition_order(extension_configs: Dict[str, Dict]) -> bool:
+    """Whether footnotes are numbered in definition order (USE_DEFINITION_ORDER) rather than by reference."""
+    extra = extension_configs.get('markdown.extensions.extra') or extension_configs.get('extra') or {}
+    config = (
+        extension_configs.get('markdown.extensions.footnotes') or extension_configs.get('footnotes')
+        or extra.get('footnotes') or {}
+    )
+    return bool(config.get('USE_DEFINITION_ORDER', FootnoteExtension().getConfig('USE_DEFINITION_ORDER', False)))
+
+
+def _convert_chunk(args: Tuple[str, List[str], Dict[str, Dict]]) -> str:
+    """Convert a single chunk; runs inside a worker process."""
+    chunk, extensions, extension_configs = args
+    md = markdown.Markdown(extensions=extensions, extension_configs=extension_configs)
+    return md.convert(chunk)
+
+
+def _export_chunk(args: Tuple[str, List[str], Dict[str, Dict], str]) -> Fragment:
+    """Convert a chunk and hand the HTML back through shared memory; runs inside a worker process."""
+    *chunk_args, transfer = args
+    return export_fragment(_convert_chunk(tuple(chunk_args)), transfer)
+
+
+def _extract_definitions(lines: List[str]) -> Tuple[List[str], List[str], Dict[str, str]]:
+    """Separate document-wide definitions from the body, skipping fenced code and raw HTML."""
+    body = []
+    shared = []
+    footnotes: Dict[str, str] = {}
+    fence = None
+    html_block = None
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+        in_html = html_block is not None
+        fence, html_block = _update_blocks(fence, html_block, line)
+
+        if fence is not None or in_html or html_block is not None:
+            body.append(line)
+            i += 1
+            continue
+
+        match = FOOTNOTE_DEF_RE.match(line)
+        if match:
+            end = _footnote_end(lines, i + 1)
+            footnotes.setdefault(match.group(1), '\n'.join(lines[i:end]))
+            i = end
+        elif REFERENCE_DEF_RE.match(line) or ABBREVIATION_DEF_RE.match(line):
+            shared.append(line)
+            i += 1
+        else:
+            body.append(line)
+            i += 1
+
+    return body, shared, footnotes
+
+
+def _footnote_end(lines: List[str], start: int) -> int:
+    """Return the index of the first line after a footnote definition."""
+    i = start
+    previous_blank = False
+
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            previous_blank = True
+        elif FOOTNOTE_DEF_RE.match(line) or REFERENCE_DEF_RE.match(line):
+            break
+        elif previous_blank and not line.startswith(('    ', '\t')):
+            break
+        else:
+            previous_blank = False
+        i += 1
+
+    # Leave trailing blank lines with the body
+    while i > start and not lines[i - 1].strip():
+        i -= 1
+
+    return i
+
+
+def _split_sections(lines: List[str]) -> List[List[str]]:
+    """Split lines into sections that each start at a top-level heading."""
+    sections: List[List[str]] = [[]]
+    fence = None
+    html_block = None
+
+    for line in lines:
+        in_block = fence is not None or html_block is not None
+        fence, html_block = _update_blocks(fence, html_block, line)
+        current = sections[-1]
+
+        if not in_block and fence is None and html_block is None:
+            if ATX_H1_RE.match(line) and current:
+                sections.append([])
+            elif (SETEXT_H1_RE.match(line) and len(current) > 1
+                    and current[-1].strip() and not current[-2].strip()):
+                # Move the setext heading text into the new section
+                sections.append([current.pop()])
+
+        sections[-1].append(line)
+
+    return [section for section in sections if section]
+
+
+def _group_sections(sections: List[List[str]], max_chunks: int) -> List[List[str]]:
+    """Group consecutive sections into roughly equal-sized chunks."""
+    if len(sections) <= max_chunks:
+        return sections
+
+    total = sum(len(line) + 1 for section in sections for line in section)
+    target = total / max_chunks
+    chunks: List[List[str]] = [[]]
+    size = 0
+
+    for section in sections:
+        if size >= target:
+            chunks.append([])
+            size = 0
+        chunks[-1].extend(section)
+        size += sum(len(line) + 1 for line in section)
+
+    return chunks
+
+
+def _update_blocks(
+    fence: Optional[str],
+    html_block: Optional[Tuple[str, int]],
+    line: str
+) -> Tuple[Optional[str], Optional[Tuple[str, int]]]:
+    """Track fenced code and raw HTML blocks; neither starts inside the other."""
+    if html_block is not None:
+        return fence, _update_html_block(html_block, line)
+    fence = _update_fence(fence, line)
+    if fence is not None:
+        return fence, None
+    return None, _update_html_block(None, line)
+
+
+def _update_html_block(html_block: Optional[Tuple[str, int]], line: str) -> Optional[Tuple[str, int]]:
+    """
+    Track a raw HTML block; returns the open element and its nesting depth, or None.
+
+    A block starts with a block-level tag or a comment at the start of a line
+    and lasts until the element (or comment) is closed.
+    """
+    if html_block is None:
+        match = HTML_BLOCK_START_RE.match(line)
+        if not match:
+            return None
+        tag = match.group(1).lower()
+        if tag != '!--' and tag not in BLOCK_LEVEL_ELEMENTS:
+            return None
+        depth = 0
+        if tag == '!--':
+            line = line[match.end():]
+    else:
+        tag, depth = html_block
+
+    if tag == '!--':
+        return None if '-->' in line else (tag, 0)
+    opening, closing = _tag_patterns(tag)
+    depth += len(opening.findall(line)) - len(closing.findall(line))
+    return (tag, depth) if depth > 0 else None
+
+
+@functools.lru_cache(maxsize=None)
+def _tag_patterns(tag: str) -> Tuple['re.Pattern', 're.Pattern']:
+    """Patterns matching the opening (not self-closing) and closing tags of an element."""
+    return (
+        re.compile(rf'<{tag}(?=[\s>])(?![^>]*/>)', re.IGNORECASE),
+        re.compile(rf'</{tag}\s*>', re.IGNORECASE),
+    )
+
+
+def _update_fence(fence: Optional[str], line: str) -> Optional[str]:
+    """Track fenced code block state; returns the active fence marker or None."""
+    match = FENCE_RE.match(line)
+    if not match:
+        return fence
+
+    marker = match.group(1)
+    if fence is None:
+        return marker
+    if marker[0] == fence[0] and len(marker) >= len(fence) and not line.strip()[len(marker):].strip():
+        return None
+    return fence
+
+
+def _footnote_list(footnotes: Dict[str, str], numbers: Dict[str, int], backrefs: Dict[str, List[str]]) -> str:
+    """Rebuild the footnote list, numbering footnotes that were never referenced last."""
+    for label in footnotes:
+        numbers.setdefault(label, len(numbers) + 1)
+
+    items = []
+    for label, number in numbers.items():
+        if label not in footnotes:
+            continue
+        links = ''.join(
+            f'<a class="footnote-backref" href="#{ref_id}" '
+            f'title="Jump back to footnote {number} in the text">&#8617;</a>'
+            for ref_id in backrefs.get(label) or [f'fnref:{label}']
+        )
+        body = FOOTNOTE_BACKREFS_RE.sub(lambda _: links, footnotes[label], count=1)
+        items.append(f'<li id="fn:{label}">\n{body}</li>\n')
+
+    return '\n<div class="footnote">\n<hr />\n<ol>\n' + ''.join(items) + '</ol>\n</div>'
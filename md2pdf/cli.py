@@ -7,26 +7,59 @@ import sys
 from pathlib import Path
 
 from .converter import MarkdownToPDFConverter
-from .utils import validate_input_files, validate_output_path, parse_margin
-from .constants import DEFAULT_MARGIN, DEFAULT_PAGE_SIZE, DEFAULT_STYLE
+from .limits import ResourceLimits
+from .markdown_ext import with_code_lang_guess
+from .metrics import MetricsCollector
+from .progress import json_lines_callback
+from .utils import validate_input_files, validate_output_path, parse_margin, select_input_files
+from .constants import (
+    DEFAULT_MARGIN, DEFAULT_PAGE_SIZE, DEFAULT_STYLE, DEFAULT_BUILD_FILE, DEFAULT_FSYNC, FSYNC_MODES,
+    HTML_EXTENSIONS, DEFAULT_LEASE_TIMEOUT, DEFAULT_SPOOL_POLL_INTERVAL, DEFAULT_SCHEDULE, SCHEDULE_POLICIES,
+    CODE_LANG_GUESS_POLICIES, DEFAULT_CODE_LANG_GUESS, MARKDOWN_EXTENSION_CONFIGS, METRICS_FORMATS,
+    DEFAULT_METRICS_FORMAT
+)
 from .exceptions import Md2PdfError, FileValidationError
 
 __version__ = "1.0.0"  # Define version here to avoid circular import
 
 
-@click.command()
+class DefaultCommandGroup(click.Group):
+    """Command group that falls back to ``convert`` when no subcommand is given."""
+    
+    default_command = 'convert'
+    
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] not in ('--help', '--version'):
+            args.insert(0, self.default_command)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultCommandGroup)
+@click.version_option(version=__version__, prog_name='md2pdf')
+def main():
+    """
+    Markdown to PDF CLI Tool
+    
+    Runs the convert command unless another command is named, so
+    "md2pdf document.md -o report.pdf" works as before.
+    """
+    pass
+
+
+@main.command('convert')
 @click.argument('input_files', nargs=-1, required=True, type=str)
 @click.option(
     '--output', '-o',
-    required=True,
     type=str,
-    help='Output PDF file path (required)'
+    help='Output PDF file path (required unless only --emit-html is wanted)'
 )
 @click.option(
     '--style', '-s',
-    default=DEFAULT_STYLE,
+    default=[DEFAULT_STYLE],
+    multiple=True,
     type=str,
-    help='CSS styling options: path to custom CSS file or built-in style name (github, minimal, academic, default)'
+    help='CSS styling options: path to custom CSS file or built-in style name (github, minimal, academic, default). '
+         'Repeat to render one PDF per style'
 )
 @click.option(
     '--title',
@@ -41,9 +74,10 @@ __version__ = "1.0.0"  # Define version here to avoid circular import
 )
 @click.option(
     '--page-size',
-    default=DEFAULT_PAGE_SIZE,
+    default=[DEFAULT_PAGE_SIZE],
+    multiple=True,
     type=str,
-    help='Specify page size (A4, Letter, Legal, etc.). Default: A4'
+    help='Specify page size (A4, Letter, Legal, etc.). Repeat to render one PDF per size. Default: A4'
 )
 @click.option(
     '--toc/--no-toc',
@@ -55,27 +89,174 @@ __version__ = "1.0.0"  # Define version here to avoid circular import
     default=True,
     help='How to handle multiple files: merge with separators or start each file on a new page. Default: merge'
 )
+@click.option(
+    '--split/--no-split',
+    default=False,
+    help='Split large Markdown files at top-level headings and convert the chunks in parallel. Default: disabled'
+)
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    help='Number of worker processes for parallel conversion and style/page-size variants. Default: CPU count'
+)
+@click.option(
+    '--split-tables',
+    type=click.IntRange(min=1),
+    help='Split tables longer than this many rows into consecutive tables for faster layout'
+)
+@click.option(
+    '--timeout',
+    type=click.FloatRange(min=0, min_open=True),
+    help='Abort the conversion after this many seconds'
+)
+@click.option(
+    '--memory-limit',
+    type=click.IntRange(min=1),
+    help='Cap the conversion process memory (MiB)'
+)
+@click.option(
+    '--max-input-size',
+    type=click.IntRange(min=1),
+    help='Reject inputs whose combined size exceeds this many bytes'
+)
+@click.option(
+    '--max-table-rows',
+    type=click.IntRange(min=1),
+    help='Reject documents with a table longer than this many rows'
+)
+@click.option(
+    '--max-nesting-depth',
+    type=click.IntRange(min=1),
+    help='Reject documents with lists, blockquotes or tables nested deeper than this'
+)
+@click.option(
+    '--progress',
+    is_flag=True,
+    help='Emit machine-readable progress events as JSON lines on stderr'
+)
+@click.option(
+    '--metrics-file',
+    type=str,
+    help='Write conversion metrics in the Prometheus text format to this file ("-" for stdout)'
+)
+@click.option(
+    '--metrics-format',
+    type=click.Choice(METRICS_FORMATS),
+    default=DEFAULT_METRICS_FORMAT,
+    help='Text format of --metrics-file: prometheus (0.0.4, read by node-exporter\'s textfile collector) '
+         f'or openmetrics. Default: {DEFAULT_METRICS_FORMAT}'
+)
+@click.option(
+    '--skip-identical',
+    is_flag=True,
+    help='Leave an existing output untouched (mtime preserved) when the new PDF is identical'
+)
+@click.option(
+    '--fsync',
+    type=click.Choice(FSYNC_MODES),
+    default=DEFAULT_FSYNC,
+    help=f'Output durability: none, file (flush the PDF) or full (also flush the directory). Default: {DEFAULT_FSYNC}'
+)
+@click.option(
+    '--emit-html',
+    type=str,
+    help='Also write the final HTML document (styles, title and TOC included) to this path'
+)
+@click.option(
+    '--from-html',
+    is_flag=True,
+    help='Input is an HTML document written by --emit-html; only layout and PDF writing run'
+)
+@click.option(
+    '--base-url',
+    type=str,
+    help="Base for relative image and asset URLs. Default: the first input's directory"
+)
+@click.option(
+    '--estimate',
+    is_flag=True,
+    help='Print predicted pages, render time and peak memory as JSON instead of converting'
+)
+@click.option(
+    '--reproducible',
+    is_flag=True,
+    help='Produce byte-identical PDFs for identical inputs (dates from SOURCE_DATE_EPOCH)'
+)
+@click.option(
+    '--trusted-input',
+    is_flag=True,
+    help='Skip HTML sanitization; only for Markdown you control'
+)
+@click.option(
+    '--prune-css',
+    is_flag=True,
+    help='Drop style rules that match no element of the document before layout'
+)
+@click.option(
+    '--preview-pages',
+    type=click.IntRange(min=1),
+    help='Fast preview: convert only enough content for the first N pages and keep only those'
+)
+@click.option(
+    '--code-lang-guess',
+    type=click.Choice(CODE_LANG_GUESS_POLICIES),
+    help=f'How to pick the language of unlabeled code blocks. Default: {DEFAULT_CODE_LANG_GUESS}'
+)
+@click.option(
+    '--draft',
+    is_flag=True,
+    help='Fast review build: no gradients, shadows, rounded borders, web fonts or syntax highlighting; low-resolution images'
+)
+@click.option(
+    '--only',
+    multiple=True,
+    help='Convert only the inputs matching this file name, path or glob (repeatable)'
+)
 @click.option(
     '--verbose', '-v',
     is_flag=True,
     help='Enable verbose output for debugging'
 )
-@click.version_option(version=__version__, prog_name='md2pdf')
-def main(
+def convert(
     input_files: tuple,
     output: str,
-    style: str,
+    style: tuple,
     title: str,
     margin: str,
-    page_size: str,
+    page_size: tuple,
     toc: bool,
     merge: bool,
+    split: bool,
+    jobs: int,
+    split_tables: int,
+    timeout: float,
+    memory_limit: int,
+    max_input_size: int,
+    max_table_rows: int,
+    max_nesting_depth: int,
+    progress: bool,
+    metrics_file: str,
+    metrics_format: str,
+    skip_identical: bool,
+    fsync: str,
+    emit_html: str,
+    from_html: bool,
+    base_url: str,
+    estimate: bool,
+    reproducible: bool,
+    trusted_input: bool,
+    prune_css: bool,
+    preview_pages: int,
+    code_lang_guess: str,
+    draft: bool,
+    only: tuple,
     verbose: bool
 ):
     """
     Convert one or more Markdown documents into a single PDF file with customizable CSS styling.
     
-    INPUT_FILES: One or more Markdown files or glob patterns (e.g., *.md, docs/*.md)
+    INPUT_FILES: One or more Markdown files or glob patterns (e.g., *.md, docs/*.md),
+    files inside archives (e.g., 'site.zip!chapters/*.md') or .md.gz files
     
     Examples:
     
@@ -98,24 +279,77 @@ def main(
     \b
     # With table of contents and custom title
     md2pdf docs/*.md --output manual.pdf --style academic --toc --title "User Manual"
+    
+    \b
+    # Several styles and page sizes from one Markdown pass (manual-ibm-A4.pdf, ...)
+    md2pdf manual.md -o manual.pdf -s ibm -s purple-dark --page-size A4 --page-size Letter
+    
+    \b
+    # Two-stage pipeline: HTML on a build agent, PDF on a render node
+    md2pdf manual.md --emit-html manual.html --style ibm --toc
+    md2pdf manual.html --from-html -o manual.pdf
+    
+    \b
+    # Quick review build without expensive visual effects
+    md2pdf docs/*.md --output review.pdf --style ocean --draft
+    
+    \b
+    # Preflight: predicted pages, seconds and peak memory as JSON
+    md2pdf manual.md --estimate --style ibm
     """
+    if estimate:
+        _print_estimate(input_files, style, page_size, merge, only, draft, verbose)
+        return
+    
+    if from_html:
+        if output is None:
+            raise click.UsageError("--from-html requires --output")
+        if emit_html or len(page_size) > 1 or len(style) > 1:
+            raise click.UsageError("--from-html renders a single PDF; --emit-html and style or page-size variants do not apply")
+        if preview_pages or only or draft:
+            raise click.UsageError("--preview-pages, --draft and --only apply to Markdown inputs, not --from-html")
+        markdown_only = [name for name, value in (
+            ('--toc', toc), ('--title', title), ('--split', split), ('--split-tables', split_tables),
+            ('--prune-css', prune_css), ('--trusted-input', trusted_input), ('--code-lang-guess', code_lang_guess)
+        ) if value]
+        if markdown_only:
+            raise click.UsageError(
+                f"{', '.join(markdown_only)}: set when the HTML is produced with --emit-html, not with --from-html"
+            )
+    elif output is None and emit_html is None:
+        raise click.UsageError("Missing option '--output' / '-o' (or --emit-html)")
+    
+    metrics = MetricsCollector() if metrics_file else None
+    # Keep stdout clean for the metrics text
+    messages_to_stderr = metrics_file == '-'
+    
     try:
         # Validate input files
         if verbose:
             click.echo(f"Validating {len(input_files)} input pattern(s)...")
         
-        validated_files = validate_input_files(list(input_files))
+        if from_html:
+            validated_files = validate_input_files(list(input_files), HTML_EXTENSIONS, "an HTML file")
+            if len(validated_files) != 1:
+                raise FileValidationError("--from-html takes exactly one HTML file")
+        else:
+            validated_files = validate_input_files(list(input_files))
+            if only:
+                validated_files = select_input_files(validated_files, list(only))
         
         if verbose:
-            click.echo(f"Found {len(validated_files)} Markdown file(s):")
+            click.echo(f"Found {len(validated_files)} input file(s):")
             for file_path in validated_files:
                 click.echo(f"  - {file_path}")
         
-        # Validate output path
-        output_path = validate_output_path(output)
+        # Validate output paths
+        output_path = validate_output_path(output) if output else None
+        html_path = validate_output_path(emit_html, suffix='.html') if emit_html else None
         
         if verbose:
-            click.echo(f"Output will be saved to: {output_path}")
+            for path in (output_path, html_path):
+                if path:
+                    click.echo(f"Output will be saved to: {path}")
         
         # Validate margin format
         try:
@@ -124,24 +358,68 @@ def main(
             raise click.BadParameter(str(e), param_hint=['--margin'])
         
         # Initialize converter
-        converter = MarkdownToPDFConverter(verbose=verbose)
+        converter = MarkdownToPDFConverter(
+            verbose=verbose,
+            markdown_extension_configs=(
+                with_code_lang_guess(MARKDOWN_EXTENSION_CONFIGS, code_lang_guess) if code_lang_guess else None
+            ),
+            progress_callback=json_lines_callback() if progress else None,
+            metrics=metrics
+        )
         
-        # Perform conversion
-        converter.convert_files_to_pdf(
-            input_files=validated_files,
-            output_path=output_path,
-            style=style,
-            title=title,
-            margin=validated_margin,
-            page_size=page_size,
-            generate_toc=toc,
-            merge_files=merge,
-            verbose=verbose
+        limits = ResourceLimits(
+            timeout=timeout,
+            memory_limit_mb=memory_limit,
+            max_input_bytes=max_input_size,
+            max_table_rows=max_table_rows,
+            max_nesting_depth=max_nesting_depth
         )
         
+        # Perform conversion
+        if from_html:
+            converter.convert_html_file_to_pdf(
+                html_path=validated_files[0],
+                output_path=output_path,
+                margin=validated_margin,
+                page_size=page_size[0],
+                base_url=base_url,
+                limits=limits,
+                skip_identical=skip_identical,
+                fsync=fsync,
+                reproducible=reproducible
+            )
+            outputs = [output_path]
+        else:
+            outputs = converter.convert_files_to_pdf(
+                input_files=validated_files,
+                output_path=output_path,
+                style=style,
+                title=title,
+                margin=validated_margin,
+                page_size=page_size,
+                generate_toc=toc,
+                merge_files=merge,
+                verbose=verbose,
+                split_large_files=split,
+                jobs=jobs,
+                split_tables_at=split_tables,
+                skip_identical=skip_identical,
+                fsync=fsync,
+                reproducible=reproducible,
+                emit_html=html_path,
+                base_url=base_url,
+                limits=limits,
+                trusted_input=trusted_input,
+                prune_css=prune_css,
+                preview_pages=preview_pages,
+                draft=draft
+            )
+        
         # Success message
         if not verbose:
-            click.echo(f"✓ PDF created successfully: {output_path}")
+            for path in outputs:
+                kind = 'HTML' if path.suffix == '.html' else 'PDF'
+                click.echo(f"✓ {kind} created successfully: {path}", err=messages_to_stderr)
         
     except (FileNotFoundError, FileValidationError, ValueError) as e:
         click.echo(f"Error: {e}", err=True)
@@ -157,15 +435,383 @@ def main(
         else:
             click.echo(f"Error: {e}", err=True)
         sys.exit(1)
+    finally:
+        if metrics is not None:
+            try:
+                metrics.write(metrics_file, metrics_format)
+            except Md2PdfError as e:
+                click.echo(f"Warning: could not write metrics: {e}", err=True)
+
+
+def _print_estimate(
+    input_files: tuple,
+    style: tuple,
+    page_size: tuple,
+    merge: bool,
+    only: tuple,
+    draft: bool,
+    verbose: bool
+) -> None:
+    """Run the cheap stages only on the selected inputs and print the estimate for each variant as JSON."""
+    import json
+    from .estimate import estimate_conversion
+    
+    try:
+        validated_files = validate_input_files(list(input_files))
+        if only:
+            validated_files = select_input_files(validated_files, list(only))
+        converter = MarkdownToPDFConverter(verbose=verbose)
+        estimates = [
+            {'style': variant_style,
+             **estimate_conversion(validated_files, variant_style, size, merge, converter, draft=draft)}
+            for variant_style in style
+            for size in page_size
+        ]
+    except (FileNotFoundError, ValueError, Md2PdfError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    
+    click.echo(json.dumps(estimates[0] if len(estimates) == 1 else estimates, indent=2))
+
+
+@main.command('build')
+@click.argument('build_file', default=DEFAULT_BUILD_FILE, type=click.Path(dir_okay=False))
+@click.option(
+    '--target', '-t', 'targets',
+    multiple=True,
+    help='Only build the named output (repeatable). Default: all outputs'
+)
+@click.option(
+    '--force', '-f',
+    is_flag=True,
+    help='Rebuild outputs even when their inputs are unchanged'
+)
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    help='Number of worker processes. Default: CPU count'
+)
+@click.option(
+    '--schedule',
+    type=click.Choice(SCHEDULE_POLICIES),
+    default=DEFAULT_SCHEDULE,
+    help='Job order: largest-first (shortest total time), shortest-first (first results soonest) or fifo. '
+         f'Default: {DEFAULT_SCHEDULE}'
+)
+@click.option(
+    '--retry-failed',
+    is_flag=True,
+    help='Only rebuild outputs whose last attempt failed or that were never built; '
+         'outputs that built are skipped even when out of date'
+)
+@click.option(
+    '--verbose', '-v',
+    is_flag=True,
+    help='Enable verbose output for debugging'
+)
+def build(build_file: str, targets: tuple, force: bool, jobs: int, schedule: str, retry_failed: bool,
+          verbose: bool):
+    """
+    Build every output declared in a project build file (default: md2pdf.toml).
+    
+    Chapters shared between outputs are converted once, outputs are rendered
+    in parallel, and outputs whose inputs are unchanged are skipped. Finished
+    outputs are journaled as they complete, so an interrupted build resumes.
+    """
+    from .build import ProjectBuilder
+    
+    try:
+        builder = ProjectBuilder(Path(build_file), verbose=verbose)
+        results = builder.build(
+            target_names=list(targets), force=force, jobs=jobs, schedule=schedule, retry_failed=retry_failed
+        )
+        counts = {status: sum(1 for s in results.values() if s == status)
+                  for status in ('built', 'up-to-date', 'skipped')}
+        summary = f"✓ Build finished: {counts['built']} built, {counts['up-to-date']} up to date"
+        if counts['skipped']:
+            summary += f", {counts['skipped']} skipped"
+        click.echo(summary)
+    except Md2PdfError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+@main.command('warmup')
+@click.option(
+    '--cache-dir',
+    type=click.Path(file_okay=False),
+    help='Cache directory to fill. Default: $MD2PDF_CACHE_DIR or ~/.cache/md2pdf'
+)
+@click.option(
+    '--render/--no-render',
+    default=True,
+    help='Finish with a tiny end-to-end render. Default: enabled'
+)
+@click.option(
+    '--verbose', '-v',
+    is_flag=True,
+    help='Enable verbose output for debugging'
+)
+def warmup(cache_dir: str, render: bool, verbose: bool):
+    """
+    Pay start-up costs ahead of time: precompile bytecode, prime the
+    fontconfig cache, compile styles and the HTML template into the cache
+    directory, and perform a tiny render.
+    """
+    from .warmup import run_warmup
+    
+    try:
+        timings = run_warmup(Path(cache_dir) if cache_dir else None, render=render, verbose=verbose)
+    except Md2PdfError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    
+    for step, seconds in timings:
+        click.echo(f"  {step:<12} {seconds:6.2f}s")
+    click.echo(f"✓ Warm-up finished in {sum(seconds for _, seconds in timings):.2f}s")
 
 
-@click.group()
-def cli():
-    """Markdown to PDF CLI Tool"""
+@main.group('styles')
+def styles():
+    """Compile, benchmark and lint styles."""
     pass
 
 
-# Removed unused CLI group and subcommands - these were never accessible from main()
+@styles.command('compile')
+@click.argument('directories', nargs=-1, type=click.Path(exists=True, file_okay=False))
+def styles_compile(directories: tuple):
+    """
+    Compile YAML styles into CSS bundles stored next to each YAML file.
+    
+    DIRECTORIES are extra style directories to compile in addition to the
+    built-in styles. Bundles carry the hash of their YAML source; stale
+    bundles are ignored, so rerun this after editing a style.
+    """
+    from .yaml_styles import YAMLStyleLoader, yaml_style_loader
+    
+    loaders = [yaml_style_loader] + [YAMLStyleLoader(Path(directory)) for directory in directories]
+    compiled = []
+    try:
+        for loader in loaders:
+            compiled.extend(loader.compile_styles())
+    except Md2PdfError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    
+    for path in compiled:
+        click.echo(f"  {path}")
+    click.echo(f"✓ Compiled {len(compiled)} style(s)")
+
+
+@styles.command('bench')
+@click.argument('style_names', metavar='[STYLES]...', nargs=-1)
+@click.option(
+    '--input', '-i', 'inputs',
+    multiple=True,
+    help='Markdown file or glob to render instead of the built-in sample document (repeatable)'
+)
+@click.option(
+    '--page-size',
+    default=DEFAULT_PAGE_SIZE,
+    help=f'Page size. Default: {DEFAULT_PAGE_SIZE}'
+)
+@click.option(
+    '--repeat',
+    default=1,
+    type=click.IntRange(min=1),
+    help='Renders per style; the fastest is reported. Default: 1'
+)
+@click.option(
+    '--json', 'as_json',
+    is_flag=True,
+    help='Print one JSON object per style instead of a table'
+)
+def styles_bench(style_names: tuple, inputs: tuple, page_size: str, repeat: int, as_json: bool):
+    """
+    Render a document under each style and report time, peak memory and PDF size.
+    
+    STYLES are style names or CSS files; default: every built-in and YAML
+    style. Each render runs in a fresh process; slowest styles are listed first.
+    """
+    import json
+    from .style_report import bench_styles
+    from .styles import list_builtin_styles
+    from .validators import validate_page_size
+    
+    try:
+        input_files = validate_input_files(list(inputs)) if inputs else None
+        results = bench_styles(
+            list(style_names) or sorted(list_builtin_styles()),
+            input_files=input_files,
+            page_size=validate_page_size(page_size),
+            repeat=repeat
+        )
+    except (FileNotFoundError, ValueError, Md2PdfError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    
+    results.sort(key=lambda r: r.get('seconds', float('inf')), reverse=True)
+    if as_json:
+        for result in results:
+            click.echo(json.dumps(result))
+        return
+    
+    click.echo(f"  {'style':<24} {'seconds':>8} {'peak MiB':>9} {'PDF KiB':>8} {'pages':>6}")
+    for result in results:
+        if 'error' in result:
+            click.echo(f"  {result['style']:<24} error: {result['error']}")
+            continue
+        memory = '-' if result['peak_memory_mb'] is None else f"{result['peak_memory_mb']:.1f}"
+        pages = '-' if result['pages'] is None else str(result['pages'])
+        click.echo(
+            f"  {result['style']:<24} {result['seconds']:>8.2f} {memory:>9} "
+            f"{result['pdf_bytes'] / 1024:>8.1f} {pages:>6}"
+        )
+
+
+@styles.command('lint')
+@click.argument('style_names', metavar='[STYLES]...', nargs=-1)
+@click.option(
+    '--strict',
+    is_flag=True,
+    help='Exit with status 1 when any style has findings'
+)
+def styles_lint(style_names: tuple, strict: bool):
+    """
+    Flag CSS features that are slow to render in WeasyPrint.
+    
+    Checks for gradients, large shadows, fonts and stylesheets downloaded
+    over the network, and image or gradient page backgrounds. STYLES are
+    style names or CSS files; default: every built-in and YAML style.
+    """
+    from .style_report import lint_stylesheet
+    from .styles import list_builtin_styles
+    
+    converter = MarkdownToPDFConverter()
+    total = 0
+    for style in list(style_names) or sorted(list_builtin_styles()):
+        try:
+            findings = lint_stylesheet(converter._load_styles(style))
+        except Md2PdfError as e:
+            click.echo(f"Error: {e}", err=True)
+            sys.exit(1)
+        total += len(findings)
+        for finding in findings:
+            click.echo(f"{style}: {finding['check']}: {finding['selector']}: {finding['message']}")
+    
+    click.echo(f"✓ {total} finding(s)" if not total else f"{total} finding(s)", err=bool(total))
+    if strict and total:
+        sys.exit(1)
+
+
+@main.command('worker')
+@click.option(
+    '--spool',
+    required=True,
+    type=click.Path(file_okay=False),
+    help='Shared spool directory to take jobs from'
+)
+@click.option(
+    '--jobs', '-j',
+    default=1,
+    type=click.IntRange(min=1),
+    help='Number of worker processes on this host. Default: 1'
+)
+@click.option(
+    '--lease-timeout',
+    default=DEFAULT_LEASE_TIMEOUT,
+    type=click.FloatRange(min=1),
+    help=f'Seconds without a heartbeat before a claimed job is requeued. Default: {DEFAULT_LEASE_TIMEOUT:g}'
+)
+@click.option(
+    '--poll-interval',
+    default=DEFAULT_SPOOL_POLL_INTERVAL,
+    type=click.FloatRange(min=0, min_open=True),
+    help=f'Seconds to wait when the queue is empty. Default: {DEFAULT_SPOOL_POLL_INTERVAL:g}'
+)
+@click.option(
+    '--once',
+    is_flag=True,
+    help='Exit when the queue is empty instead of waiting for more jobs'
+)
+@click.option(
+    '--timeout',
+    type=click.FloatRange(min=0, min_open=True),
+    help='Abort a job after this many seconds'
+)
+@click.option(
+    '--memory-limit',
+    type=click.IntRange(min=1),
+    help='Cap the memory of each conversion (MiB)'
+)
+@click.option(
+    '--verbose', '-v',
+    is_flag=True,
+    help='Enable verbose output for debugging'
+)
+def worker(
+    spool: str,
+    jobs: int,
+    lease_timeout: float,
+    poll_interval: float,
+    once: bool,
+    timeout: float,
+    memory_limit: int,
+    verbose: bool
+):
+    """
+    Render jobs from a shared spool directory.
+    
+    Jobs are claimed by atomic rename, so any number of workers on any number
+    of hosts can share one directory. Jobs whose worker stops sending
+    heartbeats are requeued after the lease timeout.
+    """
+    from .spool import run_workers
+    
+    try:
+        processed = run_workers(
+            Path(spool),
+            processes=jobs,
+            lease_timeout=lease_timeout,
+            poll_interval=poll_interval,
+            once=once,
+            limits=ResourceLimits(timeout=timeout, memory_limit_mb=memory_limit),
+            verbose=verbose
+        )
+    except KeyboardInterrupt:
+        click.echo("Worker stopped", err=True)
+        return
+    except (Md2PdfError, OSError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    
+    click.echo(f"✓ Processed {processed} job(s)")
+
+
+@main.command('calibrate')
+@click.argument('records', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def calibrate(records: tuple):
+    """
+    Fit the --estimate model to measured runs.
+    
+    RECORDS are JSON-lines files written by
+    "python benchmarks/run.py estimate --record FILE"; the fitted model is
+    stored in the cache directory and used by later estimates.
+    """
+    import json
+    from .estimate import calibrate as fit_model
+    
+    entries = []
+    try:
+        for path in records:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries.extend(json.loads(line) for line in f if line.strip())
+        model = fit_model(entries)
+    except (OSError, ValueError, Md2PdfError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    
+    click.echo(f"✓ Calibrated estimate model from {model['records']} run(s)")
 
 
 # Make main the default command when called directly
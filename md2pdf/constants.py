@@ -4,6 +4,16 @@ Constants and configuration values for md2pdf.
 
 # File extensions
 MARKDOWN_EXTENSIONS = frozenset(['.md', '.markdown'])
+HTML_EXTENSIONS = frozenset(['.html', '.htm'])
+
+# Inputs read from archives ("docs.zip!chapters/*.md") and gzip files ("notes.md.gz"), see archives.py
+ARCHIVE_SEPARATOR = '!'
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+COMPRESSED_SUFFIX = '.gz'
+ARCHIVE_CACHE_ENTRIES = 4
+# Members of a compressed tar archive kept in memory after it is decompressed; the rest are re-read
+ARCHIVE_MEMORY_BYTES = 64 * 1024 * 1024
 
 # CSS units
 VALID_CSS_UNITS = frozenset(['mm', 'cm', 'in', 'px', 'pt', 'pc'])
@@ -23,25 +33,182 @@ VALID_PAGE_SIZES = frozenset([
 # Character encoding attempts
 ENCODING_ATTEMPTS = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
 
+# Language policy for code blocks without a label (see markdown_ext.py)
+CODE_LANG_EXTENSION = 'md2pdf.markdown_ext'
+CODE_LANG_GUESS_POLICIES = ('guess', 'memoized', 'heuristic', 'plain')
+DEFAULT_CODE_LANG_GUESS = 'memoized'
+CODE_LANG_MEMO_ENTRIES = 1024
+CODE_LANG_MEMO_FILE = "code-languages.txt"
+# The memo file is rewritten with the live entries once it holds this many times CODE_LANG_MEMO_ENTRIES lines
+CODE_LANG_MEMO_COMPACT_FACTOR = 4
+
 # Markdown extensions configuration
 MARKDOWN_EXTENSIONS_LIST = [
     'markdown.extensions.extra',
     'markdown.extensions.codehilite',
     'markdown.extensions.toc',
     'markdown.extensions.tables',
-    'markdown.extensions.fenced_code'
+    'markdown.extensions.fenced_code',
+    CODE_LANG_EXTENSION
 ]
 
 MARKDOWN_EXTENSION_CONFIGS = {
     'markdown.extensions.codehilite': {
         'css_class': 'highlight',
-        'use_pygments': True
+        'use_pygments': True,
+        'guess_lang': False
+    },
+    CODE_LANG_EXTENSION: {
+        'policy': DEFAULT_CODE_LANG_GUESS
     },
     'markdown.extensions.toc': {
         'permalink': False
     }
 }
 
+# Parallel conversion of large inputs
+SPLIT_MIN_CHARS = 1024 * 1024
+CHUNKS_PER_JOB = 4
+
+# Hand-off of HTML fragments from worker processes (see transfer.py); smaller fragments are pickled
+TRANSFER_METHODS = ('auto', 'shared-memory', 'mmap', 'pickle')
+DEFAULT_TRANSFER = 'auto'
+TRANSFER_MIN_BYTES = 64 * 1024
+
+# Threads used to read input files ahead of conversion
+READ_AHEAD_THREADS = 4
+
+# Output writing
+FSYNC_MODES = ('none', 'file', 'full')
+DEFAULT_FSYNC = 'file'
+
+# Reproducible output
+SOURCE_DATE_EPOCH_ENV = "SOURCE_DATE_EPOCH"
+
+# Block elements counted towards the nesting depth limit
+NESTING_TAGS = frozenset(['ul', 'ol', 'dl', 'blockquote', 'table'])
+
+# HTML sanitization allowlist (applied to converted Markdown unless input is trusted)
+SANITIZE_ALLOWED_TAGS = frozenset([
+    'a', 'abbr', 'address', 'article', 'aside', 'b', 'blockquote', 'br', 'caption', 'cite',
+    'code', 'col', 'colgroup', 'dd', 'del', 'details', 'dfn', 'div', 'dl', 'dt', 'em',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hgroup',
+    'hr', 'i', 'img', 'ins', 'kbd', 'li', 'main', 'mark', 'nav', 'ol', 'p', 'pre', 'q', 's',
+    'samp', 'section', 'small', 'span', 'strong', 'sub', 'summary', 'sup', 'table', 'tbody',
+    'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul', 'var', 'wbr'
+])
+# Dropped together with everything inside them; inline SVG and MathML can carry
+# scripts and links in their own vocabularies, so they are not sanitized element by element
+SANITIZE_DROP_CONTENT_TAGS = frozenset([
+    'script', 'style', 'iframe', 'frame', 'frameset', 'object', 'embed', 'applet',
+    'noscript', 'template', 'svg', 'math'
+])
+SANITIZE_ALLOWED_ATTRIBUTES = frozenset(['id', 'class', 'title', 'lang', 'dir', 'style'])
+SANITIZE_TAG_ATTRIBUTES = {
+    'a': frozenset(['href', 'name', 'rel']),
+    'img': frozenset(['src', 'alt', 'width', 'height']),
+    'td': frozenset(['colspan', 'rowspan', 'align']),
+    'th': frozenset(['colspan', 'rowspan', 'align', 'scope']),
+    'col': frozenset(['span', 'width']),
+    'colgroup': frozenset(['span']),
+    'ol': frozenset(['start', 'type', 'reversed']),
+    'li': frozenset(['value']),
+    'blockquote': frozenset(['cite']),
+    'q': frozenset(['cite']),
+    'del': frozenset(['cite', 'datetime']),
+    'ins': frozenset(['cite', 'datetime']),
+    'details': frozenset(['open']),
+}
+SANITIZE_URL_ATTRIBUTES = frozenset(['href', 'src', 'cite'])
+SANITIZE_URL_SCHEMES = frozenset(['http', 'https', 'mailto', 'file'])
+
+# Cache directory
+CACHE_DIR_ENV = "MD2PDF_CACHE_DIR"
+COMPILED_STYLE_HEADER = "/* md2pdf-source-hash: {} */\n"
+COMPILED_STYLE_SUFFIX = ".compiled.css"
+
+# Metrics histogram buckets
+METRICS_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+METRICS_BYTE_BUCKETS = (1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8)
+METRICS_PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Prometheus text format 0.0.4 (what node-exporter's textfile collector parses) or OpenMetrics 1.0
+METRICS_FORMATS = ('prometheus', 'openmetrics')
+DEFAULT_METRICS_FORMAT = 'prometheus'
+
+# Unused CSS pruning: pruned stylesheets kept in memory and under the cache directory
+CSS_PRUNE_CACHE_DIR = "pruned-css"
+CSS_PRUNE_MEMORY_ENTRIES = 32
+
+# Progress reporting
+PROGRESS_STAGES = ('markdown', 'styles', 'document', 'layout', 'write')
+THROUGHPUT_FILE = "throughput.json"
+THROUGHPUT_SMOOTHING = 0.3
+
+# Project builds
+DEFAULT_BUILD_FILE = "md2pdf.toml"
+BUILD_JOURNAL_FILE = ".md2pdf-journal.jsonl"
+BUILD_JOURNAL_COMPACT_FACTOR = 4
+BUILD_JOURNAL_COMPACT_SLACK = 100
+BUILD_TARGET_OPTIONS = frozenset([
+    'output', 'inputs', 'style', 'title', 'margin', 'page_size', 'toc', 'merge', 'markdown',
+    'reproducible', 'trusted_input', 'prune_css', 'draft', 'code_lang_guess'
+])
+
+# Size-aware scheduling
+SCHEDULE_POLICIES = ('largest-first', 'shortest-first', 'fifo')
+DEFAULT_SCHEDULE = 'largest-first'
+# Cost of one element in byte-equivalents of plain prose
+SCHEDULE_COST_WEIGHTS = {
+    'code_block': 2000,
+    'table_row': 300,
+    'image': 50000,
+}
+
+# Preflight estimates
+ESTIMATE_MODEL_FILE = "estimate-model.json"
+ESTIMATE_FEATURES = ('text_chars', 'blocks', 'table_rows', 'code_lines', 'images', 'css_bytes')
+ESTIMATE_TARGETS = ('pages', 'seconds', 'peak_memory_mb')
+# Rough starting point until `md2pdf calibrate` fits the model to measured runs
+DEFAULT_ESTIMATE_MODEL = {
+    'pages': {'intercept': 1.0, 'text_chars': 1 / 3000, 'blocks': 0.01, 'table_rows': 1 / 40,
+              'code_lines': 1 / 55, 'images': 0.3},
+    'seconds': {'intercept': 0.5, 'text_chars': 2e-5, 'blocks': 1e-3, 'table_rows': 1e-3,
+                'code_lines': 3e-4, 'images': 0.02, 'css_bytes': 1e-5},
+    'peak_memory_mb': {'intercept': 60.0, 'text_chars': 2e-4, 'blocks': 0.01, 'table_rows': 0.02,
+                       'code_lines': 0.005, 'images': 2.0},
+}
+
+# Preview renders keep this many times the requested pages of content (plus one)
+PREVIEW_PAGE_SLACK = 1.5
+
+# Draft rendering: expensive visual effects removed from styles, images embedded at low resolution
+DRAFT_DROPPED_PROPERTIES = frozenset([
+    'box-shadow', 'text-shadow', 'filter', 'background-image',
+    'border-radius', 'border-top-left-radius', 'border-top-right-radius',
+    'border-bottom-left-radius', 'border-bottom-right-radius',
+])
+DRAFT_DROPPED_AT_RULES = frozenset(['font-face', 'import'])
+DRAFT_IMAGE_DPI = 96
+DRAFT_JPEG_QUALITY = 60
+
+# Style reports: sample document size for "styles bench" and lint thresholds
+STYLE_BENCH_SECTIONS = 12
+STYLE_LINT_SHADOW_BLUR_PT = 10.0
+STYLE_LINT_PAGE_SELECTORS = frozenset(['html', 'body', ':root'])
+
+# Spool-directory job queue
+SPOOL_DIRS = ('tmp', 'incoming', 'claimed', 'done', 'failed')
+SPOOL_JOB_FILE = "job.json"
+SPOOL_STATUS_FILE = "status.json"
+SPOOL_LEASE_FILE = "lease"
+SPOOL_ATTEMPTS_FILE = "attempts"
+SPOOL_JOB_OPTIONS = frozenset([
+    'style', 'title', 'margin', 'page_size', 'toc', 'merge', 'split_tables', 'reproducible'
+])
+DEFAULT_LEASE_TIMEOUT = 300.0
+DEFAULT_SPOOL_POLL_INTERVAL = 2.0
+DEFAULT_SPOOL_MAX_ATTEMPTS = 3
+
 # Style descriptions
 BUILTIN_STYLE_DESCRIPTIONS = {
     'default': 'Clean, readable style with good typography',
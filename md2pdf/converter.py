@@ -2,76 +2,532 @@
 Core Markdown to PDF conversion functionality.
 """
 
+import functools
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import markdown
 import weasyprint
+from weasyprint.urls import URLFetcher, URLFetcherResponse
 from pathlib import Path
-from typing import List, Optional
-from jinja2 import Template, TemplateError as JinjaTemplateError
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from jinja2 import (
+    Environment, FileSystemBytecodeCache, FileSystemLoader, Template,
+    TemplateError as JinjaTemplateError
+)
 
-from .utils import read_file_content, generate_toc_from_html
+from .archives import base_url_for, read_archive_url
+from .utils import read_file_content, read_files_ahead, generate_toc_from_html, get_source_date
+from .chunking import convert_markdown_parallel
+from .postprocess import split_long_tables
+from .css_prune import document_signature, prune_stylesheet
+from .draft import draft_extension_configs, draft_stylesheet
+from .estimate import (
+    html_features, load_model, page_area_ratio, predict, preview_page_target, truncate_to_pages
+)
 from .styles import get_builtin_style, load_custom_style
 from .constants import (
     MARKDOWN_EXTENSIONS_LIST, MARKDOWN_EXTENSION_CONFIGS,
-    DEFAULT_MARGIN, DEFAULT_PAGE_SIZE, DEFAULT_STYLE
+    DEFAULT_MARGIN, DEFAULT_PAGE_SIZE, DEFAULT_STYLE, DEFAULT_FSYNC, SPLIT_MIN_CHARS, READ_AHEAD_THREADS,
+    DRAFT_IMAGE_DPI, DRAFT_JPEG_QUALITY
 )
 from .exceptions import ConversionError, TemplateError, StyleError
-from .validators import sanitize_html, validate_css_file_path, validate_page_size
+from .validators import (
+    sanitize_html, validate_css_file_path, validate_page_size,
+    check_input_size, check_document_structure
+)
+from .limits import ResourceLimits, run_with_limits, HAS_RLIMIT
 from .logger import LoggerMixin
+from .cache import get_cache_dir
+from .output import write_file_atomic
+from .progress import ProgressCallback, ProgressReporter
+from .metrics import (
+    NULL_METRICS, MetricsCollector, cache_stats, cache_stats_since, merge_cache_stats, register_cache, tracked
+)
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+
+class ArchiveURLFetcher(URLFetcher):
+    """WeasyPrint URL fetcher reading ``file:`` URLs inside archives from the archive."""
+    
+    def fetch(self, url, headers=None):
+        member = read_archive_url(url)
+        if member is None:
+            return super().fetch(url, headers)
+        data, mime_type = member
+        return URLFetcherResponse(url, data, {'Content-Type': mime_type})
+
+
+@functools.lru_cache(maxsize=None)
+def load_html_template(name: str = "base.html") -> Template:
+    """
+    Load and compile an HTML template once per process.
+    
+    Compiled template bytecode is shared between processes through the
+    cache directory when it exists (see ``md2pdf warmup``).
+    
+    Args:
+        name: Template file name inside the templates directory
+        
+    Returns:
+        Compiled Jinja2 template
+        
+    Raises:
+        TemplateError: If the template cannot be loaded or compiled
+    """
+    bytecode_dir = get_cache_dir() / "jinja"
+    environment = Environment(
+        loader=FileSystemLoader(str(TEMPLATES_DIR)),
+        bytecode_cache=FileSystemBytecodeCache(str(bytecode_dir)) if bytecode_dir.is_dir() else None,
+        auto_reload=False
+    )
+    
+    try:
+        return environment.get_template(name)
+    except (IOError, OSError, JinjaTemplateError) as e:
+        raise TemplateError(f"Failed to load HTML template: {e}")
+
+
+register_cache('html_template', lambda: tuple(load_html_template.cache_info()[:2]))
 
 
 class MarkdownToPDFConverter(LoggerMixin):
-    """Main converter class for Markdown to PDF conversion."""
+    """
+    Main converter class for Markdown to PDF conversion.
+    
+    A converter instance is thread-safe and may be shared by a thread pool:
+    conversions keep their state in local variables, progress reporting is
+    tracked per thread, and the shared style and template caches are locked.
+    """
     
-    def __init__(self, verbose: bool = False):
-        """Initialize the converter with default settings."""
+    def __init__(
+        self,
+        verbose: bool = False,
+        markdown_extensions: Optional[List[str]] = None,
+        markdown_extension_configs: Optional[Dict[str, Dict]] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        metrics: Optional[MetricsCollector] = None
+    ):
+        """
+        Initialize the converter with default or overridden Markdown settings.
+        
+        Args:
+            verbose: Enable verbose logging
+            markdown_extensions: Markdown extension names to use instead of the defaults
+            markdown_extension_configs: Markdown extension configuration overrides
+            progress_callback: Receives progress event dicts for each stage, file and page
+            metrics: Collects conversion, stage, size and page metrics (default: none)
+        """
         super().__init__(verbose=verbose)
-        self.markdown_extensions = MARKDOWN_EXTENSIONS_LIST
-        self.markdown_extension_configs = MARKDOWN_EXTENSION_CONFIGS
+        self.progress_callback = progress_callback
+        self.metrics = metrics or NULL_METRICS
+        self._local = threading.local()
+        self.markdown_extensions = markdown_extensions or MARKDOWN_EXTENSIONS_LIST
+        self.markdown_extension_configs = (
+            markdown_extension_configs if markdown_extension_configs is not None
+            else MARKDOWN_EXTENSION_CONFIGS
+        )
     
+    @property
+    def progress(self) -> ProgressReporter:
+        """Progress reporter for the conversion running in the current thread."""
+        reporter = getattr(self._local, 'progress', None)
+        if reporter is None:
+            reporter = self._local.progress = ProgressReporter(self.progress_callback, self.metrics)
+        return reporter
+    
+    def __getstate__(self):
+        # Thread-local state stays behind when the converter is sent to a child process;
+        # the child records into a collector of its own (see _run_in_child)
+        state = self.__dict__.copy()
+        del state['_local']
+        state['metrics'] = MetricsCollector() if self.metrics.enabled else NULL_METRICS
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+    
+    @tracked
     def convert_files_to_pdf(
         self,
         input_files: List[Path],
-        output_path: Path,
-        style: Optional[str] = None,
+        output_path: Optional[Path],
+        style: Union[str, Sequence[str], None] = None,
         title: Optional[str] = None,
         margin: str = DEFAULT_MARGIN,
-        page_size: str = DEFAULT_PAGE_SIZE,
+        page_size: Union[str, Sequence[str]] = DEFAULT_PAGE_SIZE,
         generate_toc: bool = False,
         merge_files: bool = True,
-        verbose: bool = False
-    ) -> None:
+        verbose: bool = False,
+        split_large_files: bool = False,
+        jobs: Optional[int] = None,
+        limits: Optional[ResourceLimits] = None,
+        split_tables_at: Optional[int] = None,
+        skip_identical: bool = False,
+        fsync: str = DEFAULT_FSYNC,
+        reproducible: bool = False,
+        emit_html: Optional[Path] = None,
+        base_url: Optional[str] = None,
+        trusted_input: bool = False,
+        prune_css: bool = False,
+        preview_pages: Optional[int] = None,
+        draft: bool = False
+    ) -> List[Path]:
         """
         Convert Markdown files to PDF.
         
+        When several styles or page sizes are given, the Markdown is converted
+        once and every (style, page size) variant is rendered in parallel
+        processes to an output named after the variant, e.g. ``out-ibm-A4.pdf``.
+        
         Args:
             input_files: List of input Markdown file paths
-            output_path: Output PDF file path
-            style: Style name or path to custom CSS file
+            output_path: Output PDF file path (None to only emit HTML)
+            style: Style name or path to custom CSS file, or a list of them
             title: Document title (defaults to first heading or filename)
             margin: Page margins (e.g., "20mm")
-            page_size: Page size (A4, Letter, etc.)
+            page_size: Page size (A4, Letter, etc.), or a list of them
             generate_toc: Whether to generate table of contents
             merge_files: Whether to merge multiple files into one document
             verbose: Enable verbose output
+            split_large_files: Convert large inputs in parallel chunks split at top-level headings
+            jobs: Number of worker processes for split conversion and variants (defaults to the CPU count)
+            limits: Resource limits and timeouts for this conversion
+            split_tables_at: Split tables longer than this many rows into consecutive tables
+            skip_identical: Leave an existing output with identical contents untouched
+            fsync: Durability of the output write: "none", "file" or "full"
+            reproducible: Produce byte-identical output for identical inputs
+            emit_html: Also write the final HTML document here (see convert_html_file_to_pdf)
+            base_url: Base for relative asset URLs (defaults to the first input's directory)
+            trusted_input: Skip HTML sanitization (only for inputs you control)
+            prune_css: Drop style rules that cannot match any element of the document
+            preview_pages: Only convert enough inputs and content for this many pages,
+                and keep only these pages in the PDF
+            draft: Strip expensive visual effects from the styles, skip syntax
+                highlighting and embed images at low resolution
+            
+        Returns:
+            Paths of the PDF and HTML files produced
+            
+        Raises:
+            ResourceLimitError: If the document or conversion exceeds a limit
         """
+        if output_path is None and emit_html is None:
+            raise ConversionError("Nothing to do: no output path and no HTML output given")
+        
         if verbose:
             self.logger.info(f"Converting {len(input_files)} file(s) to PDF...")
         
-        # Validate page size
+        styles = [style] if style is None or isinstance(style, str) else list(style)
+        page_sizes = [page_size] if isinstance(page_size, str) else list(page_size)
+        
+        # Validate page sizes
+        try:
+            page_sizes = [validate_page_size(size) for size in page_sizes]
+        except ValueError as e:
+            raise ConversionError(f"Invalid page size: {e}")
+        
+        variants = plan_variants(styles, page_sizes)
+        limits = limits or ResourceLimits()
+        
+        # Fail fast on oversized inputs before reading them
+        check_input_size(input_files, limits.max_input_bytes)
+        
+        self._run_limited(functools.partial(
+            self._convert_files,
+            input_files=input_files,
+            output_path=output_path,
+            emit_html=emit_html,
+            variants=variants,
+            title=title,
+            margin=margin,
+            generate_toc=generate_toc,
+            merge_files=merge_files,
+            split_large_files=split_large_files,
+            jobs=jobs,
+            limits=limits,
+            split_tables_at=split_tables_at,
+            skip_identical=skip_identical,
+            fsync=fsync,
+            reproducible=reproducible,
+            base_url=base_url or base_url_for(input_files[0]),
+            trusted_input=trusted_input,
+            prune_css=prune_css,
+            preview_pages=preview_pages,
+            draft=draft
+        ), limits)
+        
+        outputs = []
+        for target in (output_path, emit_html):
+            if target is not None:
+                outputs.extend(variant_path(target, label) for _, _, label in variants)
+        if verbose:
+            for path in outputs:
+                self.logger.info(f"Created: {path}")
+        
+        return outputs
+    
+    @tracked
+    def convert_html_file_to_pdf(
+        self,
+        html_path: Path,
+        output_path: Path,
+        margin: str = DEFAULT_MARGIN,
+        page_size: str = DEFAULT_PAGE_SIZE,
+        base_url: Optional[str] = None,
+        limits: Optional[ResourceLimits] = None,
+        skip_identical: bool = False,
+        fsync: str = DEFAULT_FSYNC,
+        reproducible: bool = False
+    ) -> None:
+        """
+        Render an HTML document written by ``emit_html`` to PDF.
+        
+        Only the layout and write stages run: the document already carries its
+        styles, title and table of contents.
+        
+        Args:
+            html_path: HTML document produced by a previous conversion
+            output_path: Output PDF file path
+            margin: Page margins (e.g., "20mm")
+            page_size: Page size (A4, Letter, etc.)
+            base_url: Base for relative asset URLs (defaults to the HTML file's directory)
+            limits: Resource limits and timeouts for this conversion
+            skip_identical: Leave an existing output with identical contents untouched
+            fsync: Durability of the output write: "none", "file" or "full"
+            reproducible: Produce byte-identical output for identical inputs
+            
+        Raises:
+            ResourceLimitError: If the conversion exceeds a limit
+        """
         try:
             page_size = validate_page_size(page_size)
         except ValueError as e:
             raise ConversionError(f"Invalid page size: {e}")
         
+        limits = limits or ResourceLimits()
+        check_input_size([html_path], limits.max_input_bytes)
+        
+        self._run_limited(functools.partial(
+            self._convert_html_file,
+            html_path, output_path, margin, page_size, base_url or base_url_for(html_path),
+            skip_identical, fsync, reproducible
+        ), limits)
+    
+    def _convert_html_file(
+        self,
+        html_path: Path,
+        output_path: Path,
+        margin: str,
+        page_size: str,
+        base_url: str,
+        skip_identical: bool,
+        fsync: str,
+        reproducible: bool
+    ) -> None:
+        """Lay out a prebuilt HTML document; may execute inside a limited child process."""
+        self.progress.start([html_path])
+        self._html_to_pdf(
+            html_content=read_file_content(html_path),
+            output_path=output_path,
+            margin=margin,
+            page_size=page_size,
+            skip_identical=skip_identical,
+            fsync=fsync,
+            reproducible=reproducible,
+            base_url=base_url
+        )
+        # Only layout and write ran; keep the full-pipeline history intact
+        self.progress.finish(record_throughput=False)
+    
+    def _run_limited(self, convert: Callable[[], None], limits: ResourceLimits) -> None:
+        """Run a conversion directly, or in a resource-limited child process."""
+        if limits.isolated:
+            if limits.memory_limit_mb is not None and not HAS_RLIMIT:
+                self.logger.warning("Memory limits are not supported on this platform; ignoring")
+            self.logger.debug("Running conversion in a resource-limited child process")
+            recorded = run_with_limits(
+                functools.partial(self._run_in_child, convert),
+                timeout=limits.timeout,
+                memory_limit_mb=limits.memory_limit_mb
+            )
+            self.metrics.merge(recorded['metrics'])
+            merge_cache_stats(recorded['caches'])
+        else:
+            convert()
+    
+    def _run_in_child(self, convert: Callable[[], None]) -> Dict[str, Any]:
+        """Run a conversion in a limited child process; returns what it recorded, for the parent's metrics."""
+        # A forked child inherits the parent's collector with everything it
+        # has recorded so far; only this run's activity goes back
+        if self.metrics.enabled:
+            self.metrics = MetricsCollector()
+        caches = cache_stats()
+        convert()
+        return {'metrics': self.metrics.snapshot(), 'caches': cache_stats_since(caches)}
+    
+    def _convert_files(
+        self,
+        input_files: List[Path],
+        output_path: Optional[Path],
+        emit_html: Optional[Path],
+        variants: List[Tuple[Optional[str], str, Optional[str]]],
+        title: Optional[str],
+        margin: str,
+        generate_toc: bool,
+        merge_files: bool,
+        split_large_files: bool,
+        jobs: Optional[int],
+        limits: ResourceLimits,
+        split_tables_at: Optional[int],
+        skip_identical: bool,
+        fsync: str,
+        reproducible: bool,
+        base_url: str,
+        trusted_input: bool,
+        prune_css: bool,
+        preview_pages: Optional[int],
+        draft: bool
+    ) -> None:
+        """Run the conversion pipeline; may execute inside a limited child process."""
+        self.progress.start(input_files)
+        
+        # A preview needs enough content for the page size holding the most per page
+        preview_size = max((size for _, size, _ in variants), key=page_area_ratio)
+        
         # Read and convert Markdown files
-        html_content = self._process_markdown_files(input_files, merge_files)
+        with self.progress.stage('markdown'):
+            html_content = self._process_markdown_files(
+                input_files, merge_files, split_large_files=split_large_files and not preview_pages, jobs=jobs,
+                preview_pages=preview_pages, page_size=preview_size, draft=draft
+            )
+            if preview_pages:
+                html_content = truncate_to_pages(html_content, preview_page_target(preview_pages), preview_size)
+        
+        # Reject pathological documents before layout
+        check_document_structure(
+            html_content,
+            max_table_rows=limits.max_table_rows,
+            max_nesting_depth=limits.max_nesting_depth
+        )
+        
+        with self.progress.stage('document'):
+            body, title, toc_content = self._prepare_body(
+                html_content, title, generate_toc, input_files[0].stem, split_tables_at, trusted_input
+            )
+        
+        render_args = [
+            (body, title, toc_content, generate_toc, style, margin, page_size,
+             variant_path(output_path, label) if output_path else None,
+             skip_identical, fsync, reproducible,
+             variant_path(emit_html, label) if emit_html else None,
+             base_url, prune_css, preview_pages, draft, self.verbose)
+            for style, page_size, label in variants
+        ]
+        
+        if len(render_args) == 1:
+            self._render_body(*render_args[0][:-1])
+            # HTML-only runs skip layout and would skew the throughput history
+            self.progress.finish(record_throughput=output_path is not None)
+            return
+        
+        workers = min(jobs or os.cpu_count() or 1, len(render_args))
+        self.logger.debug(f"Rendering {len(render_args)} variants with {workers} worker(s)")
+        
+        # Styles, layout and writing repeat per variant in worker processes
+        with self.progress.stage('layout'):
+            if workers == 1:
+                for args in render_args:
+                    _render_variant(args)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(_render_variant, render_args))
+        
+        # Per-variant timings would skew the single-render throughput history
+        self.progress.finish(record_throughput=False)
+    
+    @tracked
+    def convert_html_to_pdf(
+        self,
+        html_content: str,
+        output_path: Optional[Path],
+        style: Optional[str] = None,
+        title: Optional[str] = None,
+        margin: str = DEFAULT_MARGIN,
+        page_size: str = DEFAULT_PAGE_SIZE,
+        generate_toc: bool = False,
+        fallback_title: str = "Document",
+        split_tables_at: Optional[int] = None,
+        skip_identical: bool = False,
+        fsync: str = DEFAULT_FSYNC,
+        reproducible: bool = False,
+        emit_html: Optional[Path] = None,
+        base_url: Optional[str] = None,
+        trusted_input: bool = False,
+        prune_css: bool = False,
+        draft: bool = False
+    ) -> bool:
+        """
+        Render an already converted HTML body to PDF.
+        
+        Args:
+            html_content: HTML body produced from Markdown
+            output_path: Output PDF file path (None to only emit HTML)
+            style: Style name or path to custom CSS file
+            title: Document title (defaults to first heading or fallback_title)
+            margin: Page margins (e.g., "20mm")
+            page_size: Page size (A4, Letter, etc.)
+            generate_toc: Whether to generate table of contents
+            fallback_title: Title used when none is given and no heading is found
+            split_tables_at: Split tables longer than this many rows into consecutive tables
+            skip_identical: Leave an existing output with identical contents untouched
+            fsync: Durability of the output write: "none", "file" or "full"
+            reproducible: Produce byte-identical output for identical inputs
+            emit_html: Also write the final HTML document here
+            base_url: Base for relative asset URLs
+            trusted_input: Skip HTML sanitization (only for inputs you control)
+            prune_css: Drop style rules that cannot match any element of the document
+            draft: Strip expensive visual effects from the style and embed images at low resolution
+            
+        Returns:
+            True if the PDF was written, False if it was identical and left
+            untouched or no PDF was requested
+        """
+        try:
+            page_size = validate_page_size(page_size)
+        except ValueError as e:
+            raise ConversionError(f"Invalid page size: {e}")
+        
+        with self.progress.stage('document'):
+            body, title, toc_content = self._prepare_body(
+                html_content, title, generate_toc, fallback_title, split_tables_at, trusted_input
+            )
+        
+        return self._render_body(
+            body, title, toc_content, generate_toc, style, margin, page_size,
+            output_path, skip_identical, fsync, reproducible, emit_html, base_url, prune_css, draft=draft
+        )
+    
+    def _prepare_body(
+        self,
+        html_content: str,
+        title: Optional[str],
+        generate_toc: bool,
+        fallback_title: str,
+        split_tables_at: Optional[int],
+        trusted_input: bool = False
+    ) -> Tuple[str, str, str]:
+        """Post-process the HTML body and derive its title and TOC; independent of style and page size."""
+        # Long tables lay out much faster as a run of shorter tables
+        if split_tables_at:
+            html_content = split_long_tables(html_content, split_tables_at)
         
         # Determine document title
         if not title:
-            title = self._extract_title_from_html(html_content) or input_files[0].stem
-        
-        # Load CSS styles
-        css_content = self._load_styles(style)
+            title = self._extract_title_from_html(html_content) or fallback_title
         
         # Generate table of contents if requested
         toc_content = ""
@@ -80,62 +536,156 @@ class MarkdownToPDFConverter(LoggerMixin):
             if toc_content:
                 self.logger.debug("Generated table of contents")
         
-        # Create final HTML document
-        final_html = self._create_html_document(
-            content=html_content,
-            css_content=css_content,
-            title=title,
-            toc_content=toc_content,
-            generate_toc=generate_toc
-        )
+        # Sanitize content for security; trusted sources skip the extra pass
+        if trusted_input:
+            return html_content, title, toc_content
+        return sanitize_html(html_content), title, toc_content
+    
+    def _render_body(
+        self,
+        body: str,
+        title: str,
+        toc_content: str,
+        generate_toc: bool,
+        style: Optional[str],
+        margin: str,
+        page_size: str,
+        output_path: Optional[Path],
+        skip_identical: bool,
+        fsync: str,
+        reproducible: bool,
+        html_path: Optional[Path] = None,
+        base_url: Optional[str] = None,
+        prune_css: bool = False,
+        max_pages: Optional[int] = None,
+        draft: bool = False
+    ) -> bool:
+        """Apply a style to a prepared body, optionally write the HTML, and render it to PDF."""
+        # Load CSS styles and create the final HTML document
+        with self.progress.stage('styles'):
+            css_content = self._load_styles(style)
+            if draft:
+                css_content = draft_stylesheet(css_content)
+            if prune_css:
+                css_content = self._prune_styles(css_content, body, toc_content, generate_toc)
+            final_html = self._create_html_document(
+                content=body,
+                css_content=css_content,
+                title=title,
+                toc_content=toc_content,
+                generate_toc=generate_toc
+            )
+        
+        # Intermediate HTML for a separate render stage (convert_html_file_to_pdf)
+        if html_path is not None:
+            write_file_atomic(html_path, final_html.encode('utf-8'), skip_identical=skip_identical, fsync=fsync)
+        
+        if output_path is None:
+            return False
         
         # Convert to PDF
-        self._html_to_pdf(
+        return self._html_to_pdf(
             html_content=final_html,
             output_path=output_path,
             margin=margin,
-            page_size=page_size
+            page_size=page_size,
+            skip_identical=skip_identical,
+            fsync=fsync,
+            reproducible=reproducible,
+            base_url=base_url,
+            max_pages=max_pages,
+            draft=draft
         )
-        
-        if verbose:
-            self.logger.info(f"PDF successfully created: {output_path}")
     
     def _process_markdown_files(
         self, 
         input_files: List[Path], 
-        merge_files: bool
+        merge_files: bool,
+        split_large_files: bool = False,
+        jobs: Optional[int] = None,
+        preview_pages: Optional[int] = None,
+        page_size: str = DEFAULT_PAGE_SIZE,
+        draft: bool = False
     ) -> str:
-        """Process Markdown files and convert to HTML."""
+        """Process Markdown files and convert to HTML, stopping early once a preview has enough."""
+        # Drafts skip Pygments highlighting
+        extension_configs = (
+            draft_extension_configs(self.markdown_extensions, self.markdown_extension_configs) if draft
+            else self.markdown_extension_configs
+        )
         md = markdown.Markdown(
             extensions=self.markdown_extensions,
-            extension_configs=self.markdown_extension_configs
+            extension_configs=extension_configs
         )
         
         html_parts = []
+        target = preview_page_target(preview_pages) if preview_pages else None
+        model = load_model() if target is not None else None
+        features: Dict[str, float] = {}
         
-        for i, file_path in enumerate(input_files):
-            self.logger.debug(f"Processing: {file_path}")
+        # Files are read ahead in threads so I/O overlaps with conversion
+        for file_path, content in read_files_ahead(input_files, READ_AHEAD_THREADS):
+            html_parts.append(self._convert_markdown_file(
+                md, file_path, content, split_large_files, jobs, extension_configs
+            ))
             
-            # Read file content
-            content = read_file_content(file_path)
-            
-            # Convert to HTML
+            if target is not None:
+                for name, value in html_features(html_parts[-1]).items():
+                    features[name] = features.get(name, 0) + value
+                if predict(features, page_size, model)['pages'] >= target:
+                    self.logger.debug(f"Preview has enough content after {file_path}; skipping the rest")
+                    break
+        
+        return self.join_html_parts(html_parts, merge_files)
+    
+    def _convert_markdown_file(
+        self,
+        md: markdown.Markdown,
+        file_path: Path,
+        content: str,
+        split_large_files: bool,
+        jobs: Optional[int],
+        extension_configs: Optional[Dict[str, Dict]] = None
+    ) -> str:
+        """Convert one file's Markdown content to HTML."""
+        self.logger.debug(f"Processing: {file_path}")
+        
+        # Convert to HTML, splitting large inputs across worker processes
+        if split_large_files and len(content) >= SPLIT_MIN_CHARS:
+            self.logger.debug(f"Splitting {file_path} for parallel conversion")
+            html = convert_markdown_parallel(
+                content,
+                self.markdown_extensions,
+                extension_configs if extension_configs is not None else self.markdown_extension_configs,
+                jobs=jobs
+            )
+        else:
             html = md.convert(content)
             
-            # For multiple input files, either visually merge with separators
-            # or force each file to start on a new page.
-            if i > 0:
-                if merge_files:
-                    html_parts.append('<div class="file-separator"></div>')
-                else:
-                    html_parts.append('<div class="page-break"></div>')
-            
-            html_parts.append(html)
-            
             # Reset markdown instance for next file
             md.reset()
         
-        return '\n'.join(html_parts)
+        self.progress.file_done(file_path, file_path.stat().st_size)
+        return html
+    
+    @staticmethod
+    def join_html_parts(html_parts: List[str], merge_files: bool) -> str:
+        """
+        Join per-file HTML fragments into a single document body.
+        
+        For multiple input files, either visually merge with separators
+        or force each file to start on a new page.
+        """
+        return MarkdownToPDFConverter.file_separator(merge_files).join(html_parts)
+    
+    @staticmethod
+    def file_separator(merge_files: bool) -> str:
+        """Markup placed between the HTML of consecutive input files."""
+        separator = (
+            '<div class="file-separator"></div>' if merge_files
+            else '<div class="page-break"></div>'
+        )
+        return f'\n{separator}\n'
     
     @staticmethod
     def _extract_title_from_html(html_content: str) -> Optional[str]:
@@ -169,6 +719,15 @@ class MarkdownToPDFConverter(LoggerMixin):
         except Exception as e:
             raise StyleError(f"Failed to load style '{style}': {e}")
     
+    def _prune_styles(self, css_content: str, body: str, toc_content: str, generate_toc: bool) -> str:
+        """Drop rules that match nothing in the body, the TOC or the page template."""
+        skeleton = self._create_html_document(
+            content='', css_content='', title='', toc_content='', generate_toc=generate_toc
+        )
+        pruned = prune_stylesheet(css_content, document_signature(body, toc_content, skeleton))
+        self.logger.debug(f"Pruned stylesheet from {len(css_content)} to {len(pruned)} characters")
+        return pruned
+    
     @staticmethod
     def _create_html_document(
         content: str,
@@ -177,25 +736,14 @@ class MarkdownToPDFConverter(LoggerMixin):
         toc_content: str,
         generate_toc: bool
     ) -> str:
-        """Create the final HTML document using the template."""
-        template_path = Path(__file__).parent / "templates" / "base.html"
-        
-        try:
-            with open(template_path, 'r', encoding='utf-8') as f:
-                template_content = f.read()
-        except (IOError, OSError) as e:
-            raise TemplateError(f"Failed to load HTML template: {e}")
+        """Create the final HTML document from a sanitized body using the template."""
+        template = load_html_template()
         
         try:
-            template = Template(template_content)
-            
-            # Sanitize content for security
-            sanitized_content = sanitize_html(content)
-            
             return template.render(
                 title=title,
                 css_content=css_content,
-                content=sanitized_content,
+                content=content,
                 toc_content=toc_content,
                 toc=generate_toc
             )
@@ -207,11 +755,19 @@ class MarkdownToPDFConverter(LoggerMixin):
         html_content: str,
         output_path: Path,
         margin: str,
-        page_size: str
-    ) -> None:
-        """Convert HTML to PDF using WeasyPrint."""
+        page_size: str,
+        skip_identical: bool = False,
+        fsync: str = DEFAULT_FSYNC,
+        reproducible: bool = False,
+        base_url: Optional[str] = None,
+        max_pages: Optional[int] = None,
+        draft: bool = False
+    ) -> bool:
+        """Convert HTML to PDF using WeasyPrint and write it atomically, keeping at most ``max_pages`` pages."""
         self.logger.debug("Converting HTML to PDF...")
         
+        source_date = get_source_date() if reproducible else None
+        
         # Configure CSS for page settings
         css_string = f"""
         @page {{
@@ -221,17 +777,114 @@ class MarkdownToPDFConverter(LoggerMixin):
         .page-break {{
             page-break-before: always;
         }}
+        /* Split tables: fixed layout at full width so the pieces' columns line up
+           (automatic layout would size each piece's columns from its own rows) */
+        table.table-split {{
+            table-layout: fixed;
+            width: 100%;
+        }}
+        table.table-continues {{
+            margin-bottom: 0;
+        }}
+        table.table-continued {{
+            margin-top: 0;
+        }}
         """
         
         try:
-            # Create WeasyPrint HTML object
-            html_doc = weasyprint.HTML(string=html_content)
+            # Create WeasyPrint HTML object; assets inside archive inputs are served from the archive
+            html_doc = weasyprint.HTML(string=html_content, base_url=base_url, url_fetcher=ArchiveURLFetcher())
             css_doc = weasyprint.CSS(string=css_string)
             
-            # Generate PDF
-            html_doc.write_pdf(
-                target=str(output_path),
-                stylesheets=[css_doc]
-            )
+            # Lay out pages, then generate the PDF
+            with self.progress.stage('layout'):
+                document = html_doc.render(stylesheets=[css_doc])
+            
+            if max_pages is not None and len(document.pages) > max_pages:
+                document = document.copy(document.pages[:max_pages])
+            
+            pdf_options = {}
+            if reproducible:
+                # Fixed dates and a content-derived file identifier instead of
+                # the current time and a random one
+                document.metadata.created = source_date
+                document.metadata.modified = source_date
+                digest = hashlib.sha256((css_string + html_content).encode('utf-8')).hexdigest()
+                pdf_options['pdf_identifier'] = digest[:32].encode('ascii')
+            if draft:
+                # Downsample and recompress embedded images
+                pdf_options.update(dpi=DRAFT_IMAGE_DPI, jpeg_quality=DRAFT_JPEG_QUALITY, optimize_images=True)
+            
+            with self.progress.stage('write'):
+                pdf_bytes = document.write_pdf(**pdf_options)
+            
+            self.metrics.observe('md2pdf_pdf_size_bytes', len(pdf_bytes))
+            self.metrics.observe('md2pdf_pdf_pages', len(document.pages))
+        except MemoryError:
+            raise
         except Exception as e:
             raise ConversionError(f"Failed to generate PDF: {e}")
+        
+        # Write to a temp file and rename so a crash never leaves a truncated PDF
+        written = write_file_atomic(output_path, pdf_bytes, skip_identical=skip_identical, fsync=fsync)
+        if not written:
+            self.logger.debug(f"Output unchanged, left untouched: {output_path}")
+        return written
+
+
+def plan_variants(
+    styles: List[Optional[str]],
+    page_sizes: List[str]
+) -> List[Tuple[Optional[str], str, Optional[str]]]:
+    """
+    Expand styles and page sizes into (style, page size, label) variants.
+    
+    Labels name the dimensions that vary, e.g. ``ibm-A4`` for several styles
+    and page sizes or ``Letter`` for page sizes only; a single variant has no
+    label. See :func:`variant_path`.
+    
+    Args:
+        styles: Style names or CSS file paths
+        page_sizes: Validated page sizes
+        
+    Returns:
+        Variants in style-major order
+        
+    Raises:
+        ConversionError: If two variants would get the same label
+    """
+    styles = list(dict.fromkeys(styles))
+    page_sizes = list(dict.fromkeys(page_sizes))
+    if len(styles) == 1 and len(page_sizes) == 1:
+        return [(styles[0], page_sizes[0], None)]
+    
+    variants = []
+    seen = set()
+    for style in styles:
+        for page_size in page_sizes:
+            labels = []
+            if len(styles) > 1:
+                labels.append(Path(style).stem if style and style.endswith('.css') else (style or DEFAULT_STYLE))
+            if len(page_sizes) > 1:
+                labels.append(page_size)
+            label = '-'.join(labels)
+            if label in seen:
+                raise ConversionError(f"Two variants would write the same file: {label}")
+            seen.add(label)
+            variants.append((style, page_size, label))
+    
+    return variants
+
+
+def variant_path(path: Path, label: Optional[str]) -> Path:
+    """Output path of a variant, e.g. ``manual.pdf`` -> ``manual-ibm-A4.pdf``."""
+    if label is None:
+        return path
+    return path.with_name(f"{path.stem}-{label}{path.suffix}")
+
+
+def _render_variant(args: Tuple) -> bool:
+    """Render one style/page-size variant of a prepared body; runs inside a worker process."""
+    *render_args, verbose = args
+    converter = MarkdownToPDFConverter(verbose=verbose)
+    return converter._render_body(*render_args)
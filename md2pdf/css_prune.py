@@ -0,0 +1,187 @@
+"""
+Removal of CSS rules that cannot match a document.
+
+WeasyPrint matches every rule against every element, so a style written for
+all documents costs more than the rules a document can actually use. Before
+rendering, the document's signature (the set of tag names, classes and ids it
+contains) is collected in one pass, and every rule whose selectors require a
+tag, class or id outside the signature is dropped. Structural relations,
+pseudo-classes and attribute selectors are not evaluated, so a kept rule may
+still not match; a dropped rule never could.
+
+Pruned stylesheets are cached in memory and, when the cache directory exists,
+on disk, keyed by the hashes of the stylesheet and the signature.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import FrozenSet, List, Tuple
+
+import tinycss2
+
+from . import __version__
+from .cache import get_cache_dir
+from .constants import CSS_PRUNE_CACHE_DIR, CSS_PRUNE_MEMORY_ENTRIES
+from .exceptions import ConversionError
+from .metrics import record_cache
+from .output import write_file_atomic
+
+_cache: 'OrderedDict[Tuple[str, str], str]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def document_signature(*html_parts: str) -> FrozenSet[str]:
+    """
+    Collect the tag names, classes and ids used by HTML documents or fragments.
+
+    Args:
+        html_parts: HTML to scan
+
+    Returns:
+        Signature with tags as ``div``, classes as ``.note`` and ids as ``#intro``
+    """
+    scanner = _SignatureScanner()
+    for html_content in html_parts:
+        scanner.feed(html_content)
+        scanner.close()
+        scanner.reset()
+    return frozenset(scanner.signature)
+
+
+def prune_stylesheet(css_content: str, signature: FrozenSet[str]) -> str:
+    """
+    Drop the rules of a stylesheet that no element in the signature can match.
+
+    At-rules are kept, except that ``@media`` and ``@supports`` blocks are
+    pruned recursively and dropped when nothing inside them is left.
+
+    Args:
+        css_content: Stylesheet to prune
+        signature: Output of :func:`document_signature`
+
+    Returns:
+        Pruned stylesheet
+    """
+    style_hash = hashlib.sha256(f"{__version__}\n{css_content}".encode('utf-8')).hexdigest()
+    signature_hash = hashlib.sha256('\n'.join(sorted(signature)).encode('utf-8')).hexdigest()
+    key = (style_hash, signature_hash)
+
+    with _cache_lock:
+        pruned = _cache.get(key)
+        if pruned is not None:
+            _cache.move_to_end(key)
+    record_cache('pruned_css', pruned is not None)
+    if pruned is not None:
+        return pruned
+
+    cache_path = get_cache_dir() / CSS_PRUNE_CACHE_DIR / f"{style_hash[:24]}-{signature_hash[:24]}.css"
+    try:
+        pruned = cache_path.read_text(encoding='utf-8')
+        record_cache('pruned_css_disk', True)
+    except OSError:
+        record_cache('pruned_css_disk', False)
+        pruned = _prune_rules(tinycss2.parse_stylesheet(css_content, skip_comments=True, skip_whitespace=True),
+                              signature)
+        _store_on_disk(cache_path, pruned)
+
+    with _cache_lock:
+        _cache[key] = pruned
+        while len(_cache) > CSS_PRUNE_MEMORY_ENTRIES:
+            _cache.popitem(last=False)
+    return pruned
+
+
+def _prune_rules(rules: list, signature: FrozenSet[str]) -> str:
+    """Serialize the rules of a rule list that can match the signature."""
+    kept = []
+    for rule in rules:
+        if rule.type == 'qualified-rule':
+            selectors = [tokens for tokens in _split_selectors(rule.prelude) if _may_match(tokens, signature)]
+            if selectors:
+                prelude = ', '.join(tinycss2.serialize(tokens).strip() for tokens in selectors)
+                kept.append(f"{prelude} {{{tinycss2.serialize(rule.content)}}}")
+        elif rule.type == 'at-rule':
+            if rule.lower_at_keyword in ('media', 'supports') and rule.content is not None:
+                inner = _prune_rules(
+                    tinycss2.parse_rule_list(rule.content, skip_comments=True, skip_whitespace=True), signature
+                )
+                if inner:
+                    kept.append(f"@{rule.at_keyword}{tinycss2.serialize(rule.prelude)}{{\n{inner}\n}}")
+            else:
+                kept.append(rule.serialize())
+    return '\n'.join(kept)
+
+
+def _split_selectors(prelude: list) -> List[list]:
+    """Split a selector list at its top-level commas."""
+    selectors: List[list] = [[]]
+    for token in prelude:
+        if token.type == 'literal' and token.value == ',':
+            selectors.append([])
+        else:
+            selectors[-1].append(token)
+    return [tokens for tokens in selectors if tokens]
+
+
+def _may_match(tokens: list, signature: FrozenSet[str]) -> bool:
+    """Whether every tag, class and id a selector requires occurs in the signature."""
+    previous = None
+    for index, token in enumerate(tokens):
+        required = None
+        if token.type == 'ident' and not _is_pseudo(previous):
+            if not (previous is not None and previous.type == 'literal' and previous.value == '.'):
+                required = token.lower_value
+        elif token.type == 'literal' and token.value == '.':
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+            if following is None or following.type != 'ident':
+                return True
+            required = '.' + following.value
+        elif token.type == 'hash':
+            required = '#' + token.value
+        elif token.type == 'literal' and token.value == '|':
+            # Namespaced selectors are rare enough to keep as they are
+            return True
+        if required is not None and required not in signature:
+            return False
+        previous = token
+    return True
+
+
+def _is_pseudo(token) -> bool:
+    """Whether a token introduces a pseudo-class or pseudo-element name."""
+    return token is not None and token.type == 'literal' and token.value == ':'
+
+
+def _store_on_disk(path: Path, pruned: str) -> None:
+    """Persist a pruned stylesheet when the cache directory exists."""
+    if not path.parent.parent.is_dir():
+        return
+    try:
+        path.parent.mkdir(exist_ok=True)
+        write_file_atomic(path, pruned.encode('utf-8'), fsync='none')
+    except (OSError, ConversionError):
+        pass
+
+
+class _SignatureScanner(HTMLParser):
+    """Single-pass scanner collecting tag names, classes and ids."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.signature = set()
+
+    def handle_starttag(self, tag, attrs):
+        self.signature.add(tag)
+        for name, value in attrs:
+            if not value:
+                continue
+            if name == 'class':
+                self.signature.update('.' + cls for cls in value.split())
+            elif name == 'id':
+                self.signature.add('#' + value)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
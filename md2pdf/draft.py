@@ -0,0 +1,146 @@
+"""
+Draft rendering: cheap variants of styles and Markdown settings.
+
+Gradients, shadows, rounded borders, background images and web fonts cost
+WeasyPrint drawing time and PDF size without changing the layout much. A
+draft stylesheet keeps every rule but drops those effects; a gradient or image
+background is replaced by its first color so colored blocks stay
+recognizable, and gradient-filled text (``background-clip: text``) falls back
+to its plain color. Draft conversions also skip Pygments highlighting and
+embed images at low resolution (see ``DRAFT_IMAGE_DPI``).
+"""
+
+import functools
+import re
+from typing import Dict, List, Optional, Sequence
+
+import tinycss2
+import tinycss2.color3
+
+from .constants import CODE_LANG_EXTENSION, DRAFT_DROPPED_AT_RULES, DRAFT_DROPPED_PROPERTIES
+from .metrics import register_cache
+
+VENDOR_PREFIX_RE = re.compile(r'^-[a-z]+-')
+CLIP_PROPERTIES = frozenset(['background-clip', '-webkit-background-clip'])
+CLIP_TEXT_PROPERTIES = frozenset(['background', '-webkit-text-fill-color']) | CLIP_PROPERTIES
+RULE_LIST_AT_RULES = frozenset(['media', 'supports', 'document', 'layer', 'container'])
+
+
+@functools.lru_cache(maxsize=32)
+def draft_stylesheet(css_content: str) -> str:
+    """
+    Remove expensive visual effects from a stylesheet.
+
+    Args:
+        css_content: Stylesheet of a built-in, YAML or custom style
+
+    Returns:
+        Stylesheet without gradients, shadows, border-radius, background
+        images, ``@font-face`` and ``@import`` rules
+    """
+    rules = tinycss2.parse_stylesheet(css_content, skip_comments=True, skip_whitespace=True)
+    return '\n'.join(_draft_rules(rules))
+
+
+register_cache('draft_style', lambda: tuple(draft_stylesheet.cache_info()[:2]))
+
+
+def draft_extension_configs(
+    extensions: Sequence[str],
+    extension_configs: Dict[str, Dict]
+) -> Dict[str, Dict]:
+    """
+    Markdown extension configuration that skips Pygments highlighting.
+
+    Args:
+        extensions: Markdown extension names in use
+        extension_configs: Configuration to derive from (left unchanged)
+
+    Returns:
+        Copy of the configuration with ``use_pygments`` disabled for codehilite
+        and no language guessing for unlabeled code blocks
+    """
+    configs = dict(extension_configs)
+    for name in extensions:
+        if isinstance(name, str) and name.rsplit('.', 1)[-1] == 'codehilite':
+            configs[name] = {**configs.get(name, {}), 'use_pygments': False}
+        elif name == CODE_LANG_EXTENSION:
+            configs[name] = {**configs.get(name, {}), 'policy': 'plain'}
+    return configs
+
+
+def _draft_rules(rules: list) -> List[str]:
+    """Serialize a rule list without its expensive effects."""
+    kept = []
+    for rule in rules:
+        if rule.type == 'qualified-rule':
+            kept.append(f"{tinycss2.serialize(rule.prelude).strip()} {{{_draft_block(rule.content)}}}")
+        elif rule.type == 'at-rule':
+            keyword = rule.lower_at_keyword
+            if keyword in DRAFT_DROPPED_AT_RULES:
+                continue
+            if rule.content is None:
+                kept.append(rule.serialize())
+            elif keyword in RULE_LIST_AT_RULES:
+                inner = _draft_rules(
+                    tinycss2.parse_rule_list(rule.content, skip_comments=True, skip_whitespace=True)
+                )
+                kept.append(f"@{rule.at_keyword}{tinycss2.serialize(rule.prelude)}{{\n" + '\n'.join(inner) + "\n}")
+            else:
+                # @page and its margin boxes hold declarations
+                kept.append(f"@{rule.at_keyword}{tinycss2.serialize(rule.prelude)}{{{_draft_block(rule.content)}}}")
+    return kept
+
+
+def _draft_block(content: list) -> str:
+    """Serialize the declarations and nested rules of a block without expensive effects."""
+    items = tinycss2.parse_blocks_contents(content, skip_comments=True, skip_whitespace=True)
+    clip_text = any(
+        item.type == 'declaration' and item.lower_name in CLIP_PROPERTIES
+        and any(token.type == 'ident' and token.lower_value == 'text' for token in item.value)
+        for item in items
+    )
+
+    parts = []
+    for item in items:
+        if item.type != 'declaration':
+            parts.extend(_draft_rules([item]))
+            continue
+
+        name = item.lower_name
+        if VENDOR_PREFIX_RE.sub('', name) in DRAFT_DROPPED_PROPERTIES:
+            continue
+        if clip_text and name in CLIP_TEXT_PROPERTIES:
+            continue
+        value = tinycss2.serialize(item.value).strip()
+        if name == 'background' and _has_image(item.value):
+            color = _first_color(item.value)
+            if color is None:
+                continue
+            name, value = 'background-color', color
+        parts.append(f"{name}: {value}{' !important' if item.important else ''};")
+    return ' '.join(parts)
+
+
+def _has_image(tokens: list) -> bool:
+    """Whether a background value paints a gradient or an image."""
+    return any(
+        token.type == 'url'
+        or (token.type == 'function' and (token.lower_name == 'url' or token.lower_name.endswith('gradient')))
+        for token in tokens
+    )
+
+
+def _first_color(tokens: list) -> Optional[str]:
+    """First color of a background value, looking inside gradients when needed."""
+    for token in tokens:
+        if token.type != 'function' and tinycss2.color3.parse_color(token) is not None:
+            return tinycss2.serialize([token])
+    for token in tokens:
+        if token.type == 'function' and token.lower_name.endswith('gradient'):
+            color = _first_color(token.arguments)
+            if color is not None:
+                return color
+        elif token.type == 'function' and tinycss2.color3.parse_color(token) is not None:
+            return tinycss2.serialize([token])
+    return None
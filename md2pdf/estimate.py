@@ -0,0 +1,352 @@
+"""
+Preflight estimates of page count, render time and peak memory.
+
+Only the cheap stages run (reading, Markdown conversion, style loading); the
+prediction is a linear model over statistics of the resulting HTML. The
+built-in coefficients are rough; ``md2pdf calibrate`` fits them to recorded
+runs (see :func:`measure_conversion` and ``benchmarks/run.py estimate``) and
+stores the model in the cache directory.
+"""
+
+import json
+import math
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .cache import get_cache_dir
+from .constants import (
+    DEFAULT_ESTIMATE_MODEL, ESTIMATE_FEATURES, ESTIMATE_MODEL_FILE, ESTIMATE_TARGETS,
+    DEFAULT_MARGIN, DEFAULT_PAGE_SIZE, PREVIEW_PAGE_SLACK
+)
+from .draft import draft_stylesheet
+from .exceptions import Md2PdfError
+from .validators import validate_page_size
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TAG_RE = re.compile(r'<[^>]+>')
+PRE_RE = re.compile(r'<pre\b.*?</pre>', re.DOTALL | re.IGNORECASE)
+TABLE_ROW_RE = re.compile(r'<tr\b', re.IGNORECASE)
+IMAGE_RE = re.compile(r'<img\b', re.IGNORECASE)
+BLOCK_RE = re.compile(r'<(?:p|li|h[1-6]|blockquote|dt|dd)\b', re.IGNORECASE)
+# Block starts at the beginning of a line, where a preview may cut the document
+CUT_POINT_RE = re.compile(r'\n(?=<(?:h[1-6]|p|pre|table|ul|ol|dl|blockquote|div|hr)\b)', re.IGNORECASE)
+
+# Page dimensions in millimetres for sizes outside the A and B series
+NAMED_PAGE_SIZES_MM = {
+    'Letter': (215.9, 279.4),
+    'Legal': (215.9, 355.6),
+    'Ledger': (279.4, 431.8),
+    'Tabloid': (279.4, 431.8),
+    'Executive': (184.15, 266.7),
+}
+
+
+def html_features(html_content: str, css_content: str = "") -> Dict[str, float]:
+    """
+    Collect the document statistics the model is built on.
+
+    Args:
+        html_content: HTML body produced from Markdown
+        css_content: Stylesheet that will be applied
+
+    Returns:
+        Feature name to value
+    """
+    code_blocks = PRE_RE.findall(html_content)
+    return {
+        'text_chars': len(TAG_RE.sub('', html_content)),
+        'blocks': len(BLOCK_RE.findall(html_content)),
+        'table_rows': len(TABLE_ROW_RE.findall(html_content)),
+        'code_lines': sum(block.count('\n') + 1 for block in code_blocks),
+        'images': len(IMAGE_RE.findall(html_content)),
+        'css_bytes': len(css_content),
+    }
+
+
+def page_area_ratio(page_size: str) -> float:
+    """Content scale relative to A4: how many A4 pages of content fit on one page."""
+    return _page_area(page_size) / _page_area('A4')
+
+
+def load_model() -> Dict[str, Any]:
+    """Load the calibrated model from the cache directory, or the built-in one."""
+    try:
+        with open(get_cache_dir() / ESTIMATE_MODEL_FILE, 'r', encoding='utf-8') as f:
+            model = json.load(f)
+        if all(target in model.get('coefficients', {}) for target in ESTIMATE_TARGETS):
+            return model
+    except (OSError, ValueError):
+        pass
+    return {'source': 'default', 'coefficients': DEFAULT_ESTIMATE_MODEL}
+
+
+def predict(features: Dict[str, float], page_size: str, model: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Predict pages, seconds and peak memory for a document.
+
+    Args:
+        features: Output of :func:`html_features`
+        page_size: Page size the document will be rendered at
+        model: Model to use (defaults to :func:`load_model`)
+
+    Returns:
+        Predictions plus the model source
+    """
+    model = model or load_model()
+    coefficients = model['coefficients']
+    scaled = _page_scaled(features, page_size)
+
+    pages = _apply(coefficients['pages'], scaled)
+    return {
+        'pages': max(1, round(pages)),
+        'seconds': round(max(_apply(coefficients['seconds'], features), 0.0), 3),
+        'peak_memory_mb': round(max(_apply(coefficients['peak_memory_mb'], features), 0.0), 1),
+        'model': model.get('source', 'calibrated'),
+    }
+
+
+def preview_page_target(pages: int) -> int:
+    """Pages of content to keep for a preview of ``pages`` pages, allowing for estimate error."""
+    return math.ceil(pages * PREVIEW_PAGE_SLACK) + 1
+
+
+def truncate_to_pages(html_content: str, pages: int, page_size: str) -> str:
+    """
+    Cut an HTML body at a block boundary once it holds about ``pages`` pages.
+
+    Args:
+        html_content: HTML body produced from Markdown
+        pages: Pages of content to keep (see :func:`preview_page_target`)
+        page_size: Page size the document will be rendered at
+
+    Returns:
+        The leading part of the body (all of it if it is short enough)
+    """
+    model = load_model()
+    if predict(html_features(html_content), page_size, model)['pages'] <= pages:
+        return html_content
+
+    cuts = [match.start() for match in CUT_POINT_RE.finditer(html_content)] + [len(html_content)]
+    # Binary search for the shortest prefix predicted to fill the pages
+    low, high = 0, len(cuts) - 1
+    while low < high:
+        middle = (low + high) // 2
+        if predict(html_features(html_content[:cuts[middle]]), page_size, model)['pages'] >= pages:
+            high = middle
+        else:
+            low = middle + 1
+    return html_content[:cuts[low]]
+
+
+def estimate_conversion(
+    input_files: List[Path],
+    style: Optional[str] = None,
+    page_size: str = DEFAULT_PAGE_SIZE,
+    merge_files: bool = True,
+    converter=None,
+    draft: bool = False
+) -> Dict[str, Any]:
+    """
+    Estimate a conversion without laying it out.
+
+    Args:
+        input_files: Markdown files to convert
+        style: Style name or path to custom CSS file
+        page_size: Page size (A4, Letter, etc.)
+        merge_files: Whether files are merged into one document
+        converter: Converter whose Markdown settings are used (defaults to a new one)
+        draft: Estimate a ``--draft`` conversion (no highlighting, plain style)
+
+    Returns:
+        JSON-serialisable dict with ``pages``, ``seconds``, ``peak_memory_mb``,
+        ``model``, ``features`` and the wall time the estimate itself took
+    """
+    from .converter import MarkdownToPDFConverter
+
+    page_size = validate_page_size(page_size)
+    converter = converter or MarkdownToPDFConverter()
+
+    started = time.perf_counter()
+    html_content = converter._process_markdown_files(input_files, merge_files, draft=draft)
+    css_content = converter._load_styles(style)
+    if draft:
+        css_content = draft_stylesheet(css_content)
+    features = html_features(html_content, css_content)
+
+    result = predict(features, page_size)
+    result.update(
+        page_size=page_size,
+        features=features,
+        estimate_seconds=round(time.perf_counter() - started, 3),
+    )
+    return result
+
+
+def measure_conversion(
+    input_files: List[Path],
+    output_path: Path,
+    style: Optional[str] = None,
+    page_size: str = DEFAULT_PAGE_SIZE,
+    margin: str = DEFAULT_MARGIN
+) -> Dict[str, Any]:
+    """
+    Run a full conversion in a fresh process and record what it cost.
+
+    The record holds the model features next to the observed page count,
+    wall time and peak memory; :func:`calibrate` fits the model to such
+    records.
+
+    Args:
+        input_files: Markdown files to convert
+        output_path: Output PDF file path
+        style: Style name or path to custom CSS file
+        page_size: Page size (A4, Letter, etc.)
+        margin: Page margins
+
+    Returns:
+        Calibration record
+    """
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(
+            _measure_child, input_files, output_path, style, page_size, margin
+        ).result()
+
+
+def calibrate(records: List[Dict[str, Any]], save: bool = True) -> Dict[str, Any]:
+    """
+    Fit the model to recorded conversions.
+
+    Args:
+        records: Records from :func:`measure_conversion`; other records are ignored
+        save: Store the model in the cache directory (created if needed)
+
+    Returns:
+        The fitted model
+
+    Raises:
+        Md2PdfError: If there are too few usable records
+    """
+    usable = [r for r in records if 'features' in r]
+    coefficients = {}
+    for target in ESTIMATE_TARGETS:
+        measured = [r for r in usable if r.get(target) is not None]
+        if len(measured) < len(ESTIMATE_FEATURES) + 1:
+            if target == 'pages':
+                raise Md2PdfError(
+                    f"Calibration needs at least {len(ESTIMATE_FEATURES) + 1} measured runs, got {len(measured)}"
+                )
+            # e.g. peak memory is not measurable on Windows
+            coefficients[target] = DEFAULT_ESTIMATE_MODEL[target]
+            continue
+
+        rows = []
+        for record in measured:
+            features = record['features']
+            if target == 'pages':
+                features = _page_scaled(features, record.get('page_size', DEFAULT_PAGE_SIZE))
+            rows.append([1.0] + [float(features.get(name, 0)) for name in ESTIMATE_FEATURES])
+        weights = _least_squares(rows, [float(record[target]) for record in measured])
+        coefficients[target] = dict(zip(['intercept', *ESTIMATE_FEATURES], weights))
+
+    model = {'source': 'calibrated', 'records': len(usable), 'calibrated_at': round(time.time()),
+             'coefficients': coefficients}
+
+    if save:
+        cache_dir = get_cache_dir()
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_dir / ESTIMATE_MODEL_FILE, 'w', encoding='utf-8') as f:
+            json.dump(model, f, indent=2)
+
+    return model
+
+
+def _measure_child(input_files, output_path, style, page_size, margin) -> Dict[str, Any]:
+    """Measure one conversion; runs in a fresh worker process so peak memory is its own."""
+    from .converter import MarkdownToPDFConverter
+
+    pages = []
+    converter = MarkdownToPDFConverter(progress_callback=lambda event: pages.append(event['pages']))
+    html_content = converter._process_markdown_files(input_files, True)
+    features = html_features(html_content, converter._load_styles(style))
+
+    started = time.perf_counter()
+    converter.convert_files_to_pdf(input_files, output_path, style=style, page_size=page_size, margin=margin)
+    seconds = time.perf_counter() - started
+
+    return {
+        'features': features,
+        'page_size': page_size,
+        'pages': pages[-1] if pages and pages[-1] else None,
+        'seconds': round(seconds, 3),
+        'peak_memory_mb': _peak_memory_mb(),
+    }
+
+
+def _peak_memory_mb() -> Optional[float]:
+    """Peak resident memory of this process in MiB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _page_area(page_size: str) -> float:
+    """Area of a page size in square millimetres."""
+    if page_size in NAMED_PAGE_SIZES_MM:
+        width, height = NAMED_PAGE_SIZES_MM[page_size]
+        return width * height
+    series, index = page_size[0], int(page_size[1:])
+    # A0 is 1 m², B0 is sqrt(2) m²; each step halves the area
+    base = 1_000_000 if series == 'A' else 1_414_214
+    return base / (2 ** index)
+
+
+def _page_scaled(features: Dict[str, float], page_size: str) -> Dict[str, float]:
+    """Express content features in A4-page equivalents for the page model."""
+    ratio = page_area_ratio(page_size)
+    return {name: value / ratio for name, value in features.items()}
+
+
+def _apply(coefficients: Dict[str, float], features: Dict[str, float]) -> float:
+    """Evaluate a linear model."""
+    return coefficients.get('intercept', 0.0) + sum(
+        coefficients.get(name, 0.0) * features.get(name, 0) for name in ESTIMATE_FEATURES
+    )
+
+
+def _least_squares(rows: List[List[float]], values: List[float], ridge: float = 1e-6) -> List[float]:
+    """Solve a small ridge-regularised least-squares problem via the normal equations."""
+    size = len(rows[0])
+    # Scale columns so the ridge term treats features of different magnitude alike
+    scales = [max(abs(row[j]) for row in rows) or 1.0 for j in range(size)]
+    scaled = [[row[j] / scales[j] for j in range(size)] for row in rows]
+
+    matrix = [[sum(r[i] * r[j] for r in scaled) + (ridge if i == j else 0.0) for j in range(size)]
+              for i in range(size)]
+    vector = [sum(r[i] * v for r, v in zip(scaled, values)) for i in range(size)]
+
+    # Gaussian elimination with partial pivoting
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(matrix[r][col]))
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        vector[col], vector[pivot] = vector[pivot], vector[col]
+        for r in range(col + 1, size):
+            factor = matrix[r][col] / matrix[col][col]
+            for c in range(col, size):
+                matrix[r][c] -= factor * matrix[col][c]
+            vector[r] -= factor * vector[col]
+
+    solution = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        solution[r] = (vector[r] - sum(matrix[r][c] * solution[c] for c in range(r + 1, size))) / matrix[r][r]
+
+    return [weight / scale for weight, scale in zip(solution, scales)]
@@ -30,4 +30,19 @@ class TemplateError(Md2PdfError):
 
 class SecurityError(Md2PdfError):
     """Raised when security validation fails."""
-    pass
\ No newline at end of file
+    pass
+
+
+class BuildError(Md2PdfError):
+    """Raised when a build file is invalid or a project build fails."""
+    pass
+
+
+class ResourceLimitError(Md2PdfError):
+    """Raised when a document exceeds a configured resource limit or timeout."""
+    pass
+
+
+class SpoolError(Md2PdfError):
+    """Raised when a spool job is invalid or cannot be queued."""
+    pass
@@ -0,0 +1,145 @@
+"""
+Per-conversion resource limits.
+
+Pre-flight limits (input size, table rows, nesting depth) reject pathological
+documents before layout starts. Wall-clock timeouts and memory caps run the
+conversion in a child process so a runaway render can be stopped without
+taking the calling worker down with it. The child leads a process group of
+its own, so the worker processes it starts are stopped along with it.
+"""
+
+import multiprocessing
+import os
+import signal
+from typing import Any, Callable, Optional
+
+from .exceptions import ConversionError, ResourceLimitError
+
+try:
+    import resource
+    HAS_RLIMIT = True
+except ImportError:  # Windows
+    resource = None
+    HAS_RLIMIT = False
+
+
+class ResourceLimits:
+    """Limits applied to a single conversion; ``None`` disables a limit."""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        memory_limit_mb: Optional[int] = None,
+        max_input_bytes: Optional[int] = None,
+        max_table_rows: Optional[int] = None,
+        max_nesting_depth: Optional[int] = None
+    ):
+        """
+        Initialize resource limits.
+
+        Args:
+            timeout: Wall-clock limit for the whole conversion in seconds
+            memory_limit_mb: Address-space cap for the conversion process in MiB
+            max_input_bytes: Maximum combined size of the input files
+            max_table_rows: Maximum number of rows in a single table
+            max_nesting_depth: Maximum nesting of lists, blockquotes and tables
+        """
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_input_bytes = max_input_bytes
+        self.max_table_rows = max_table_rows
+        self.max_nesting_depth = max_nesting_depth
+
+    @property
+    def isolated(self) -> bool:
+        """Whether the conversion must run in a child process."""
+        return self.timeout is not None or self.memory_limit_mb is not None
+
+
+def run_with_limits(
+    func: Callable[[], Any],
+    timeout: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None
+) -> Any:
+    """
+    Run ``func`` in a child process with a wall-clock timeout and memory cap.
+
+    Args:
+        func: Picklable callable taking no arguments
+        timeout: Seconds to wait before the child and its process group are killed
+        memory_limit_mb: Address-space limit for the child in MiB
+
+    Returns:
+        What ``func`` returned (sent back through a pipe, so it must be picklable)
+
+    Raises:
+        ResourceLimitError: If the child times out or exceeds its memory cap
+        Md2PdfError: Re-raised from the child if the conversion fails
+    """
+    context = multiprocessing.get_context()
+    receiver, sender = context.Pipe(duplex=False)
+    # Not a daemon: the conversion may start its own worker pool
+    process = context.Process(target=_run_child, args=(sender, func, memory_limit_mb))
+    process.start()
+    sender.close()
+
+    try:
+        if not receiver.poll(timeout):
+            raise ResourceLimitError(f"Conversion exceeded the time limit of {timeout:g}s")
+        try:
+            status, value = receiver.recv()
+        except EOFError:
+            # The child died without reporting (killed, or crashed in native code)
+            process.join()
+            if memory_limit_mb is not None:
+                raise ResourceLimitError(
+                    f"Conversion process terminated (exit code {process.exitcode}), "
+                    f"likely exceeding the memory limit of {memory_limit_mb} MiB"
+                )
+            raise ConversionError(f"Conversion process terminated unexpectedly (exit code {process.exitcode})")
+    finally:
+        # Until it is joined the child's pid cannot be reused, so its group is still its own
+        _kill_process_group(process.pid)
+        if process.is_alive():
+            process.kill()
+        process.join()
+        receiver.close()
+
+    if status == 'error':
+        raise value
+    return value
+
+
+def _kill_process_group(pgid: int) -> None:
+    """Kill what is left of a limited child's process group (its worker pools)."""
+    if not hasattr(os, 'killpg'):
+        return
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        # The group is empty, or the child had not started its own group yet
+        pass
+
+
+def _run_child(sender, func: Callable[[], Any], memory_limit_mb: Optional[int]) -> None:
+    """Child process entry point: start a process group, apply the memory cap, run, report the outcome."""
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    if memory_limit_mb is not None and HAS_RLIMIT:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    try:
+        outcome = ('ok', func())
+    except MemoryError:
+        outcome = ('error', ResourceLimitError(f"Conversion exceeded the memory limit of {memory_limit_mb} MiB"))
+    except Exception as e:
+        outcome = ('error', e)
+
+    try:
+        sender.send(outcome)
+    except Exception:
+        # The original exception may not be picklable
+        sender.send(('error', ConversionError(str(outcome[1]))))
+    finally:
+        sender.close()
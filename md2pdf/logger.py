@@ -1,16 +1,27 @@
 """
 Logging configuration for md2pdf.
+
+Logger setup is thread-safe and idempotent: each named logger gets exactly one
+md2pdf handler, no matter how many converters are created or from how many
+threads.
 """
 
 import logging
 import sys
+import threading
 from typing import Optional
 
+_setup_lock = threading.Lock()
+
 
 def setup_logger(name: str = 'md2pdf', verbose: bool = False) -> logging.Logger:
     """
     Set up and configure logger for md2pdf.
     
+    Repeated calls reuse the handler installed by the first call and only
+    adjust its level and format; handlers added by the application are left
+    untouched.
+    
     Args:
         name: Logger name
         verbose: Whether to enable verbose (DEBUG) logging
@@ -19,28 +30,32 @@ def setup_logger(name: str = 'md2pdf', verbose: bool = False) -> logging.Logger:
         Configured logger instance
     """
     logger = logging.getLogger(name)
-    
-    # Remove existing handlers to avoid duplicates
-    logger.handlers.clear()
-    
-    # Set log level
     level = logging.DEBUG if verbose else logging.INFO
-    logger.setLevel(level)
-    
-    # Create console handler
-    handler = logging.StreamHandler(sys.stderr)
-    handler.setLevel(level)
     
-    # Create formatter
-    if verbose:
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
-        )
-    else:
-        formatter = logging.Formatter('%(levelname)s: %(message)s')
-    
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    with _setup_lock:
+        handler = next((h for h in logger.handlers if getattr(h, 'md2pdf_handler', False)), None)
+        
+        if handler is None:
+            # Create console handler
+            handler = logging.StreamHandler(sys.stderr)
+            handler.md2pdf_handler = True
+            logger.addHandler(handler)
+        elif logger.level == level:
+            return logger
+        
+        # Set log level
+        logger.setLevel(level)
+        handler.setLevel(level)
+        
+        # Create formatter
+        if verbose:
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
+            )
+        else:
+            formatter = logging.Formatter('%(levelname)s: %(message)s')
+        
+        handler.setFormatter(formatter)
     
     return logger
 
@@ -55,4 +70,4 @@ class LoggerMixin:
             name=f'md2pdf.{self.__class__.__name__}',
             verbose=verbose
         )
-        self.verbose = verbose
\ No newline at end of file
+        self.verbose = verbose
@@ -0,0 +1,299 @@
+"""
+Markdown extension choosing the language of unlabeled code blocks.
+
+Codehilite asks Pygments to guess the language of every code block without
+one, and ``guess_lexer`` tries every lexer in turn, which costs far more than
+highlighting a labeled block. This extension turns codehilite's guessing off
+(``guess_lang`` is false in ``MARKDOWN_EXTENSION_CONFIGS``) and labels
+unlabeled fenced and indented blocks itself, following a policy:
+
+``guess``
+    Pygments' ``guess_lexer`` for every block (codehilite's own behaviour)
+``memoized``
+    The same guess, remembered by the hash of the block's code (in memory and,
+    when the cache directory exists, across runs; the memo file is compacted
+    to the most recently used entries as it grows)
+``heuristic``
+    A few regular expressions covering common languages; other blocks stay plain
+``plain``
+    No guessing; unlabeled blocks are plain text
+
+The extension is named by its module path (``md2pdf.markdown_ext``) in the
+extension list, so configurations stay picklable for worker processes.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.preprocessors import Preprocessor
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import AtomicString
+
+from .cache import get_cache_dir
+from .constants import (
+    CODE_LANG_EXTENSION, CODE_LANG_GUESS_POLICIES, CODE_LANG_MEMO_COMPACT_FACTOR, CODE_LANG_MEMO_ENTRIES,
+    CODE_LANG_MEMO_FILE, DEFAULT_CODE_LANG_GUESS
+)
+from .exceptions import Md2PdfError
+from .metrics import record_cache
+from .output import write_file_atomic
+
+# Every fenced block, labeled or not, so closing fences are never taken for openers
+FENCED_BLOCK_RE = re.compile(
+    r'^(?P<fence>~{3,}|`{3,})(?P<info>[^\n]*)\n(?P<code>.*?)(?<=\n)(?P=fence)[ ]*$',
+    re.MULTILINE | re.DOTALL
+)
+# Header lines codehilite reads from indented blocks (":::python", "#!/bin/sh")
+CODE_HEADER_RE = re.compile(r'^(?::::|#!)')
+
+# Checked in order on the first lines of a block; the first match wins
+HEURISTIC_RULES = [
+    ('python', re.compile(r'^#!.*\bpython', re.MULTILINE)),
+    ('bash', re.compile(r'^#!.*\b(?:ba|z)?sh\b', re.MULTILINE)),
+    ('console', re.compile(r'^\$ \S', re.MULTILINE)),
+    ('xml', re.compile(r'^\s*<\?xml\b')),
+    ('html', re.compile(r'^\s*<(?:!DOCTYPE|html|head|body|div|p|span|a|ul|table|script|style)\b', re.IGNORECASE)),
+    ('json', re.compile(r'^\s*(?:\{\s*"|\[\s*(?:\{|"|-?\d|true|false|null|\]))')),
+    ('diff', re.compile(r'^(?:@@ -\d|--- \S|\+\+\+ \S)', re.MULTILINE)),
+    ('dockerfile', re.compile(r'^FROM \S+(?:\n|$)(?:.*\n)*?^(?:RUN|COPY|CMD|ENTRYPOINT|WORKDIR) ', re.MULTILINE)),
+    ('sql', re.compile(
+        r'^\s*(?:SELECT\s.+\sFROM\s|INSERT\s+INTO\s|UPDATE\s+\w+\s+SET\s|DELETE\s+FROM\s|CREATE\s+(?:TABLE|INDEX|VIEW)\s)',
+        re.IGNORECASE | re.MULTILINE | re.DOTALL
+    )),
+    ('python', re.compile(
+        r'^\s*(?:def \w+\(.*\):|class \w+(?:\(.*\))?:|from [\w.]+ import |import \w+(?:\.\w+)*$|@\w+(?:\.\w+)*)',
+        re.MULTILINE
+    )),
+    ('go', re.compile(r'^(?:package \w+$|func (?:\(\w+ \*?\w+\) )?\w+\()', re.MULTILINE)),
+    ('rust', re.compile(r'^\s*(?:(?:pub )?fn \w+|let mut \w+|use \w+::|impl\b)', re.MULTILINE)),
+    ('cpp', re.compile(r'^#include\s*[<"]', re.MULTILINE)),
+    ('java', re.compile(r'^\s*(?:public|private|protected)\s+(?:static\s+)?(?:class|void|int|String)\b', re.MULTILINE)),
+    ('javascript', re.compile(
+        r'^\s*(?:(?:const|let|var) \w+ = |function\s*\w*\(|import .+ from [\'"]|export (?:default )?\w|console\.log\()',
+        re.MULTILINE
+    )),
+    ('css', re.compile(r'^[\w.#:*\[\]=", >+~-]+\{\s*$\n\s*[\w-]+\s*:[^;\n]+;', re.MULTILINE)),
+    ('toml', re.compile(r'^\[[\w.-]+\]\s*$\n(?:.*\n)*?^[\w-]+\s*=\s*\S', re.MULTILINE)),
+    ('yaml', re.compile(r'^(?:---\s*\n)?[\w-]+:(?:\s+\S.*)?\n(?:[ -].*\n|[\w-]+:.*\n)*[\w-]+:', re.MULTILINE)),
+    ('bash', re.compile(
+        r'^\s*(?:sudo|apt(?:-get)?|brew|pip3?|npm|yarn|git|cd|echo|export|curl|wget|docker|make|mkdir|chmod)\s',
+        re.MULTILINE
+    )),
+]
+HEURISTIC_SCAN_CHARS = 2000
+
+_memo: 'OrderedDict[str, Optional[str]]' = OrderedDict()
+_memo_lock = threading.Lock()
+_memo_loaded = False
+# Lines in the memo file, as far as this process knows
+_memo_lines = 0
+
+
+def guess_language(code: str, policy: str = DEFAULT_CODE_LANG_GUESS) -> Optional[str]:
+    """
+    Choose a language for a code block without a label.
+
+    Args:
+        code: Code of the block
+        policy: ``guess``, ``memoized``, ``heuristic`` or ``plain``
+
+    Returns:
+        Pygments lexer alias, or None for plain text
+
+    Raises:
+        ValueError: If the policy is unknown
+    """
+    if policy == 'plain':
+        return None
+    if policy == 'heuristic':
+        return _heuristic_language(code)
+    if policy == 'guess':
+        return _pygments_language(code)
+    if policy != 'memoized':
+        raise ValueError(
+            f"Unknown code language policy '{policy}'. Valid policies: {', '.join(CODE_LANG_GUESS_POLICIES)}"
+        )
+
+    key = hashlib.sha256(code.encode('utf-8')).hexdigest()
+    with _memo_lock:
+        if not _memo_loaded:
+            _load_memo()
+        found = key in _memo
+        if found:
+            _memo.move_to_end(key)
+            language = _memo[key]
+    record_cache('code_lang_guess', found)
+    if found:
+        return language
+
+    language = _pygments_language(code)
+    with _memo_lock:
+        _memo[key] = language
+        while len(_memo) > CODE_LANG_MEMO_ENTRIES:
+            _memo.popitem(last=False)
+        _store_memo(key, language)
+    return language
+
+
+def with_code_lang_guess(extension_configs: Dict[str, Dict], policy: str) -> Dict[str, Dict]:
+    """
+    Markdown extension configuration with another code language policy.
+
+    Args:
+        extension_configs: Configuration to derive from (left unchanged)
+        policy: ``guess``, ``memoized``, ``heuristic`` or ``plain``
+
+    Returns:
+        Copy of the configuration
+    """
+    configs = dict(extension_configs)
+    configs[CODE_LANG_EXTENSION] = {**configs.get(CODE_LANG_EXTENSION, {}), 'policy': policy}
+    return configs
+
+
+def _load_memo() -> None:
+    """Read guesses of earlier runs from the cache directory; the caller holds the lock."""
+    global _memo_loaded, _memo_lines
+    _memo_loaded = True
+    try:
+        with open(get_cache_dir() / CODE_LANG_MEMO_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                _memo_lines += 1
+                key, _, language = line.rstrip('\n').partition(' ')
+                if len(key) == 64 and line.endswith('\n'):
+                    _memo[key] = language or None
+                    _memo.move_to_end(key)
+    except OSError:
+        return
+    while len(_memo) > CODE_LANG_MEMO_ENTRIES:
+        _memo.popitem(last=False)
+
+
+def _store_memo(key: str, language: Optional[str]) -> None:
+    """
+    Append a guess to the cache directory's memo file when the directory exists.
+
+    Once the file holds ``CODE_LANG_MEMO_COMPACT_FACTOR`` times more lines
+    than the memo keeps, it is rewritten with the memo's entries, least
+    recently used first; the caller holds the lock.
+    """
+    global _memo_lines
+    cache_dir = get_cache_dir()
+    if not cache_dir.is_dir():
+        return
+    path = cache_dir / CODE_LANG_MEMO_FILE
+    try:
+        if _memo_lines >= CODE_LANG_MEMO_COMPACT_FACTOR * CODE_LANG_MEMO_ENTRIES:
+            # Atomic, so a concurrent run reads the old or the new file; its
+            # appends since our last read may be dropped, which only costs a guess
+            lines = ''.join(f"{memo_key} {memo_language or ''}\n" for memo_key, memo_language in _memo.items())
+            write_file_atomic(path, lines.encode('utf-8'))
+            _memo_lines = len(_memo)
+            return
+        # One short line per append, so concurrent runs do not interleave within a line
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(f"{key} {language or ''}\n")
+        _memo_lines += 1
+    except (OSError, Md2PdfError):
+        pass
+
+
+def _pygments_language(code: str) -> Optional[str]:
+    """Pygments' guess, as a lexer alias."""
+    try:
+        from pygments.lexers import guess_lexer
+        from pygments.util import ClassNotFound
+    except ImportError:
+        return None
+    try:
+        lexer = guess_lexer(code)
+    except ClassNotFound:
+        return None
+    if not lexer.aliases or lexer.aliases[0] == 'text':
+        return None
+    return lexer.aliases[0]
+
+
+def _heuristic_language(code: str) -> Optional[str]:
+    """Match the start of a block against the heuristic rules."""
+    head = code[:HEURISTIC_SCAN_CHARS]
+    for language, pattern in HEURISTIC_RULES:
+        if pattern.search(head):
+            return language
+    return None
+
+
+class CodeLanguagePreprocessor(Preprocessor):
+    """Label unlabeled fenced blocks before ``fenced_code`` highlights them."""
+
+    def __init__(self, md: Markdown, policy: str):
+        super().__init__(md)
+        self.policy = policy
+
+    def run(self, lines: List[str]) -> List[str]:
+        text = '\n'.join(lines)
+        if '~~~' not in text and '```' not in text:
+            return lines
+        return FENCED_BLOCK_RE.sub(self._label, text).split('\n')
+
+    def _label(self, match: re.Match) -> str:
+        if match.group('info').strip():
+            return match.group(0)
+        language = guess_language(match.group('code'), self.policy)
+        if language is None:
+            return match.group(0)
+        return f"{match.group('fence')}{language}\n" + match.group(0)[match.start('code') - match.start():]
+
+
+class CodeLanguageTreeprocessor(Treeprocessor):
+    """Label unlabeled indented blocks before codehilite highlights them."""
+
+    def __init__(self, md: Markdown, policy: str):
+        super().__init__(md)
+        self.policy = policy
+
+    def run(self, root) -> None:
+        for pre in root.iter('pre'):
+            if len(pre) != 1 or pre[0].tag != 'code' or pre[0].get('class') or not pre[0].text:
+                continue
+            code = pre[0].text
+            if CODE_HEADER_RE.match(code):
+                continue
+            language = guess_language(
+                code.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&'), self.policy
+            )
+            if language is not None:
+                # Codehilite reads the language from a ":::lang" first line
+                pre[0].text = AtomicString(f":::{language}\n{code}")
+
+
+class CodeLanguageExtension(Extension):
+    """Choose the language of unlabeled code blocks by policy."""
+
+    def __init__(self, **kwargs):
+        self.config = {
+            'policy': [DEFAULT_CODE_LANG_GUESS, f"One of: {', '.join(CODE_LANG_GUESS_POLICIES)}"],
+        }
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        policy = self.getConfig('policy')
+        if policy not in CODE_LANG_GUESS_POLICIES:
+            raise ValueError(
+                f"Unknown code language policy '{policy}'. Valid policies: {', '.join(CODE_LANG_GUESS_POLICIES)}"
+            )
+        if policy == 'plain':
+            return
+        # After whitespace normalization (30), before fenced_code (25)
+        md.preprocessors.register(CodeLanguagePreprocessor(md, policy), 'code_language', 28)
+        # Before codehilite (30)
+        md.treeprocessors.register(CodeLanguageTreeprocessor(md, policy), 'code_language', 31)
+
+
+def makeExtension(**kwargs) -> CodeLanguageExtension:
+    return CodeLanguageExtension(**kwargs)
@@ -0,0 +1,306 @@
+"""
+Conversion metrics in the Prometheus or OpenMetrics text format.
+
+A :class:`MetricsCollector` passed to ``MarkdownToPDFConverter`` counts
+conversions and their error classes and records histograms of stage
+durations, PDF sizes and page counts. Cache hits and misses are counted
+process-wide by the caches themselves and included in every export. The
+default collector, :data:`NULL_METRICS`, records nothing.
+
+The text is written atomically, so node-exporter's textfile collector can
+scrape it. By default it is the Prometheus text format 0.0.4, which that
+collector parses: counters are declared under their sample name
+(``md2pdf_conversions_total``). In the OpenMetrics format, counter families
+are declared without the suffix (``md2pdf_conversions``) while their samples
+carry ``_total``, and the text ends with ``# EOF``.
+
+A resource-limited conversion records into a collector of its own in the
+child process and hands it back to be merged into the parent's; work in
+the worker processes of parallel style variants is not recorded.
+"""
+
+import contextlib
+import functools
+import math
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .constants import (
+    DEFAULT_METRICS_FORMAT, METRICS_BYTE_BUCKETS, METRICS_FORMATS, METRICS_PAGE_BUCKETS, METRICS_SECONDS_BUCKETS
+)
+from .exceptions import Md2PdfError
+from .output import write_file_atomic
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+# family name -> (type, help, histogram buckets); counter samples add "_total"
+METRICS: Dict[str, Tuple[str, str, Optional[Tuple[float, ...]]]] = {
+    'md2pdf_conversions': ('counter', 'Conversions finished, by result.', None),
+    'md2pdf_conversion_errors': ('counter', 'Failed conversions, by md2pdf error class.', None),
+    'md2pdf_conversion_duration_seconds': ('histogram', 'Wall time of whole conversions.', METRICS_SECONDS_BUCKETS),
+    'md2pdf_stage_duration_seconds': ('histogram', 'Wall time of pipeline stages.', METRICS_SECONDS_BUCKETS),
+    'md2pdf_pdf_size_bytes': ('histogram', 'Size of the PDFs written.', METRICS_BYTE_BUCKETS),
+    'md2pdf_pdf_pages': ('histogram', 'Page count of the PDFs written.', METRICS_PAGE_BUCKETS),
+}
+CACHE_METRICS = {
+    'md2pdf_cache_hits': ('counter', 'Cache lookups that found an entry, by cache.'),
+    'md2pdf_cache_misses': ('counter', 'Cache lookups that found no entry, by cache.'),
+    'md2pdf_cache_hit_ratio': ('gauge', 'Share of cache lookups that were hits, by cache.'),
+}
+
+_cache_counts: Dict[str, List[int]] = {}
+_cache_sources: Dict[str, Callable[[], Tuple[int, int]]] = {}
+_cache_lock = threading.Lock()
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """
+    Count one lookup in a cache.
+
+    Args:
+        cache: Cache name used as the ``cache`` label
+        hit: Whether the lookup found an entry
+    """
+    with _cache_lock:
+        counts = _cache_counts.setdefault(cache, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def register_cache(cache: str, stats: Callable[[], Tuple[int, int]]) -> None:
+    """
+    Export a cache that keeps its own statistics (e.g. ``functools.lru_cache``).
+
+    Args:
+        cache: Cache name used as the ``cache`` label
+        stats: Returns the current ``(hits, misses)``
+    """
+    _cache_sources[cache] = stats
+
+
+def cache_stats() -> Dict[str, Tuple[int, int]]:
+    """Hits and misses of every cache seen in this process (and merged from child processes)."""
+    with _cache_lock:
+        stats = {cache: (counts[0], counts[1]) for cache, counts in _cache_counts.items()}
+    for cache, source in _cache_sources.items():
+        hits, misses = source()
+        merged = stats.get(cache, (0, 0))
+        stats[cache] = (hits + merged[0], misses + merged[1])
+    return stats
+
+
+def cache_stats_since(before: Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[int, int]]:
+    """Hits and misses counted since an earlier :func:`cache_stats`."""
+    return {
+        cache: (hits - before.get(cache, (0, 0))[0], misses - before.get(cache, (0, 0))[1])
+        for cache, (hits, misses) in cache_stats().items()
+    }
+
+
+def merge_cache_stats(stats: Dict[str, Tuple[int, int]]) -> None:
+    """Add cache hits and misses counted in a child process."""
+    with _cache_lock:
+        for cache, (hits, misses) in stats.items():
+            counts = _cache_counts.setdefault(cache, [0, 0])
+            counts[0] += hits
+            counts[1] += misses
+
+
+class MetricsCollector:
+    """
+    Thread-safe counters and histograms for conversions.
+
+    One collector may be shared by converters in a thread pool.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelSet], float] = {}
+        self._histograms: Dict[Tuple[str, LabelSet], List[float]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Add to a counter, named by its family (without ``_total``)."""
+        self._definition(name, 'counter')
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record one observation in a histogram."""
+        buckets = self._definition(name, 'histogram')[2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            state = self._histograms.setdefault(key, [0.0] * (len(buckets) + 2))
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Copy of everything recorded, for :meth:`merge` in another process."""
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': {key: list(state) for key, state in self._histograms.items()},
+            }
+
+    def merge(self, snapshot: Dict[str, Dict]) -> None:
+        """Add what another collector recorded (see :meth:`snapshot`)."""
+        with self._lock:
+            for key, value in snapshot['counters'].items():
+                self._counters[key] = self._counters.get(key, 0.0) + value
+            for key, state in snapshot['histograms'].items():
+                current = self._histograms.setdefault(key, [0.0] * len(state))
+                for index, value in enumerate(state):
+                    current[index] += value
+
+    @contextlib.contextmanager
+    def track_conversion(self) -> Iterator[None]:
+        """Count a conversion and time it; failures are counted by error class."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__ if isinstance(e, Md2PdfError) else 'other'
+            self.inc('md2pdf_conversions', result='error')
+            self.inc('md2pdf_conversion_errors', error=error)
+            raise
+        else:
+            self.inc('md2pdf_conversions', result='success')
+        finally:
+            self.observe('md2pdf_conversion_duration_seconds', time.perf_counter() - started)
+
+    def render(self, fmt: str = DEFAULT_METRICS_FORMAT) -> str:
+        """
+        Render every metric as text.
+
+        Args:
+            fmt: ``prometheus`` (text format 0.0.4) or ``openmetrics``
+
+        Raises:
+            ValueError: If the format is unknown
+        """
+        if fmt not in METRICS_FORMATS:
+            raise ValueError(f"Unknown metrics format '{fmt}'. Valid formats: {', '.join(METRICS_FORMATS)}")
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(state) for key, state in self._histograms.items()}
+
+        lines: List[str] = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.extend(_header(name, kind, help_text, fmt))
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}_total{_labels(labels)} {_number(value)}")
+                continue
+            for (metric, labels), state in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(buckets, state):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {_number(cumulative)}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {_number(state[-1])}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(state[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {_number(state[-1])}")
+
+        stats = sorted(cache_stats().items())
+        for name, (kind, help_text) in CACHE_METRICS.items():
+            lines.extend(_header(name, kind, help_text, fmt))
+            for cache, (hits, misses) in stats:
+                labels = (('cache', cache),)
+                if name == 'md2pdf_cache_hits':
+                    lines.append(f"{name}_total{_labels(labels)} {hits}")
+                elif name == 'md2pdf_cache_misses':
+                    lines.append(f"{name}_total{_labels(labels)} {misses}")
+                elif hits + misses:
+                    lines.append(f"{name}{_labels(labels)} {_number(hits / (hits + misses))}")
+
+        if fmt == 'openmetrics':
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, destination: str, fmt: str = DEFAULT_METRICS_FORMAT) -> None:
+        """
+        Write the metrics to a file (atomically) or to stdout.
+
+        Args:
+            destination: File path, or ``-`` for stdout
+            fmt: ``prometheus`` (text format 0.0.4) or ``openmetrics``
+        """
+        text = self.render(fmt)
+        if destination == '-':
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        else:
+            write_file_atomic(Path(destination), text.encode('utf-8'))
+
+    @staticmethod
+    def _definition(name: str, kind: str) -> Tuple[str, str, Optional[Tuple[float, ...]]]:
+        definition = METRICS.get(name)
+        if definition is None or definition[0] != kind:
+            raise ValueError(f"Unknown {kind} metric: {name}")
+        return definition
+
+
+class NullMetrics(MetricsCollector):
+    """Collector that records nothing; the converter's default."""
+
+    enabled = False
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        pass
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+    def track_conversion(self) -> contextlib.AbstractContextManager:
+        return contextlib.nullcontext()
+
+    def merge(self, snapshot: Dict[str, Dict]) -> None:
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def tracked(method: Callable) -> Callable:
+    """Decorate a converter entry point so it is counted as one conversion."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.metrics.track_conversion():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _header(name: str, kind: str, help_text: str, fmt: str) -> List[str]:
+    """HELP and TYPE lines of a family; Prometheus 0.0.4 declares counters under their ``_total`` name."""
+    if kind == 'counter' and fmt == 'prometheus':
+        name = f"{name}_total"
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def _labels(labels: LabelSet) -> str:
+    """Format a label set, escaping values as the text format requires."""
+    if not labels:
+        return ''
+    escaped = (
+        f'{name}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value: float) -> str:
+    """Format a sample value without a needless fractional part."""
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -0,0 +1,132 @@
+"""
+Crash-safe output writing.
+
+Files are written to a temporary file in the destination directory and
+renamed over the target, so readers only ever see the previous or the new
+complete file. Optionally an identical existing file is left untouched, which
+keeps its mtime and avoids needless downstream syncs.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .constants import FSYNC_MODES
+from .exceptions import ConversionError
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _read_umask() -> Optional[int]:
+    """The process umask from /proc (Linux), or None where it is not exposed."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+# Read once at import. os.umask() can only be queried by setting it, which
+# would race with other threads creating files meanwhile
+_UMASK = _read_umask()
+
+
+def write_file_atomic(path: Path, data: bytes, skip_identical: bool = False, fsync: str = 'file') -> bool:
+    """
+    Atomically replace ``path`` with ``data``.
+
+    Args:
+        path: Destination file
+        data: Complete file contents
+        skip_identical: Leave an existing file with the same contents untouched
+        fsync: ``none`` (no fsync), ``file`` (fsync the data before the rename)
+            or ``full`` (also fsync the directory so the rename is durable)
+
+    Returns:
+        True if the file was written, False if it was identical and skipped
+
+    Raises:
+        ConversionError: If the file cannot be written
+    """
+    if fsync not in FSYNC_MODES:
+        raise ConversionError(f"Invalid fsync mode '{fsync}'. Valid modes: {', '.join(FSYNC_MODES)}")
+
+    if skip_identical and _has_contents(path, data):
+        return False
+
+    try:
+        mode = path.stat().st_mode & 0o7777
+    except OSError:
+        mode = _new_file_mode(path.parent)
+
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            if fsync != 'none':
+                os.fsync(f.fileno())
+        os.chmod(temp_name, mode)
+        os.replace(temp_name, path)
+    except OSError as e:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise ConversionError(f"Failed to write {path}: {e}")
+
+    if fsync == 'full':
+        _fsync_directory(path.parent)
+
+    return True
+
+
+def _new_file_mode(directory: Path) -> int:
+    """Mode of a newly created file: 0o666 less the umask (probed in ``directory`` without /proc)."""
+    if _UMASK is not None:
+        return 0o666 & ~_UMASK
+    fd, probe = tempfile.mkstemp(dir=directory, prefix='.md2pdf-mode.', suffix='.tmp')
+    os.close(fd)
+    try:
+        os.unlink(probe)
+        fd = os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        os.close(fd)
+        return os.stat(probe).st_mode & 0o777
+    finally:
+        try:
+            os.unlink(probe)
+        except OSError:
+            pass
+
+
+def _has_contents(path: Path, data: bytes) -> bool:
+    """Whether ``path`` exists and holds exactly ``data`` (size check, then SHA-256)."""
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except OSError:
+        return False
+    return digest.digest() == hashlib.sha256(data).digest()
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Flush a directory entry to disk where the platform allows it."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # Windows cannot open directories
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,95 @@
+"""
+HTML post-processing passes applied after Markdown conversion.
+"""
+
+import re
+
+TABLE_RE = re.compile(r'<table\b(?P<attrs>[^>]*)>(?P<body>.*?)</table>', re.DOTALL | re.IGNORECASE)
+THEAD_RE = re.compile(r'<thead\b[^>]*>.*?</thead>', re.DOTALL | re.IGNORECASE)
+TBODY_RE = re.compile(r'<tbody\b[^>]*>(?P<rows>.*?)</tbody>', re.DOTALL | re.IGNORECASE)
+ROW_RE = re.compile(r'<tr\b.*?</tr>', re.DOTALL | re.IGNORECASE)
+CAPTION_RE = re.compile(r'<caption\b.*?</caption>', re.DOTALL | re.IGNORECASE)
+COLUMNS_RE = re.compile(r'<colgroup\b.*?</colgroup>|<col\b[^>]*>', re.DOTALL | re.IGNORECASE)
+TFOOT_RE = re.compile(r'<tfoot\b.*?</tfoot>', re.DOTALL | re.IGNORECASE)
+CLASS_ATTR_RE = re.compile(r'\bclass="([^"]*)"', re.IGNORECASE)
+
+
+def split_long_tables(html_content: str, max_rows: int) -> str:
+    """
+    Split tables with more than ``max_rows`` body rows into consecutive tables.
+
+    Each piece repeats the original ``<thead>`` and column definitions; a
+    ``<caption>`` goes on the first piece and a ``<tfoot>`` on the last.
+    Tables with anything else outside their single ``<tbody>`` are left
+    whole. Pieces are tagged with classes
+    (``table-split``, ``table-continues``, ``table-continued``) that the page
+    stylesheet uses to lay the pieces out as one continuous table. Smaller
+    tables let WeasyPrint lay out each piece independently instead of
+    re-flowing one table that spans hundreds of pages.
+
+    Args:
+        html_content: HTML produced from Markdown
+        max_rows: Maximum number of body rows per table
+
+    Returns:
+        HTML with long tables split
+    """
+    if max_rows < 1 or '<table' not in html_content:
+        return html_content
+
+    return TABLE_RE.sub(lambda match: _split_table(match, max_rows), html_content)
+
+
+def _split_table(match: re.Match, max_rows: int) -> str:
+    """Split a single matched table, leaving nested or short tables untouched."""
+    body = match.group('body')
+    if '<table' in body.lower():
+        return match.group(0)
+
+    tbody = TBODY_RE.search(body)
+    if not tbody:
+        return match.group(0)
+
+    rows = ROW_RE.findall(tbody.group('rows'))
+    if len(rows) <= max_rows:
+        return match.group(0)
+
+    thead = THEAD_RE.search(body)
+    caption = CAPTION_RE.search(body)
+    tfoot = TFOOT_RE.search(body)
+    columns = COLUMNS_RE.findall(body)
+    rest = body[:tbody.start()] + body[tbody.end():]
+    for pattern in (THEAD_RE, CAPTION_RE, TFOOT_RE):
+        rest = pattern.sub('', rest, count=1)
+    rest = COLUMNS_RE.sub('', rest)
+    if rest.strip():
+        # Several bodies or rows outside a body: splitting could lose or reorder them
+        return match.group(0)
+
+    head = ''.join(part + '\n' for part in columns) + (thead.group(0) + '\n' if thead else '')
+    attrs = match.group('attrs')
+    pieces = [rows[i:i + max_rows] for i in range(0, len(rows), max_rows)]
+
+    tables = []
+    for index, piece in enumerate(pieces):
+        classes = ['table-split']
+        if index < len(pieces) - 1:
+            classes.append('table-continues')
+        if index > 0:
+            classes.append('table-continued')
+        piece_attrs = _add_classes(attrs, classes)
+        first = caption.group(0) + '\n' if caption and index == 0 else ''
+        last = '\n' + tfoot.group(0) if tfoot and index == len(pieces) - 1 else ''
+        tables.append(
+            f'<table{piece_attrs}>\n{first}{head}<tbody>\n' + '\n'.join(piece) + f'\n</tbody>{last}\n</table>'
+        )
+
+    return '\n'.join(tables)
+
+
+def _add_classes(attrs: str, classes: list) -> str:
+    """Merge extra CSS classes into a tag's attribute string."""
+    extra = ' '.join(classes)
+    if CLASS_ATTR_RE.search(attrs):
+        return CLASS_ATTR_RE.sub(lambda m: f'class="{m.group(1)} {extra}"', attrs, count=1)
+    return f'{attrs} class="{extra}"'
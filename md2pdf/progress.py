@@ -0,0 +1,236 @@
+"""
+Machine-readable progress events for long conversions.
+
+A :class:`ProgressReporter` turns conversion milestones into event dicts and
+passes them to a callback. Every event carries the elapsed time and an ETA
+derived from the per-byte throughput of previous runs, which is stored in the
+cache directory when it exists.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, TextIO
+
+from .cache import get_cache_dir
+from .constants import PROGRESS_STAGES, THROUGHPUT_FILE, THROUGHPUT_SMOOTHING
+from .metrics import NULL_METRICS, MetricsCollector
+
+ProgressCallback = Callable[[Dict], None]
+
+WEASYPRINT_PROGRESS_LOGGER = 'weasyprint.progress'
+
+
+def json_lines_callback(stream: Optional[TextIO] = None) -> ProgressCallback:
+    """
+    Create a callback that writes each event as a JSON line.
+
+    Args:
+        stream: Output stream (defaults to stderr)
+
+    Returns:
+        Progress callback
+    """
+    def emit(event: Dict) -> None:
+        out = stream or sys.stderr
+        out.write(json.dumps(event) + '\n')
+        out.flush()
+    return emit
+
+
+class ProgressReporter:
+    """
+    Emits stage, file and page events with an ETA for one conversion at a time.
+
+    Reporters hold per-conversion state and are not shared between threads;
+    the converter keeps one reporter per thread.
+    """
+
+    def __init__(self, callback: Optional[ProgressCallback] = None, metrics: Optional[MetricsCollector] = None):
+        """
+        Initialize the reporter.
+
+        Args:
+            callback: Receives event dicts; ``None`` disables reporting
+            metrics: Receives stage durations (default: none)
+        """
+        self.callback = callback
+        self.metrics = metrics or NULL_METRICS
+        self._reset(0, 0)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether events are delivered anywhere."""
+        return self.callback is not None
+
+    def start(self, input_files: List[Path]) -> None:
+        """Begin a conversion of the given inputs."""
+        if not self.enabled:
+            return
+        sizes = [path.stat().st_size for path in input_files]
+        self._reset(sum(sizes), len(input_files))
+        self._throughput = load_throughput()
+        self._emit('start')
+
+    def finish(self, record_throughput: bool = True) -> None:
+        """End the conversion and optionally update the stored throughput history."""
+        if not self.enabled:
+            return
+        self._emit('done')
+        if record_throughput and self.bytes_total:
+            _save_throughput(self._throughput, self._stage_durations, self.bytes_total)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context manager wrapping one pipeline stage."""
+        if not self.enabled:
+            if not self.metrics.enabled:
+                yield
+                return
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.metrics.observe('md2pdf_stage_duration_seconds', time.perf_counter() - started, stage=name)
+            return
+
+        self.current_stage = name
+        self._stage_started = time.perf_counter()
+        self._emit('stage_start')
+        try:
+            if name == 'layout':
+                with self._capture_pages():
+                    yield
+            else:
+                yield
+        finally:
+            self._stage_durations[name] = time.perf_counter() - self._stage_started
+            self.metrics.observe('md2pdf_stage_duration_seconds', self._stage_durations[name], stage=name)
+            self._emit('stage_end', duration=self._stage_durations[name])
+            self.current_stage = None
+
+    def file_done(self, file_path: Path, size: int) -> None:
+        """Record that one input file has been converted."""
+        if not self.enabled:
+            return
+        self.files_done += 1
+        self.bytes_done += size
+        self._emit('file', file=str(file_path))
+
+    def page_done(self, page_number: int) -> None:
+        """Record that WeasyPrint laid out another page."""
+        if not self.enabled:
+            return
+        self.pages = max(self.pages, page_number)
+        self._emit('page')
+
+    def _reset(self, bytes_total: int, files_total: int) -> None:
+        self.bytes_total = bytes_total
+        self.files_total = files_total
+        self.bytes_done = 0
+        self.files_done = 0
+        self.pages = 0
+        self.current_stage: Optional[str] = None
+        self._started = time.perf_counter()
+        self._stage_started = self._started
+        self._stage_durations: Dict[str, float] = {}
+        self._throughput: Dict[str, float] = {}
+
+    def _eta(self) -> Optional[float]:
+        """Estimate remaining seconds from historical seconds-per-byte."""
+        if not self.bytes_total or not all(stage in self._throughput for stage in PROGRESS_STAGES):
+            return None
+
+        remaining = 0.0
+        for stage in PROGRESS_STAGES:
+            if stage in self._stage_durations:
+                continue
+            expected = self._throughput[stage] * self.bytes_total
+            if stage == self.current_stage:
+                if stage == 'markdown' and self.bytes_done:
+                    expected *= 1 - self.bytes_done / self.bytes_total
+                else:
+                    expected -= time.perf_counter() - self._stage_started
+            remaining += max(expected, 0.0)
+        return round(remaining, 3)
+
+    def _emit(self, event: str, **fields) -> None:
+        self.callback({
+            'event': event,
+            'stage': self.current_stage,
+            'time': time.time(),
+            'elapsed': round(time.perf_counter() - self._started, 3),
+            'bytes_done': self.bytes_done,
+            'bytes_total': self.bytes_total,
+            'files_done': self.files_done,
+            'files_total': self.files_total,
+            'pages': self.pages,
+            'eta': self._eta(),
+            **fields
+        })
+
+    @contextlib.contextmanager
+    def _capture_pages(self) -> Iterator[None]:
+        """Translate WeasyPrint's per-page progress log records into page events."""
+        logger = logging.getLogger(WEASYPRINT_PROGRESS_LOGGER)
+        handler = _PageProgressHandler(self)
+        logger.addHandler(handler)
+        if logger.getEffectiveLevel() > logging.INFO:
+            logger.setLevel(logging.INFO)
+        try:
+            yield
+        finally:
+            logger.removeHandler(handler)
+
+
+class _PageProgressHandler(logging.Handler):
+    """Logging handler forwarding WeasyPrint layout progress from one thread."""
+
+    def __init__(self, reporter: ProgressReporter):
+        super().__init__(level=logging.INFO)
+        self.reporter = reporter
+        self.thread = threading.get_ident()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.thread != self.thread or 'Creating layout - Page' not in record.msg:
+            return
+        if record.args and isinstance(record.args[0], int):
+            self.reporter.page_done(record.args[0])
+
+
+def load_throughput() -> Dict[str, float]:
+    """Load historical seconds-per-byte for each stage."""
+    try:
+        with open(get_cache_dir() / THROUGHPUT_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_throughput(history: Dict[str, float], durations: Dict[str, float], bytes_total: int) -> None:
+    """Blend this run's throughput into the history (only if the cache exists)."""
+    cache_dir = get_cache_dir()
+    if not cache_dir.is_dir():
+        return
+
+    for stage, duration in durations.items():
+        observed = duration / bytes_total
+        previous = history.get(stage)
+        history[stage] = observed if previous is None else (
+            THROUGHPUT_SMOOTHING * observed + (1 - THROUGHPUT_SMOOTHING) * previous
+        )
+
+    # Write-then-rename so concurrent conversions never read a partial file
+    path = cache_dir / THROUGHPUT_FILE
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
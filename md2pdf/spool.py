@@ -0,0 +1,432 @@
+"""
+Spool-directory job queue for rendering on several hosts.
+
+A spool is a shared directory; every job is a directory that moves between
+state directories with atomic renames::
+
+    spool/
+        tmp/        jobs being written by a producer
+        incoming/   jobs waiting for a worker
+        claimed/    jobs being rendered, as <id>.<claim token>; a heartbeat
+                    keeps the lease file fresh
+        done/       rendered jobs with their PDF and status.json
+        failed/     jobs that failed, with the error in status.json
+
+Producers call :func:`submit_job`. Workers claim a job by renaming it from
+``incoming`` to ``claimed``; only one rename can succeed, so no locking is
+needed. A worker that crashes stops touching its lease file, and any worker
+moves the job back to ``incoming`` once the lease has expired. Every claim
+renames the job to a name of its own, so a slow worker whose lease expired
+cannot write into, or finish, the job another worker has claimed since: its
+paths no longer exist, and it finishes by first renaming its claim out of
+``claimed`` into ``tmp``, which fails once the claim was taken back.
+Throughput scales by starting workers on more hosts that mount the same
+directory.
+"""
+
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .constants import (
+    SPOOL_DIRS, SPOOL_JOB_FILE, SPOOL_STATUS_FILE, SPOOL_LEASE_FILE, SPOOL_ATTEMPTS_FILE,
+    SPOOL_JOB_OPTIONS, DEFAULT_LEASE_TIMEOUT, DEFAULT_SPOOL_POLL_INTERVAL, DEFAULT_SPOOL_MAX_ATTEMPTS,
+    DEFAULT_MARGIN, DEFAULT_PAGE_SIZE, DEFAULT_STYLE
+)
+from .exceptions import Md2PdfError, SpoolError
+from .limits import ResourceLimits
+from .logger import LoggerMixin
+from .output import write_file_atomic
+from .utils import parse_margin
+
+
+def init_spool(spool_dir: Path) -> None:
+    """Create the state directories of a spool."""
+    for name in SPOOL_DIRS:
+        (spool_dir / name).mkdir(parents=True, exist_ok=True)
+
+
+def submit_job(
+    spool_dir: Path,
+    input_files: List[Path],
+    options: Optional[Dict[str, Any]] = None,
+    output: str = "output.pdf",
+    assets: Optional[List[Path]] = None,
+    job_id: Optional[str] = None
+) -> str:
+    """
+    Queue a conversion in a spool directory.
+
+    The inputs and assets are copied into the job, which appears in
+    ``incoming`` atomically once complete.
+
+    Args:
+        spool_dir: Spool directory shared with the workers
+        input_files: Markdown files, in document order
+        options: Conversion options (style, title, margin, page_size, toc,
+            merge, split_tables, reproducible); a custom ``style`` is the
+            file name of a CSS file among the assets
+        output: File name of the PDF inside the finished job
+        assets: Images and other files referenced by relative URLs
+        job_id: Job identifier (defaults to a time-ordered unique id)
+
+    Returns:
+        The job identifier
+
+    Raises:
+        SpoolError: If the job is invalid or cannot be written
+    """
+    options = dict(options or {})
+    unknown = set(options) - SPOOL_JOB_OPTIONS
+    if unknown:
+        raise SpoolError(f"Unknown job option(s): {', '.join(sorted(unknown))}")
+    if not input_files:
+        raise SpoolError("A job needs at least one input file")
+    _check_file_name(output)
+
+    init_spool(spool_dir)
+    # Time-ordered ids let workers take jobs first in, first out
+    job_id = job_id or f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+    _check_file_name(job_id)
+
+    staging = spool_dir / "tmp" / job_id
+    try:
+        staging.mkdir()
+        names = []
+        for path in [*input_files, *(assets or [])]:
+            if path.name in names or path.name in (SPOOL_JOB_FILE, output):
+                raise SpoolError(f"Duplicate file name in job: {path.name}")
+            shutil.copyfile(path, staging / path.name)
+            names.append(path.name)
+
+        job = {
+            'id': job_id,
+            'inputs': [path.name for path in input_files],
+            'output': output,
+            'options': options,
+            'submitted_at': time.time(),
+        }
+        (staging / SPOOL_JOB_FILE).write_text(json.dumps(job, indent=2), encoding='utf-8')
+        os.rename(staging, spool_dir / "incoming" / job_id)
+    except OSError as e:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise SpoolError(f"Cannot submit job {job_id}: {e}")
+    except SpoolError:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return job_id
+
+
+def get_job_status(spool_dir: Path, job_id: str) -> Dict[str, Any]:
+    """
+    Look up the state of a job.
+
+    Args:
+        spool_dir: Spool directory
+        job_id: Identifier returned by :func:`submit_job`
+
+    Returns:
+        The job's status.json for finished jobs, otherwise ``{'state': ...}``
+        with ``incoming``, ``claimed`` or ``unknown``
+    """
+    for state in ('done', 'failed'):
+        status_file = spool_dir / state / job_id / SPOOL_STATUS_FILE
+        if status_file.is_file():
+            with open(status_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    if (spool_dir / 'incoming' / job_id).is_dir():
+        return {'id': job_id, 'state': 'incoming'}
+    if any(_claimed_job_id(name) == job_id for name in os.listdir(spool_dir / 'claimed')):
+        return {'id': job_id, 'state': 'claimed'}
+    return {'id': job_id, 'state': 'unknown'}
+
+
+class SpoolWorker(LoggerMixin):
+    """Claims jobs from a spool directory and renders them."""
+
+    def __init__(
+        self,
+        spool_dir: Path,
+        lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+        poll_interval: float = DEFAULT_SPOOL_POLL_INTERVAL,
+        max_attempts: int = DEFAULT_SPOOL_MAX_ATTEMPTS,
+        limits: Optional[ResourceLimits] = None,
+        verbose: bool = False
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            spool_dir: Spool directory shared with producers and other workers
+            lease_timeout: Seconds without a heartbeat after which a claimed job is reclaimed
+            poll_interval: Seconds to wait when the queue is empty
+            max_attempts: Claims allowed per job before it is failed
+            limits: Resource limits applied to every job
+            verbose: Enable verbose output
+        """
+        super().__init__(verbose=verbose)
+        self.spool_dir = spool_dir
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.limits = limits or ResourceLimits()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        init_spool(spool_dir)
+
+    def run(self, once: bool = False) -> int:
+        """
+        Process jobs until interrupted.
+
+        Args:
+            once: Stop when the queue is empty instead of polling
+
+        Returns:
+            Number of jobs processed
+        """
+        processed = 0
+        while True:
+            self.reclaim_expired()
+            job_dir = self.claim_next()
+            if job_dir is None:
+                if once:
+                    return processed
+                time.sleep(self.poll_interval)
+                continue
+            self.process(job_dir)
+            processed += 1
+
+    def claim_next(self) -> Optional[Path]:
+        """Claim the oldest waiting job, or return None if the queue is empty."""
+        for job_id in sorted(os.listdir(self.spool_dir / "incoming")):
+            claimed = self.spool_dir / "claimed" / f"{job_id}.{uuid.uuid4().hex}"
+            try:
+                os.rename(self.spool_dir / "incoming" / job_id, claimed)
+            except OSError:
+                # Another worker claimed it first
+                continue
+            self._write_lease(claimed)
+            self.logger.debug(f"Claimed job {job_id}")
+            return claimed
+        return None
+
+    def reclaim_expired(self) -> List[str]:
+        """Return jobs whose lease has expired to the queue; returns their ids."""
+        reclaimed = []
+        now = time.time()
+        for name in os.listdir(self.spool_dir / "claimed"):
+            job_id = _claimed_job_id(name)
+            job_dir = self.spool_dir / "claimed" / name
+            if now - self._lease_time(job_dir) <= self.lease_timeout:
+                continue
+            try:
+                os.rename(job_dir, self.spool_dir / "incoming" / job_id)
+            except OSError:
+                continue
+            self.logger.warning(f"Lease expired, requeued job {job_id}")
+            reclaimed.append(job_id)
+        return reclaimed
+
+    def process(self, job_dir: Path) -> bool:
+        """
+        Render a claimed job and move it to ``done`` or ``failed``.
+
+        Args:
+            job_dir: Job directory inside ``claimed``, as returned by :meth:`claim_next`
+
+        Returns:
+            True if the job succeeded
+        """
+        job_id = _claimed_job_id(job_dir.name)
+        started = time.time()
+        status = {'id': job_id, 'worker': self.worker_id, 'started_at': started}
+
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_dir, heartbeat_stop), daemon=True)
+        heartbeat.start()
+        try:
+            attempts = self._count_attempt(job_dir)
+            status['attempt'] = attempts
+            if attempts > self.max_attempts:
+                raise SpoolError(f"Job was claimed {attempts} times without finishing")
+            job = self._load_job(job_dir)
+            self._render(job_dir, job)
+            status.update(state='done', output=job['output'])
+        except Md2PdfError as e:
+            status.update(state='failed', error=str(e), error_type=type(e).__name__)
+        except Exception as e:
+            status.update(state='failed', error=f"Unexpected error: {e}", error_type=type(e).__name__)
+        finally:
+            heartbeat_stop.set()
+            heartbeat.join()
+
+        status['finished_at'] = time.time()
+        status['duration'] = round(status['finished_at'] - started, 3)
+        return self._finish(job_dir, status)
+
+    def _render(self, job_dir: Path, job: Dict[str, Any]) -> None:
+        """Render one job inside its directory."""
+        from .converter import MarkdownToPDFConverter
+
+        options = job['options']
+        style = options.get('style', DEFAULT_STYLE)
+        converter = MarkdownToPDFConverter(verbose=self.verbose)
+        converter.convert_files_to_pdf(
+            input_files=[job_dir / name for name in job['inputs']],
+            output_path=job_dir / job['output'],
+            style=str(job_dir / style) if style.endswith('.css') else style,
+            title=options.get('title'),
+            margin=parse_margin(options.get('margin', DEFAULT_MARGIN)),
+            page_size=options.get('page_size', DEFAULT_PAGE_SIZE),
+            generate_toc=bool(options.get('toc', False)),
+            merge_files=bool(options.get('merge', True)),
+            split_tables_at=options.get('split_tables'),
+            reproducible=bool(options.get('reproducible', False)),
+            limits=self.limits
+        )
+
+    def _load_job(self, job_dir: Path) -> Dict[str, Any]:
+        """Read and validate a job description."""
+        try:
+            with open(job_dir / SPOOL_JOB_FILE, 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except (OSError, ValueError) as e:
+            raise SpoolError(f"Invalid job file: {e}")
+
+        if not isinstance(job.get('inputs'), list) or not job['inputs']:
+            raise SpoolError("Job lists no inputs")
+        job.setdefault('output', 'output.pdf')
+        job.setdefault('options', {})
+        for name in [*job['inputs'], job['output']]:
+            _check_file_name(name)
+        unknown = set(job['options']) - SPOOL_JOB_OPTIONS
+        if unknown:
+            raise SpoolError(f"Unknown job option(s): {', '.join(sorted(unknown))}")
+        # A style is a built-in name or a stylesheet shipped as one of the job's assets
+        style = job['options'].get('style', DEFAULT_STYLE)
+        if not isinstance(style, str):
+            raise SpoolError(f"Invalid style in job: {style!r}")
+        _check_file_name(style)
+        return job
+
+    def _finish(self, job_dir: Path, status: Dict[str, Any]) -> bool:
+        """Write the status file and move the job to its final state directory, if the claim still holds."""
+        job_id = status['id']
+        # Leaving 'claimed' is the fence: once the claim is out of reach of
+        # reclaim_expired, nobody else can requeue it
+        finishing = self.spool_dir / "tmp" / job_dir.name
+        try:
+            os.rename(job_dir, finishing)
+        except OSError as e:
+            # The lease expired and the job went back to the queue
+            self.logger.warning(f"Lost job {job_id} before finishing: {e}")
+            return False
+
+        state = status['state']
+        try:
+            write_file_atomic(finishing / SPOOL_STATUS_FILE, json.dumps(status, indent=2).encode('utf-8'))
+            (finishing / SPOOL_LEASE_FILE).unlink(missing_ok=True)
+            os.rename(finishing, self.spool_dir / state / job_id)
+        except (OSError, Md2PdfError) as e:
+            # Another worker finished the job after it was reclaimed from this one
+            self.logger.warning(f"Job {job_id} was finished elsewhere; dropping this result: {e}")
+            shutil.rmtree(finishing, ignore_errors=True)
+            return False
+
+        if state == 'done':
+            self.logger.info(f"Done: {job_id} ({status['duration']:.2f}s)")
+        else:
+            self.logger.error(f"Failed: {job_id}: {status['error']}")
+        return state == 'done'
+
+    def _write_lease(self, job_dir: Path) -> None:
+        """Record who holds the job; the file's mtime is the heartbeat."""
+        lease = {'worker': self.worker_id, 'claim': job_dir.name, 'claimed_at': time.time()}
+        (job_dir / SPOOL_LEASE_FILE).write_text(json.dumps(lease), encoding='utf-8')
+
+    def _heartbeat(self, job_dir: Path, stop: threading.Event) -> None:
+        """Touch the lease file until the job finishes."""
+        interval = max(self.lease_timeout / 3, 0.1)
+        while not stop.wait(interval):
+            try:
+                os.utime(job_dir / SPOOL_LEASE_FILE)
+            except OSError:
+                self.logger.warning(f"Lease on job {job_dir.name} was lost")
+                return
+
+    def _lease_time(self, job_dir: Path) -> float:
+        """Time of the last heartbeat of a claimed job."""
+        try:
+            return (job_dir / SPOOL_LEASE_FILE).stat().st_mtime
+        except OSError:
+            pass
+        # Claimed an instant ago and the lease is not written yet: the rename
+        # updated the directory's ctime
+        try:
+            stat = job_dir.stat()
+        except OSError:
+            return time.time()
+        return max(stat.st_mtime, stat.st_ctime)
+
+    @staticmethod
+    def _count_attempt(job_dir: Path) -> int:
+        """Increment and return the number of times the job has been claimed."""
+        path = job_dir / SPOOL_ATTEMPTS_FILE
+        try:
+            attempts = int(path.read_text(encoding='utf-8')) + 1
+        except (OSError, ValueError):
+            attempts = 1
+        path.write_text(str(attempts), encoding='utf-8')
+        return attempts
+
+
+def run_workers(
+    spool_dir: Path,
+    processes: int = 1,
+    once: bool = False,
+    **worker_options
+) -> int:
+    """
+    Run one or more spool workers on this host.
+
+    Args:
+        spool_dir: Spool directory
+        processes: Number of worker processes
+        once: Stop when the queue is empty
+        **worker_options: Passed to :class:`SpoolWorker`
+
+    Returns:
+        Number of jobs processed
+    """
+    if processes == 1:
+        return SpoolWorker(spool_dir, **worker_options).run(once=once)
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(_run_worker, spool_dir, once, worker_options)
+            for _ in range(processes)
+        ]
+        return sum(future.result() for future in futures)
+
+
+def _run_worker(spool_dir: Path, once: bool, worker_options: Dict[str, Any]) -> int:
+    """Worker process entry point."""
+    return SpoolWorker(spool_dir, **worker_options).run(once=once)
+
+
+def _claimed_job_id(name: str) -> str:
+    """Job id of a directory in ``claimed`` (``<id>.<claim token>``)."""
+    return name.rpartition('.')[0] or name
+
+
+def _check_file_name(name: str) -> None:
+    """Reject names that would escape the job directory."""
+    if not name or name in ('.', '..') or '/' in name or '\\' in name:
+        raise SpoolError(f"Invalid name in job: {name!r}")
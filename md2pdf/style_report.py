@@ -0,0 +1,235 @@
+"""
+Render cost reports for styles.
+
+:func:`bench_styles` renders one document under each style in a fresh process
+and records wall time, peak memory and PDF size. :func:`lint_stylesheet`
+statically flags CSS features that are slow to draw or load in WeasyPrint:
+gradients, large shadows, fonts and stylesheets fetched over the network, and
+image or gradient backgrounds painted behind every page.
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import tinycss2
+
+from .constants import (
+    DEFAULT_PAGE_SIZE, STYLE_BENCH_SECTIONS, STYLE_LINT_PAGE_SELECTORS, STYLE_LINT_SHADOW_BLUR_PT
+)
+from .estimate import measure_conversion
+from .exceptions import Md2PdfError
+
+# Points per unit; font-relative units assume an 11pt body font
+LENGTH_UNITS_PT = {
+    'pt': 1.0, 'px': 0.75, 'pc': 12.0, 'in': 72.0, 'cm': 28.3465, 'mm': 2.83465, 'q': 0.70866,
+    'em': 11.0, 'rem': 11.0,
+}
+REMOTE_URL_PREFIXES = ('http://', 'https://', '//')
+
+
+def sample_document(sections: int = STYLE_BENCH_SECTIONS) -> str:
+    """
+    Deterministic Markdown sample exercising what styles decorate.
+
+    Every section has headings, prose, a list, a quote, a table and a code block.
+    """
+    parts = ["# Style Benchmark\n"]
+    for s in range(sections):
+        parts.append(f"\n## Section {s + 1}\n")
+        parts.append(
+            f"Section {s + 1} describes one part of the system in ordinary sentences with "
+            "*emphasis*, **strong text**, `inline code` and [a link](https://example.com). "
+            "It is long enough to wrap over several lines on an A4 page.\n"
+        )
+        parts.append("### Details\n")
+        parts.append('\n'.join(f"- Item {i + 1} of section {s + 1}" for i in range(4)) + '\n')
+        parts.append(f"> Note {s + 1}: quotes are often drawn with backgrounds, borders and shadows.\n")
+        parts.append("| Name | Value | Description |\n|------|-------|-------------|")
+        parts.append('\n'.join(f"| `key_{s}_{r}` | {r * 7} | Row {r} of table {s + 1} |" for r in range(8)) + '\n')
+        parts.append(f"```python\ndef section_{s}(value):\n    return value * {s + 1}  # scaled\n```\n")
+    return '\n'.join(parts)
+
+
+def bench_styles(
+    styles: Sequence[str],
+    input_files: Optional[List[Path]] = None,
+    page_size: str = DEFAULT_PAGE_SIZE,
+    repeat: int = 1
+) -> List[Dict[str, Any]]:
+    """
+    Render a document under each style and measure what it cost.
+
+    Each render runs in a fresh process (see :func:`~md2pdf.estimate.measure_conversion`),
+    so peak memory belongs to that style alone.
+
+    Args:
+        styles: Style names or paths to custom CSS files
+        input_files: Markdown files to render (defaults to :func:`sample_document`)
+        page_size: Page size (A4, Letter, etc.)
+        repeat: Renders per style; the fastest is reported
+
+    Returns:
+        One dict per style with ``seconds``, ``peak_memory_mb``, ``pdf_bytes``
+        and ``pages``, or ``error`` when the style failed to render
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix='md2pdf-styles-') as workdir:
+        workdir = Path(workdir)
+        if not input_files:
+            sample = workdir / 'sample.md'
+            sample.write_text(sample_document(), encoding='utf-8')
+            input_files = [sample]
+
+        for index, style in enumerate(styles):
+            output_path = workdir / f"{index}-{Path(style).stem}.pdf"
+            try:
+                records = [
+                    measure_conversion(input_files, output_path, style=style, page_size=page_size)
+                    for _ in range(repeat)
+                ]
+            except Md2PdfError as e:
+                results.append({'style': style, 'error': str(e)})
+                continue
+
+            record = min(records, key=lambda r: r['seconds'])
+            results.append({
+                'style': style,
+                'seconds': record['seconds'],
+                'peak_memory_mb': record['peak_memory_mb'],
+                'pdf_bytes': output_path.stat().st_size,
+                'pages': record['pages'],
+            })
+    return results
+
+
+def lint_stylesheet(css_content: str) -> List[Dict[str, str]]:
+    """
+    Flag CSS features that are known to be slow in WeasyPrint.
+
+    Args:
+        css_content: Stylesheet to check
+
+    Returns:
+        Findings as dicts with ``check``, ``selector`` and ``message``, in
+        stylesheet order
+    """
+    findings: List[Dict[str, str]] = []
+    rules = tinycss2.parse_stylesheet(css_content, skip_comments=True, skip_whitespace=True)
+    _lint_rules(rules, findings)
+    return findings
+
+
+def _lint_rules(rules: list, findings: List[Dict[str, str]]) -> None:
+    """Check every rule of a rule list, descending into nested rule lists."""
+    for rule in rules:
+        if rule.type == 'qualified-rule':
+            selector = tinycss2.serialize(rule.prelude).strip()
+            page_level = any(
+                part.strip().lower() in STYLE_LINT_PAGE_SELECTORS for part in selector.split(',')
+            )
+            _lint_block(rule.content, selector, page_level, findings)
+        elif rule.type == 'at-rule':
+            keyword = rule.lower_at_keyword
+            selector = f"@{rule.at_keyword}{tinycss2.serialize(rule.prelude).rstrip()}"
+            if keyword == 'import':
+                if any(_is_remote(url) for url in _urls(rule.prelude)):
+                    findings.append(_finding(
+                        'remote-import', selector, 'stylesheet is downloaded on every render'
+                    ))
+            elif keyword == 'font-face' and rule.content is not None:
+                _lint_font_face(rule.content, selector, findings)
+            elif keyword in ('media', 'supports') and rule.content is not None:
+                _lint_rules(
+                    tinycss2.parse_rule_list(rule.content, skip_comments=True, skip_whitespace=True), findings
+                )
+            elif rule.content is not None:
+                # @page and its margin boxes are painted on every page
+                _lint_block(rule.content, selector, keyword == 'page', findings)
+
+
+def _lint_block(content: list, selector: str, page_level: bool, findings: List[Dict[str, str]]) -> None:
+    """Check the declarations of one rule."""
+    items = tinycss2.parse_blocks_contents(content, skip_comments=True, skip_whitespace=True)
+    for item in items:
+        if item.type != 'declaration':
+            if item.type in ('qualified-rule', 'at-rule'):
+                _lint_rules([item], findings)
+            continue
+
+        name = item.lower_name
+        if name in ('background', 'background-image'):
+            images = _image_functions(item.value)
+            if images and page_level:
+                findings.append(_finding(
+                    'page-background', selector,
+                    f"{' and '.join(sorted(set(images)))} background is painted behind every page"
+                ))
+            elif any(image.endswith('gradient') for image in images):
+                findings.append(_finding('gradient', selector, 'gradients are slow to draw and enlarge the PDF'))
+        elif name.endswith('box-shadow') or name == 'text-shadow':
+            blur = _largest_shadow(item.value)
+            if blur is not None and blur > STYLE_LINT_SHADOW_BLUR_PT:
+                findings.append(_finding(
+                    'large-shadow', selector,
+                    f"{name} blur and spread reach {blur:.0f}pt (over {STYLE_LINT_SHADOW_BLUR_PT:g}pt is slow to draw)"
+                ))
+
+
+def _lint_font_face(content: list, selector: str, findings: List[Dict[str, str]]) -> None:
+    """Flag font faces whose sources are downloaded."""
+    for item in tinycss2.parse_blocks_contents(content, skip_comments=True, skip_whitespace=True):
+        if item.type == 'declaration' and item.lower_name == 'src':
+            remote = [url for url in _urls(item.value) if _is_remote(url)]
+            if remote:
+                findings.append(_finding(
+                    'remote-font', selector, f"font is downloaded on every render: {remote[0]}"
+                ))
+
+
+def _image_functions(tokens: list) -> List[str]:
+    """Names of the image functions (``url``, ``linear-gradient``, ...) in a background value."""
+    images = []
+    for token in tokens:
+        if token.type == 'url':
+            images.append('url')
+        elif token.type == 'function' and (token.lower_name == 'url' or token.lower_name.endswith('gradient')):
+            images.append(token.lower_name)
+    return images
+
+
+def _urls(tokens: list) -> List[str]:
+    """URLs in a value, written as ``url(...)`` or as a string."""
+    urls = []
+    for token in tokens:
+        if token.type in ('url', 'string'):
+            urls.append(token.value)
+        elif token.type == 'function' and token.lower_name == 'url':
+            urls.extend(arg.value for arg in token.arguments if arg.type == 'string')
+    return urls
+
+
+def _is_remote(url: str) -> bool:
+    return url.strip().lower().startswith(REMOTE_URL_PREFIXES)
+
+
+def _largest_shadow(tokens: list) -> Optional[float]:
+    """Largest blur plus spread, in points, among the shadows of a value."""
+    largest = None
+    lengths: List[float] = []
+    for token in tokens + [None]:
+        if token is None or (token.type == 'literal' and token.value == ','):
+            # Lengths are the x and y offsets, then blur and spread
+            if len(lengths) > 2:
+                extent = lengths[2] + max(lengths[3] if len(lengths) > 3 else 0.0, 0.0)
+                largest = extent if largest is None else max(largest, extent)
+            lengths = []
+        elif token.type == 'dimension' and token.lower_unit in LENGTH_UNITS_PT:
+            lengths.append(token.value * LENGTH_UNITS_PT[token.lower_unit])
+        elif token.type == 'number' and token.value == 0:
+            lengths.append(0.0)
+    return largest
+
+
+def _finding(check: str, selector: str, message: str) -> Dict[str, str]:
+    return {'check': check, 'selector': selector, 'message': message}
@@ -28,11 +28,8 @@ def get_builtin_style(style_name: str) -> str:
         StyleError: If style name is not found
     """
     # First try YAML styles if available
-    yaml_styles = {}
-    if HAS_YAML and yaml_style_loader:
-        yaml_styles = yaml_style_loader.list_yaml_styles()
-        if style_name in yaml_styles:
-            return yaml_style_loader.load_yaml_style(style_name)
+    if HAS_YAML and yaml_style_loader and yaml_style_loader.has_style(style_name):
+        return yaml_style_loader.load_yaml_style(style_name)
     
     # Then try built-in Python styles
     styles = {
@@ -52,8 +49,8 @@ def get_builtin_style(style_name: str) -> str:
     
     # Style not found anywhere
     all_styles = list(styles.keys())
-    if HAS_YAML:
-        all_styles.extend(yaml_styles.keys())
+    if HAS_YAML and yaml_style_loader:
+        all_styles.extend(yaml_style_loader.list_yaml_styles().keys())
     
     available = ', '.join(sorted(all_styles))
     raise StyleError(f"Unknown style: {style_name}. Available styles: {available}")
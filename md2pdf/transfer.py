@@ -0,0 +1,178 @@
+"""
+Hand-off of HTML fragments from worker processes without pickling them.
+
+A result returned from a ``ProcessPoolExecutor`` worker is pickled, sent
+through a pipe and unpickled, and then copied again when the fragments are
+joined. Instead, a worker writes a large fragment once, as UTF-8, into a
+``multiprocessing.shared_memory`` block, or into a temporary file where shared
+memory is unavailable, and returns a small :class:`Fragment` handle.
+:func:`join_fragments` decodes the fragments straight from the shared
+buffers and joins them into one document.
+
+The process that collects the handles owns the buffers and frees them with
+:func:`release_fragments`. A handle may be passed on to other workers, which
+read it without copying it through the parent.
+"""
+
+import contextlib
+import mmap
+import os
+import tempfile
+from concurrent.futures import Executor, wait
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from .constants import DEFAULT_TRANSFER, TRANSFER_METHODS, TRANSFER_MIN_BYTES
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Platforms without _posixshmem
+    resource_tracker = shared_memory = None
+
+
+class Fragment:
+    """
+    Picklable handle to an HTML fragment produced in another process.
+
+    Small fragments travel inline; large ones stay in a shared memory block
+    (``kind == 'shared-memory'``) or a temporary file (``kind == 'mmap'``)
+    of ``size`` bytes.
+    """
+
+    __slots__ = ('kind', 'location', 'size', 'text')
+
+    def __init__(self, kind: str, location: Optional[str] = None, size: int = 0, text: Optional[str] = None):
+        self.kind = kind
+        self.location = location
+        self.size = size
+        self.text = text
+
+    @classmethod
+    def inline(cls, html: str) -> 'Fragment':
+        """Wrap a fragment that is already in this process."""
+        return cls('inline', text=html)
+
+    def __getstate__(self):
+        return (self.kind, self.location, self.size, self.text)
+
+    def __setstate__(self, state):
+        self.kind, self.location, self.size, self.text = state
+
+
+def export_fragment(html: str, method: str = DEFAULT_TRANSFER) -> Fragment:
+    """
+    Store a fragment for another process; called in the worker.
+
+    Args:
+        html: HTML fragment
+        method: ``auto`` (shared memory, falling back to a memory-mapped
+            temporary file), ``shared-memory``, ``mmap`` or ``pickle``
+
+    Returns:
+        Handle to return from the worker instead of the fragment
+
+    Raises:
+        ValueError: If the method is unknown
+    """
+    if method not in TRANSFER_METHODS:
+        raise ValueError(f"Unknown transfer method '{method}'. Valid methods: {', '.join(TRANSFER_METHODS)}")
+    if method == 'pickle' or len(html) < TRANSFER_MIN_BYTES:
+        return Fragment.inline(html)
+
+    data = html.encode('utf-8')
+    if method in ('auto', 'shared-memory') and shared_memory is not None:
+        try:
+            block = shared_memory.SharedMemory(create=True, size=len(data))
+        except OSError:
+            if method == 'shared-memory':
+                raise
+        else:
+            block.buf[:len(data)] = data
+            block.close()
+            return Fragment('shared-memory', block.name, len(data))
+
+    fd, path = tempfile.mkstemp(prefix='md2pdf-fragment-', suffix='.html')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return Fragment('mmap', path, len(data))
+
+
+def read_fragment(fragment: Fragment) -> str:
+    """Decode one fragment straight from its buffer."""
+    if fragment.kind == 'inline':
+        return fragment.text
+    with contextlib.ExitStack() as stack:
+        return str(_open(fragment, stack), 'utf-8')
+
+
+def join_fragments(fragments: Sequence[Fragment], separator: str = '\n') -> str:
+    """
+    Join fragments into one document.
+
+    Each shared fragment is decoded once, straight from its buffer, and the
+    decoded pieces are joined once: the HTML is copied twice in all, with
+    no intermediate bytes object and nothing unpickled.
+
+    Args:
+        fragments: Fragment handles in document order
+        separator: Text placed between fragments
+
+    Returns:
+        Joined HTML
+    """
+    return separator.join([read_fragment(fragment) for fragment in fragments])
+
+
+def release_fragments(fragments: Iterable[Fragment]) -> None:
+    """Free the shared memory blocks and temporary files behind handles; called by their owner."""
+    for fragment in fragments:
+        try:
+            if fragment.kind == 'shared-memory':
+                block = shared_memory.SharedMemory(name=fragment.location)
+                block.close()
+                block.unlink()
+            elif fragment.kind == 'mmap':
+                os.unlink(fragment.location)
+        except FileNotFoundError:
+            pass
+
+
+def map_fragments(executor: Executor, worker: Callable, args: Sequence) -> List[Fragment]:
+    """
+    Run a fragment-producing worker over arguments and collect the handles in order.
+
+    If any call fails, the fragments of the calls that succeeded are released
+    before the error is raised, so nothing is left in shared memory.
+    """
+    if resource_tracker is not None and os.name == 'posix':
+        # Workers forked after this share this process's resource tracker;
+        # one of their own would unlink their blocks when they exit
+        resource_tracker.ensure_running()
+    futures = [executor.submit(worker, arg) for arg in args]
+    wait(futures)
+    try:
+        return [future.result() for future in futures]
+    except BaseException:
+        release_fragments(
+            future.result() for future in futures if not future.cancelled() and future.exception() is None
+        )
+        raise
+
+
+def _open(fragment: Fragment, stack: contextlib.ExitStack) -> memoryview:
+    """Map one shared fragment; its mapping is closed when the stack unwinds."""
+    if fragment.kind == 'shared-memory':
+        block = shared_memory.SharedMemory(name=fragment.location)
+        stack.callback(block.close)
+        view = block.buf[:fragment.size]
+    else:
+        with open(fragment.location, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        stack.callback(mapped.close)
+        view = memoryview(mapped)[:fragment.size]
+    # Views must be released before their buffer is closed
+    stack.callback(view.release)
+    return view
@@ -3,23 +3,39 @@ Utility functions for the Markdown to PDF converter.
 """
 
 import os
+import fnmatch
 import glob
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
-from .constants import MARKDOWN_EXTENSIONS, ENCODING_ATTEMPTS
-from .exceptions import FileValidationError
+from typing import FrozenSet, Iterator, List, Optional, Tuple
+from .archives import ArchiveMember, InputPath, expand_archive_pattern, is_archive, is_compressed, split_archive_pattern
+from .constants import MARKDOWN_EXTENSIONS, ENCODING_ATTEMPTS, SOURCE_DATE_EPOCH_ENV
+from .exceptions import ConversionError, FileValidationError
 from .validators import validate_margin as validate_margin_format
 
 
-def validate_input_files(file_patterns: List[str]) -> List[Path]:
+def validate_input_files(
+    file_patterns: List[str],
+    extensions: FrozenSet[str] = MARKDOWN_EXTENSIONS,
+    description: str = "a Markdown file"
+) -> List[InputPath]:
     """
     Validate and expand input file patterns to actual file paths.
     
+    A pattern may also name files inside an archive (``docs.zip!chapters/*.md``,
+    or an archive alone for all of its files with one of ``extensions``) or a
+    gzip-compressed file (``notes.md.gz``); these become ArchiveMember objects
+    read in memory (see archives.py).
+    
     Args:
         file_patterns: List of file paths or glob patterns
+        extensions: Accepted file extensions
+        description: File kind used in error messages
         
     Returns:
-        List of validated Path objects
+        List of validated Path and ArchiveMember objects
         
     Raises:
         FileNotFoundError: If no files match the patterns
@@ -28,8 +44,10 @@ def validate_input_files(file_patterns: List[str]) -> List[Path]:
     all_files = []
     
     for pattern in file_patterns:
+        if split_archive_pattern(pattern) is not None or is_archive(pattern):
+            all_files.extend(expand_archive_pattern(pattern, extensions))
         # Expand glob patterns
-        if '*' in pattern or '?' in pattern:
+        elif '*' in pattern or '?' in pattern:
             matched_files = glob.glob(pattern)
             if not matched_files:
                 raise FileNotFoundError(f"No files found matching pattern: {pattern}")
@@ -43,24 +61,64 @@ def validate_input_files(file_patterns: List[str]) -> List[Path]:
     # Convert to Path objects and validate
     validated_files = []
     for file_path in all_files:
+        if isinstance(file_path, ArchiveMember):
+            if file_path.suffix.lower() not in extensions:
+                raise FileValidationError(f"Not {description}: {file_path}")
+            validated_files.append(file_path)
+            continue
+        
         path_obj = Path(file_path)
+        compressed = is_compressed(file_path)
         if not path_obj.is_file():
             raise FileValidationError(f"Not a file: {file_path}")
-        if path_obj.suffix.lower() not in MARKDOWN_EXTENSIONS:
-            raise FileValidationError(f"Not a Markdown file: {file_path}")
+        if (Path(path_obj.stem) if compressed else path_obj).suffix.lower() not in extensions:
+            raise FileValidationError(f"Not {description}: {file_path}")
         if not os.access(path_obj, os.R_OK):
             raise FileValidationError(f"File not readable: {file_path}")
-        validated_files.append(path_obj)
+        validated_files.append(ArchiveMember(path_obj) if compressed else path_obj)
     
     return validated_files
 
 
-def validate_output_path(output_path: str) -> Path:
+def select_input_files(input_files: List[Path], patterns: List[str]) -> List[Path]:
+    """
+    Keep only the inputs named by ``patterns``, in their original order.
+    
+    A pattern matches an input by path as given, resolved path or file name,
+    and may contain glob wildcards.
+    
+    Args:
+        input_files: Validated input files
+        patterns: File names, paths or glob patterns
+        
+    Returns:
+        Selected input files
+        
+    Raises:
+        FileNotFoundError: If a pattern matches none of the inputs
+    """
+    selected = set()
+    for pattern in patterns:
+        resolved = str(Path(pattern).resolve()) if not glob.has_magic(pattern) else None
+        matches = {
+            path for path in input_files
+            if fnmatch.fnmatch(str(path), pattern) or fnmatch.fnmatch(path.name, pattern)
+            or (resolved is not None and str(path.resolve()) == resolved)
+        }
+        if not matches:
+            raise FileNotFoundError(f"No input file matches: {pattern}")
+        selected.update(matches)
+    
+    return [path for path in input_files if path in selected]
+
+
+def validate_output_path(output_path: str, suffix: str = '.pdf') -> Path:
     """
     Validate the output PDF path.
     
     Args:
         output_path: Path for the output PDF file
+        suffix: Extension the output must have
         
     Returns:
         Validated Path object
@@ -70,9 +128,9 @@ def validate_output_path(output_path: str) -> Path:
     """
     path_obj = Path(output_path)
     
-    # Ensure .pdf extension
-    if path_obj.suffix.lower() != '.pdf':
-        path_obj = path_obj.with_suffix('.pdf')
+    # Ensure the expected extension (.pdf by default)
+    if path_obj.suffix.lower() != suffix:
+        path_obj = path_obj.with_suffix(suffix)
     
     # Check if parent directory exists and is writable
     parent_dir = path_obj.parent
@@ -88,12 +146,12 @@ def validate_output_path(output_path: str) -> Path:
     return path_obj
 
 
-def read_file_content(file_path: Path) -> str:
+def read_file_content(file_path: InputPath) -> str:
     """
     Read the content of a file with proper encoding handling.
     
     Args:
-        file_path: Path to the file to read
+        file_path: Path to the file to read, or a file in an archive
         
     Returns:
         File content as string
@@ -103,12 +161,21 @@ def read_file_content(file_path: Path) -> str:
     """
     encodings = ENCODING_ATTEMPTS
     
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            continue
+    if isinstance(file_path, ArchiveMember):
+        data = file_path.read_bytes()
+        for encoding in encodings:
+            try:
+                # Newlines translated as when reading a file in text mode
+                return data.decode(encoding).replace('\r\n', '\n').replace('\r', '\n')
+            except UnicodeDecodeError:
+                continue
+    else:
+        for encoding in encodings:
+            try:
+                with open(file_path, 'r', encoding=encoding) as f:
+                    return f.read()
+            except UnicodeDecodeError:
+                continue
     
     attempted = ', '.join(encodings)
     raise FileValidationError(
@@ -116,6 +183,61 @@ def read_file_content(file_path: Path) -> str:
     )
 
 
+def read_files_ahead(file_paths: List[Path], threads: int) -> Iterator[Tuple[Path, str]]:
+    """
+    Read files in background threads while the caller processes earlier ones.
+    
+    At most ``threads * 2`` files are held in memory ahead of the consumer.
+    
+    Args:
+        file_paths: Files to read, in order
+        threads: Number of reader threads
+        
+    Yields:
+        (path, content) tuples in input order
+    """
+    if len(file_paths) <= 1:
+        for file_path in file_paths:
+            yield file_path, read_file_content(file_path)
+        return
+    
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = deque()
+        remaining = iter(file_paths)
+        
+        for file_path in remaining:
+            pending.append((file_path, executor.submit(read_file_content, file_path)))
+            if len(pending) >= threads * 2:
+                break
+        
+        while pending:
+            file_path, future = pending.popleft()
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append((next_path, executor.submit(read_file_content, next_path)))
+            yield file_path, future.result()
+
+
+def get_source_date() -> Optional[str]:
+    """
+    Read the ``SOURCE_DATE_EPOCH`` reproducible-builds timestamp.
+    
+    Returns:
+        The timestamp as a W3C date string in UTC, or None if unset
+        
+    Raises:
+        ConversionError: If the variable is set but not a Unix timestamp
+    """
+    value = os.environ.get(SOURCE_DATE_EPOCH_ENV)
+    if not value:
+        return None
+    try:
+        moment = datetime.fromtimestamp(int(value), tz=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise ConversionError(f"Invalid {SOURCE_DATE_EPOCH_ENV}: {value!r} (expected a Unix timestamp)")
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
 def parse_margin(margin_str: str) -> str:
     """
     Parse and validate margin specification.
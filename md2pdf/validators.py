@@ -2,36 +2,45 @@
 Input validation and security checks for md2pdf.
 """
 
+import html
 import os
 import re
+from html.parser import HTMLParser
 from pathlib import Path
-from .constants import VALID_CSS_UNITS, VALID_PAGE_SIZES
-from .exceptions import SecurityError, FileValidationError
+from typing import List, Optional, Tuple
+from .constants import (
+    VALID_CSS_UNITS, VALID_PAGE_SIZES, NESTING_TAGS, SANITIZE_ALLOWED_TAGS, SANITIZE_DROP_CONTENT_TAGS,
+    SANITIZE_ALLOWED_ATTRIBUTES, SANITIZE_TAG_ATTRIBUTES, SANITIZE_URL_ATTRIBUTES, SANITIZE_URL_SCHEMES
+)
+from .exceptions import SecurityError, FileValidationError, ResourceLimitError
+
+URL_SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.\-]*):')
+URL_IGNORED_CHARS_RE = re.compile(r'[\x00-\x20\x7f]+')
+UNSAFE_STYLE_RE = re.compile(r'url\s*\(|expression\s*\(|javascript:|@import|\\', re.IGNORECASE)
 
 
 def sanitize_html(content: str) -> str:
     """
-    Basic HTML sanitization to prevent XSS attacks.
+    Reduce HTML to an allowlist of tags and attributes in a single pass.
     
-    Note: This is a basic implementation. For production use,
-    consider using a dedicated library like nh3 or html-sanitizer.
+    The document is tokenized once and rebuilt from the tokens, so the cost is
+    linear in its size and text outside tags is never rewritten. Tags outside
+    the allowlist are dropped but their text kept; script, style, iframe,
+    object and similar elements are dropped with their content. Attributes
+    outside the allowlist (including every ``on*`` handler), URLs with other
+    than http(s), mailto or file schemes, and styles that could load
+    resources are removed. Entities are passed through unchanged.
     
     Args:
-        content: Raw HTML content
+        content: HTML body produced from Markdown
         
     Returns:
         Sanitized HTML content
     """
-    # For now, we'll trust the markdown converter's output
-    # since it's generated from markdown files, not user HTML input
-    # If you need stronger sanitization, consider using nh3 or html-sanitizer
-    
-    # Basic protection: escape script tags and event handlers
-    content = re.sub(r'<script[^>]*>.*?</script>', '', content, flags=re.IGNORECASE | re.DOTALL)
-    content = re.sub(r'\bon\w+\s*=\s*["\']?[^"\']*["\']?', '', content, flags=re.IGNORECASE)
-    content = re.sub(r'javascript:', '', content, flags=re.IGNORECASE)
-    
-    return content
+    sanitizer = _Sanitizer()
+    sanitizer.feed(content)
+    sanitizer.close()
+    return ''.join(sanitizer.out)
 
 
 def validate_css_file_path(css_path: str) -> Path:
@@ -148,3 +157,165 @@ def sanitize_filename(filename: str) -> str:
         filename = '_' + filename[1:]
     
     return filename
+
+
+def check_input_size(input_files: List[Path], max_bytes: Optional[int]) -> None:
+    """
+    Check the combined size of the input files against a limit.
+    
+    Args:
+        input_files: Input file paths
+        max_bytes: Maximum combined size in bytes (None disables the check)
+        
+    Raises:
+        ResourceLimitError: If the inputs are larger than allowed
+    """
+    if max_bytes is None:
+        return
+    
+    total = sum(path.stat().st_size for path in input_files)
+    if total > max_bytes:
+        raise ResourceLimitError(f"Input size {total} bytes exceeds the limit of {max_bytes} bytes")
+
+
+def check_document_structure(
+    html_content: str,
+    max_table_rows: Optional[int] = None,
+    max_nesting_depth: Optional[int] = None
+) -> None:
+    """
+    Check converted HTML for structures that are pathological to lay out.
+    
+    Args:
+        html_content: HTML produced from Markdown
+        max_table_rows: Maximum number of rows in a single table
+        max_nesting_depth: Maximum nesting of lists, blockquotes and tables
+        
+    Raises:
+        ResourceLimitError: If a limit is exceeded
+    """
+    if max_table_rows is None and max_nesting_depth is None:
+        return
+    
+    scanner = _StructureScanner(max_table_rows, max_nesting_depth)
+    scanner.feed(html_content)
+    scanner.close()
+
+
+class _StructureScanner(HTMLParser):
+    """Single-pass scanner tracking table rows and block nesting depth."""
+    
+    def __init__(self, max_table_rows: Optional[int], max_nesting_depth: Optional[int]):
+        super().__init__(convert_charrefs=False)
+        self.max_table_rows = max_table_rows
+        self.max_nesting_depth = max_nesting_depth
+        self.depth = 0
+        self.table_rows: List[int] = []
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in NESTING_TAGS:
+            self.depth += 1
+            if self.max_nesting_depth is not None and self.depth > self.max_nesting_depth:
+                raise ResourceLimitError(
+                    f"Nesting depth exceeds the limit of {self.max_nesting_depth}"
+                )
+        if tag == 'table':
+            self.table_rows.append(0)
+        elif tag == 'tr' and self.table_rows:
+            self.table_rows[-1] += 1
+            if self.max_table_rows is not None and self.table_rows[-1] > self.max_table_rows:
+                raise ResourceLimitError(
+                    f"Table has more than {self.max_table_rows} rows"
+                )
+    
+    def handle_endtag(self, tag):
+        if tag in NESTING_TAGS and self.depth:
+            self.depth -= 1
+        if tag == 'table' and self.table_rows:
+            self.table_rows.pop()
+
+
+class _Sanitizer(HTMLParser):
+    """Tokenizer that re-emits only allowlisted markup."""
+    
+    def __init__(self):
+        # Keep entities as written instead of decoding and re-encoding text
+        super().__init__(convert_charrefs=False)
+        self.out: List[str] = []
+        self.dropping: Optional[str] = None
+        self.drop_depth = 0
+    
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, '>')
+    
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, ' />')
+    
+    def handle_endtag(self, tag):
+        if self.dropping is not None:
+            if tag == self.dropping:
+                self.drop_depth -= 1
+                if not self.drop_depth:
+                    self.dropping = None
+            return
+        if tag in SANITIZE_ALLOWED_TAGS:
+            self.out.append(f'</{tag}>')
+    
+    def handle_data(self, data):
+        if self.dropping is None:
+            # Stray brackets must not combine with neighbouring text into new tags
+            self.out.append(data.replace('<', '&lt;').replace('>', '&gt;'))
+    
+    def handle_entityref(self, name):
+        if self.dropping is None:
+            self.out.append(f'&{name};')
+    
+    def handle_charref(self, name):
+        if self.dropping is None:
+            self.out.append(f'&#{name};')
+    
+    def _start(self, tag, attrs, end):
+        if self.dropping is not None:
+            if tag == self.dropping and end == '>':
+                self.drop_depth += 1
+            return
+        if tag in SANITIZE_DROP_CONTENT_TAGS:
+            if end == '>':
+                self.dropping = tag
+                self.drop_depth = 1
+            return
+        if tag not in SANITIZE_ALLOWED_TAGS:
+            return
+        
+        parts = [f'<{tag}']
+        for name, value in self._allowed_attributes(tag, attrs):
+            parts.append(f' {name}' if value is None else f' {name}="{html.escape(value)}"')
+        parts.append(end)
+        self.out.append(''.join(parts))
+    
+    @staticmethod
+    def _allowed_attributes(tag: str, attrs) -> List[Tuple[str, Optional[str]]]:
+        allowed = SANITIZE_TAG_ATTRIBUTES.get(tag, ())
+        kept = []
+        for name, value in attrs:
+            if name not in SANITIZE_ALLOWED_ATTRIBUTES and name not in allowed:
+                continue
+            if value is not None:
+                if name in SANITIZE_URL_ATTRIBUTES and not _is_safe_url(value, tag):
+                    continue
+                if name == 'style' and UNSAFE_STYLE_RE.search(value):
+                    continue
+            kept.append((name, value))
+        return kept
+
+
+def _is_safe_url(url: str, tag: str) -> bool:
+    """Whether a (decoded) URL is relative or uses an allowed scheme."""
+    # Browsers and URL parsers ignore whitespace and control characters in schemes
+    match = URL_SCHEME_RE.match(URL_IGNORED_CHARS_RE.sub('', url).lower())
+    if match is None:
+        return True
+    scheme = match.group(1)
+    if scheme == 'data':
+        return tag == 'img' and url.strip().lower().startswith('data:image/')
+    return scheme in SANITIZE_URL_SCHEMES
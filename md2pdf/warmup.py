@@ -0,0 +1,134 @@
+"""
+Warm-up routine that pays one-time start-up costs ahead of the first conversion.
+
+Intended to run while building container images so cold workers start with
+bytecode, the fontconfig cache, compiled styles and the compiled HTML template
+already in place.
+"""
+
+import compileall
+import importlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from .cache import get_cache_dir
+from .constants import CACHE_DIR_ENV
+from .logger import setup_logger
+
+# Packages whose bytecode is compiled in addition to md2pdf itself
+WARMUP_PACKAGES = [
+    'md2pdf', 'markdown', 'pygments', 'jinja2', 'bs4', 'yaml',
+    'weasyprint', 'tinycss2', 'cssselect2', 'pydyf', 'fontTools', 'PIL',
+]
+
+WARMUP_DOCUMENT = """# Warm-up
+
+A tiny document exercising **headings**, tables and code highlighting.
+
+| Column | Value |
+|--------|-------|
+| a      | 1     |
+
+```python
+print("warm")
+```
+"""
+
+
+def run_warmup(cache_dir: Optional[Path] = None, render: bool = True, verbose: bool = False) -> List[Tuple[str, float]]:
+    """
+    Run every warm-up step.
+
+    Args:
+        cache_dir: Cache directory to fill (defaults to the configured cache directory)
+        render: Whether to finish with a tiny end-to-end render
+        verbose: Enable verbose output
+
+    Returns:
+        List of (step name, seconds) in execution order
+    """
+    logger = setup_logger('md2pdf.warmup', verbose=verbose)
+
+    if cache_dir is not None:
+        # Make the choice visible to every cache consumer in this process
+        os.environ[CACHE_DIR_ENV] = str(cache_dir)
+    cache_dir = get_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    steps: List[Tuple[str, Callable[[], None]]] = [
+        ('bytecode', _compile_bytecode),
+        ('fontconfig', _prime_fontconfig),
+        ('styles', lambda: _compile_styles(cache_dir)),
+        ('template', lambda: _compile_template(cache_dir)),
+    ]
+    if render:
+        steps.append(('render', _render_sample))
+
+    timings = []
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        elapsed = time.perf_counter() - start
+        logger.debug(f"Warm-up step '{name}' took {elapsed:.2f}s")
+        timings.append((name, elapsed))
+
+    return timings
+
+
+def _compile_bytecode() -> None:
+    """Precompile bytecode for md2pdf and its heavy dependencies."""
+    for package in WARMUP_PACKAGES:
+        try:
+            module = importlib.import_module(package)
+        except Exception:
+            continue
+        for path in getattr(module, '__path__', []):
+            compileall.compile_dir(path, quiet=1)
+
+
+def _prime_fontconfig() -> None:
+    """Build the fontconfig cache so the first layout does not scan fonts."""
+    fc_cache = shutil.which('fc-cache')
+    if fc_cache:
+        subprocess.run([fc_cache], check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    # Loading WeasyPrint's font configuration initialises fontconfig itself
+    from weasyprint.text.fonts import FontConfiguration
+    FontConfiguration()
+
+
+def _compile_styles(cache_dir: Path) -> None:
+    """Compile every YAML style into the cache and load every built-in style."""
+    from .styles import get_builtin_style
+    from .yaml_styles import yaml_style_loader
+    from .constants import BUILTIN_STYLE_DESCRIPTIONS
+
+    for style_name in yaml_style_loader.list_yaml_styles():
+        yaml_style_loader.compile_style(style_name, cache_dir / "styles")
+
+    for style_name in BUILTIN_STYLE_DESCRIPTIONS:
+        get_builtin_style(style_name)
+
+
+def _compile_template(cache_dir: Path) -> None:
+    """Compile the HTML template and store its bytecode in the cache."""
+    from .converter import load_html_template
+
+    (cache_dir / "jinja").mkdir(parents=True, exist_ok=True)
+    load_html_template.cache_clear()
+    load_html_template()
+
+
+def _render_sample() -> None:
+    """Render a tiny document end to end."""
+    from .converter import MarkdownToPDFConverter
+
+    with tempfile.TemporaryDirectory(prefix='md2pdf-warmup-') as tmp:
+        source = Path(tmp) / "warmup.md"
+        source.write_text(WARMUP_DOCUMENT, encoding='utf-8')
+        MarkdownToPDFConverter().convert_files_to_pdf([source], Path(tmp) / "warmup.pdf")
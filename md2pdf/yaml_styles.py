@@ -1,17 +1,42 @@
 """
 YAML-based style system for md2pdf.
+
+``md2pdf styles compile`` flattens each YAML style into a ``<name>.compiled.css``
+bundle next to it, stamped with the hash of the YAML source. The loader uses a
+bundle that matches its YAML, then one compiled into the cache directory by
+``md2pdf warmup``, and only then parses and compiles the YAML itself.
 """
 
+import hashlib
+import os
+import re
+import threading
 import yaml
 from pathlib import Path
-from typing import Dict, Optional, Any
-from jinja2 import Template
+from typing import Dict, List, Optional, Any
+from jinja2.sandbox import SandboxedEnvironment
+from .cache import get_cache_dir
+from .constants import COMPILED_STYLE_HEADER, COMPILED_STYLE_SUFFIX
 from .exceptions import StyleError
 from .logger import setup_logger
+from .metrics import record_cache
+from .output import write_file_atomic
+
+VARIABLE_RE = re.compile(r'\$\{([^}]+)\}')
+CAMEL_CASE_RE = re.compile(r'([a-z0-9])([A-Z])')
+
+# Style templates come from YAML files, so they may only reach the values passed to them
+TEMPLATE_ENV = SandboxedEnvironment()
 
 
 class YAMLStyleLoader:
-    """Loads and processes YAML-based styles."""
+    """
+    Loads and processes YAML-based styles.
+    
+    Instances are thread-safe: the style cache is guarded by a lock, so the
+    module-level ``yaml_style_loader`` can be shared by converters running in
+    a thread pool.
+    """
     
     def __init__(self, styles_dir: Optional[Path] = None):
         """
@@ -23,6 +48,7 @@ class YAMLStyleLoader:
         self.logger = setup_logger('md2pdf.yaml_styles')
         self.styles_dir = styles_dir or (Path(__file__).parent / "styles")
         self._style_cache: Dict[str, str] = {}
+        self._cache_lock = threading.Lock()
         
     def list_yaml_styles(self) -> Dict[str, str]:
         """
@@ -51,6 +77,30 @@ class YAMLStyleLoader:
                 
         return styles
     
+    def style_path(self, style_name: str) -> Optional[Path]:
+        """
+        Path of a style's YAML file in the styles directory.
+        
+        Returns:
+            The path, or None if the name is not a plain file name or would
+            lead outside the styles directory
+        """
+        separators = [sep for sep in (os.sep, os.altsep, '/') if sep]
+        if not style_name or '..' in style_name or '\0' in style_name or any(
+            sep in style_name for sep in separators
+        ):
+            return None
+        styles_dir = self.styles_dir.resolve()
+        yaml_file = (styles_dir / f"{style_name}.yaml").resolve()
+        if yaml_file.parent != styles_dir:
+            return None
+        return yaml_file
+    
+    def has_style(self, style_name: str) -> bool:
+        """Check whether a YAML style file exists without parsing it."""
+        yaml_file = self.style_path(style_name)
+        return yaml_file is not None and yaml_file.is_file()
+    
     def load_yaml_style(self, style_name: str) -> str:
         """
         Load a YAML style and convert it to CSS.
@@ -65,22 +115,31 @@ class YAMLStyleLoader:
             StyleError: If style cannot be loaded or processed
         """
         # Check cache first
-        if style_name in self._style_cache:
-            return self._style_cache[style_name]
+        with self._cache_lock:
+            cached = self._style_cache.get(style_name)
+        record_cache('yaml_style', cached is not None)
+        if cached is not None:
+            return cached
             
-        yaml_file = self.styles_dir / f"{style_name}.yaml"
+        yaml_file = self.style_path(style_name)
         
+        if yaml_file is None:
+            raise StyleError(f"Invalid style name: {style_name}")
         if not yaml_file.exists():
             raise StyleError(f"YAML style file not found: {yaml_file}")
             
         try:
-            with open(yaml_file, 'r', encoding='utf-8') as f:
-                style_data = yaml.safe_load(f)
-                
-            css_content = self._yaml_to_css(style_data, style_name)
+            source = yaml_file.read_bytes()
+            css_content = self._load_compiled_style(style_name, source)
+            record_cache('compiled_style', css_content is not None)
             
-            # Cache the result
-            self._style_cache[style_name] = css_content
+            if css_content is None:
+                style_data = yaml.safe_load(source.decode('utf-8'))
+                css_content = self._yaml_to_css(style_data, style_name)
+            
+            # Cache the result; a concurrent load of the same style keeps the first copy
+            with self._cache_lock:
+                css_content = self._style_cache.setdefault(style_name, css_content)
             
             self.logger.debug(f"Loaded YAML style: {style_name}")
             return css_content
@@ -88,6 +147,75 @@ class YAMLStyleLoader:
         except Exception as e:
             raise StyleError(f"Failed to load YAML style '{style_name}': {e}")
     
+    def compile_style(self, style_name: str, output_dir: Optional[Path] = None) -> Path:
+        """
+        Compile a YAML style to a CSS bundle stamped with its source hash.
+        
+        Args:
+            style_name: Name of the style (without .yaml extension)
+            output_dir: Directory to write the bundle to (defaults to next to the YAML)
+            
+        Returns:
+            Path of the compiled CSS file
+            
+        Raises:
+            StyleError: If the style cannot be loaded or written
+        """
+        yaml_file = self.style_path(style_name)
+        output_dir = output_dir or self.styles_dir
+        
+        if yaml_file is None:
+            raise StyleError(f"Invalid style name: {style_name}")
+        
+        try:
+            source = yaml_file.read_bytes()
+            css_content = self._yaml_to_css(yaml.safe_load(source.decode('utf-8')), style_name)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            output_path = output_dir / f"{style_name}{COMPILED_STYLE_SUFFIX}"
+            bundle = COMPILED_STYLE_HEADER.format(self._source_hash(source)) + css_content
+            # Atomic and skipped when unchanged, so running conversions never see a partial bundle
+            write_file_atomic(output_path, bundle.encode('utf-8'), skip_identical=True, fsync='none')
+            return output_path
+        except StyleError:
+            raise
+        except Exception as e:
+            raise StyleError(f"Failed to compile YAML style '{style_name}': {e}")
+    
+    def compile_styles(self) -> List[Path]:
+        """
+        Compile every YAML style of this loader's directory next to its YAML.
+        
+        Returns:
+            Paths of the compiled CSS files
+            
+        Raises:
+            StyleError: If a style cannot be loaded or written
+        """
+        return [self.compile_style(yaml_file.stem) for yaml_file in sorted(self.styles_dir.glob("*.yaml"))]
+    
+    def _load_compiled_style(self, style_name: str, source: bytes) -> Optional[str]:
+        """Return precompiled CSS for a style if it matches the YAML source."""
+        header = COMPILED_STYLE_HEADER.format(self._source_hash(source))
+        bundle_name = f"{style_name}{COMPILED_STYLE_SUFFIX}"
+        
+        # A bundle shipped next to the YAML wins over one compiled into the cache
+        for compiled in (self.styles_dir / bundle_name, get_cache_dir() / "styles" / bundle_name):
+            try:
+                with open(compiled, 'r', encoding='utf-8') as f:
+                    if f.readline() != header:
+                        self.logger.debug(f"Ignoring stale compiled YAML style: {compiled}")
+                        continue
+                    self.logger.debug(f"Using compiled YAML style: {compiled}")
+                    return f.read()
+            except OSError:
+                continue
+        return None
+    
+    @staticmethod
+    def _source_hash(source: bytes) -> str:
+        """Hash of a style's YAML source, used to detect stale compiled CSS."""
+        return hashlib.sha256(source).hexdigest()
+    
     def _yaml_to_css(self, style_data: Dict[str, Any], style_name: str) -> str:
         """
         Convert YAML style definition to CSS.
@@ -108,9 +236,9 @@ class YAMLStyleLoader:
         variables = style_data.get('variables', {})
         selectors = style_data.get('selectors', {})
         
-        # If there's a template, use Jinja2 to render it
+        # If there's a template, render it with Jinja2 in a sandbox
         if css_template:
-            template = Template(css_template)
+            template = TEMPLATE_ENV.from_string(css_template)
             return template.render(
                 variables=variables,
                 selectors=selectors,
@@ -128,10 +256,7 @@ class YAMLStyleLoader:
             
             # Also add html/body background as fallback for better compatibility
             if 'backgroundColor' in selectors['page']:
-                bg_color = selectors['page']['backgroundColor']
-                # Substitute variables in background color
-                for var_name, var_value in variables.items():
-                    bg_color = bg_color.replace(f"${{{var_name}}}", str(var_value))
+                bg_color = self._substitute_variables(str(selectors['page']['backgroundColor']), variables)
                 css_parts.append(f"html, body {{\n    background-color: {bg_color};\n}}\n")
         
         # Process other selectors
@@ -165,20 +290,25 @@ class YAMLStyleLoader:
             # Convert camelCase to kebab-case
             css_property = self._camel_to_kebab(property_name)
             
-            # Substitute variables
-            css_value = str(value)
-            for var_name, var_value in variables.items():
-                css_value = css_value.replace(f"${{{var_name}}}", str(var_value))
-                
+            css_value = self._substitute_variables(str(value), variables)
             css_lines.append(f"    {css_property}: {css_value};")
             
         return '\n'.join(css_lines)
     
+    @staticmethod
+    def _substitute_variables(value: str, variables: Dict[str, Any]) -> str:
+        """Replace every ``${name}`` in one pass; unknown names are left as written."""
+        if '${' not in value:
+            return value
+        return VARIABLE_RE.sub(
+            lambda match: str(variables[match.group(1)]) if match.group(1) in variables else match.group(0),
+            value
+        )
+    
     @staticmethod
     def _camel_to_kebab(camel_str: str) -> str:
         """Convert camelCase to kebab-case."""
-        import re
-        return re.sub(r'([a-z0-9])([A-Z])', r'\1-\2', camel_str).lower()
+        return CAMEL_CASE_RE.sub(r'\1-\2', camel_str).lower()
 
 
 # Global YAML style loader instance
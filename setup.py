@@ -22,7 +22,7 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     package_data={
-        '': ['templates/*.html', 'styles/*.yaml', 'styles/*.md'],
+        '': ['templates/*.html', 'styles/*.yaml', 'styles/*.compiled.css', 'styles/*.md'],
     },
     install_requires=[
         "click>=8.3.1",
@@ -32,6 +32,8 @@ setup(
         "jinja2>=3.1.6",
         "beautifulsoup4>=4.14.3",
         "PyYAML>=6.0.3",
+        "tinycss2>=1.5.0",
+        "tomli>=2.0.1; python_version < '3.11'",
     ],
     entry_points={
         'console_scripts': [
@@ -0,0 +1,199 @@
+"""
+Tests that split conversion (--split) matches a single-pass conversion.
+
+Chunks are converted separately, so the blank line Markdown leaves after a
+raw HTML block at the end of a chunk is lost; outputs are compared up to
+blank lines between blocks.
+"""
+
+import re
+
+import markdown
+import pytest
+
+from md2pdf.chunking import _split_markdown, convert_markdown_parallel, join_html_chunks, split_markdown
+from md2pdf.constants import MARKDOWN_EXTENSION_CONFIGS, MARKDOWN_EXTENSIONS_LIST
+
+
+def single_pass(content):
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS_LIST, extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+    return md.convert(content)
+
+
+def split_pass(content, max_chunks=8):
+    chunks, footnote_order = _split_markdown(content, max_chunks)
+    assert len(chunks) > 1, "the document should be split"
+    return join_html_chunks([single_pass(chunk) for chunk in chunks], footnote_order)
+
+
+def normalize(html):
+    return re.sub(r'>\n{2,}<', '>\n<', html)
+
+
+FOOTNOTES = """# One
+
+Text with a note[^a] and another[^b].
+
+# Two
+
+The first note again[^a] and a third[^c].
+
+[^a]: First note.
+[^b]: Second note,
+    spanning two lines.
+
+# Three
+
+Last section[^c].
+
+[^c]: Third note.
+[^unused]: Listed although never referenced.
+"""
+
+FOOTNOTE_ORDER = """# One
+
+See[^b] and then[^a].
+
+[^a]: Defined first, referenced second.
+[^b]: Defined second, referenced first.
+
+# Two
+
+Once more[^a].
+"""
+
+TOC = """[TOC]
+
+# One
+
+## Details
+
+# Two
+"""
+
+REFERENCE_LINKS = """# One
+
+See [the guide][guide] and [docs].
+
+# Two
+
+Again [the guide][guide], and *[HTML] as an abbreviation: HTML.
+
+[guide]: https://example.com/guide "Guide"
+[docs]: https://example.com/docs
+*[HTML]: Hyper Text Markup Language
+
+# Three
+
+Final [docs] link.
+"""
+
+DUPLICATE_IDS = """# Overview
+
+## Setup
+
+# Overview
+
+## Setup
+
+Text
+
+# Overview
+
+## Setup
+"""
+
+RAW_HTML = """# One
+
+<div class="note">
+
+# inside the div
+
+[not-a-def]: https://example.com
+
+</div>
+
+<!--
+# inside a comment
+-->
+
+<section>
+<div>
+
+# nested
+
+</div>
+</section>
+
+# Two
+
+<table>
+<tr><td>
+
+# cell
+
+</td></tr>
+</table>
+
+# Three
+
+```html
+<p>
+```
+
+# Four
+
+Text.
+"""
+
+FENCED = """# One
+
+```markdown
+# not a heading
+[ref]: https://example.com
+```
+
+# Two
+
+~~~
+# also not a heading
+~~~
+"""
+
+
+@pytest.mark.parametrize('content', [FOOTNOTES, FOOTNOTE_ORDER, REFERENCE_LINKS, DUPLICATE_IDS, RAW_HTML, FENCED], ids=[
+    'footnotes', 'footnote-order', 'reference-links', 'duplicate-ids', 'raw-html', 'fenced-code'
+])
+def test_split_matches_single_pass(content):
+    assert normalize(split_pass(content)) == normalize(single_pass(content))
+
+
+def test_raw_html_blocks_are_not_cut():
+    for chunk in split_markdown(RAW_HTML, 8):
+        assert chunk.count('<div') == chunk.count('</div>')
+        assert chunk.count('<table>') == chunk.count('</table>')
+        assert chunk.count('<!--') == chunk.count('-->')
+
+
+def test_parallel_conversion_matches_single_pass():
+    content = '\n'.join([FOOTNOTES, REFERENCE_LINKS, DUPLICATE_IDS, RAW_HTML])
+    html = convert_markdown_parallel(content, MARKDOWN_EXTENSIONS_LIST, MARKDOWN_EXTENSION_CONFIGS, jobs=2)
+    assert normalize(html) == normalize(single_pass(content))
+
+
+def test_footnotes_numbered_by_reference_without_definition_order():
+    configs = {
+        **MARKDOWN_EXTENSION_CONFIGS,
+        'markdown.extensions.extra': {'footnotes': {'USE_DEFINITION_ORDER': False}}
+    }
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS_LIST, extension_configs=configs)
+    expected = md.convert(FOOTNOTE_ORDER)
+    assert '<a class="footnote-ref" href="#fn:b">1</a>' in expected
+    html = convert_markdown_parallel(FOOTNOTE_ORDER, MARKDOWN_EXTENSIONS_LIST, configs, jobs=2)
+    assert normalize(html) == normalize(expected)
+
+
+def test_toc_marker_converts_in_a_single_pass():
+    html = convert_markdown_parallel(TOC, MARKDOWN_EXTENSIONS_LIST, MARKDOWN_EXTENSION_CONFIGS, jobs=2)
+    assert '<a href="#details">Details</a>' in html
+    assert html == single_pass(TOC)
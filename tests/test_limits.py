@@ -0,0 +1,30 @@
+"""
+Tests for conversions run in a resource-limited child process.
+"""
+
+import pytest
+
+from md2pdf.limits import ResourceLimits
+from md2pdf.metrics import MetricsCollector
+
+try:
+    from md2pdf.converter import MarkdownToPDFConverter
+except (ImportError, OSError):  # WeasyPrint or its system libraries are missing
+    pytest.skip("WeasyPrint is not available", allow_module_level=True)
+
+
+def observations(metrics, name):
+    return sum(state[-1] for (family, _), state in metrics.snapshot()['histograms'].items() if family == name)
+
+
+def test_limited_conversions_are_counted_once(tmp_path):
+    source = tmp_path / 'doc.md'
+    source.write_text('# Title\n\nSome text.\n', encoding='utf-8')
+    metrics = MetricsCollector()
+    converter = MarkdownToPDFConverter(metrics=metrics)
+
+    for run in range(1, 4):
+        converter.convert_files_to_pdf([source], tmp_path / 'doc.pdf', limits=ResourceLimits(timeout=60))
+        assert observations(metrics, 'md2pdf_pdf_pages') == run
+        assert observations(metrics, 'md2pdf_conversion_duration_seconds') == run
+        assert metrics.snapshot()['counters'][('md2pdf_conversions', (('result', 'success'),))] == run
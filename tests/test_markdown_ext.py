@@ -0,0 +1,36 @@
+"""
+Tests for the code language guessing extension.
+"""
+
+from collections import OrderedDict
+
+import pytest
+
+from md2pdf import markdown_ext
+from md2pdf.constants import CODE_LANG_MEMO_FILE
+
+
+@pytest.fixture
+def memo(tmp_path, monkeypatch):
+    """A small, empty memo persisted in a temporary cache directory."""
+    monkeypatch.setenv('MD2PDF_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(markdown_ext, '_memo', OrderedDict())
+    monkeypatch.setattr(markdown_ext, '_memo_loaded', False)
+    monkeypatch.setattr(markdown_ext, '_memo_lines', 0)
+    monkeypatch.setattr(markdown_ext, 'CODE_LANG_MEMO_ENTRIES', 4)
+    monkeypatch.setattr(markdown_ext, 'CODE_LANG_MEMO_COMPACT_FACTOR', 2)
+    monkeypatch.setattr(markdown_ext, '_pygments_language', lambda code: 'python')
+    return tmp_path / CODE_LANG_MEMO_FILE
+
+
+def test_memo_file_is_compacted_to_the_live_entries(memo):
+    for index in range(50):
+        assert markdown_ext.guess_language(f"print({index})", 'memoized') == 'python'
+        assert len(memo.read_text(encoding='utf-8').splitlines()) <= 2 * 4
+
+    # A new process starts from the file: the most recent guesses are there
+    markdown_ext._memo.clear()
+    markdown_ext._memo_loaded = False
+    markdown_ext._memo_lines = 0
+    markdown_ext._pygments_language = lambda code: pytest.fail("guess should come from the memo file")
+    assert markdown_ext.guess_language("print(49)", 'memoized') == 'python'
@@ -0,0 +1,52 @@
+"""
+Tests for the metrics text formats.
+"""
+
+import pytest
+
+from md2pdf.metrics import MetricsCollector
+
+
+@pytest.fixture
+def metrics():
+    collector = MetricsCollector()
+    collector.inc('md2pdf_conversions', result='success')
+    collector.inc('md2pdf_conversion_errors', error='StyleError')
+    collector.observe('md2pdf_pdf_pages', 3)
+    return collector
+
+
+def test_prometheus_format_declares_counters_by_sample_name(metrics):
+    text = metrics.render('prometheus')
+    assert '# TYPE md2pdf_conversions_total counter' in text
+    assert 'md2pdf_conversions_total{result="success"} 1' in text
+    assert '# TYPE md2pdf_pdf_pages histogram' in text
+    assert '# EOF' not in text
+
+
+def test_openmetrics_format_declares_counter_families_without_suffix(metrics):
+    text = metrics.render('openmetrics')
+    assert '# TYPE md2pdf_conversions counter' in text
+    assert 'md2pdf_conversions_total{result="success"} 1' in text
+    assert text.endswith('# EOF\n')
+
+
+def test_unknown_format_is_rejected(metrics):
+    with pytest.raises(ValueError):
+        metrics.render('json')
+
+
+def test_formats_parse_with_prometheus_client(metrics):
+    parser = pytest.importorskip('prometheus_client.parser')
+    openmetrics_parser = pytest.importorskip('prometheus_client.openmetrics.parser')
+
+    families = {family.name: family for family in parser.text_string_to_metric_families(metrics.render('prometheus'))}
+    assert families['md2pdf_conversions'].type == 'counter'
+    assert families['md2pdf_pdf_pages'].type == 'histogram'
+
+    families = {
+        family.name: family
+        for family in openmetrics_parser.text_string_to_metric_families(metrics.render('openmetrics'))
+    }
+    assert families['md2pdf_conversions'].type == 'counter'
+    assert [sample.value for sample in families['md2pdf_conversions'].samples] == [1.0]
@@ -0,0 +1,47 @@
+"""
+Tests for splitting long tables (--split-tables).
+"""
+
+import re
+
+from md2pdf.postprocess import split_long_tables
+
+
+def table(rows, before='', after=''):
+    body = '\n'.join(f'<tr><td>{i}</td></tr>' for i in range(rows))
+    return f'<table>\n{before}<thead>\n<tr><th>N</th></tr>\n</thead>\n<tbody>\n{body}\n</tbody>{after}\n</table>'
+
+
+def cells(html):
+    return re.findall(r'<td>(\d+)</td>', html)
+
+
+def test_long_table_is_split_with_repeated_header():
+    html = split_long_tables(table(5), 2)
+    assert html.count('<table') == 3
+    assert html.count('<thead>') == 3
+    assert cells(html) == [str(i) for i in range(5)]
+
+
+def test_short_table_is_untouched():
+    source = table(2)
+    assert split_long_tables(source, 2) == source
+
+
+def test_caption_goes_on_the_first_piece_and_tfoot_on_the_last():
+    html = split_long_tables(
+        table(5, before='<caption>Numbers</caption>\n<colgroup><col class="n"></colgroup>\n',
+              after='\n<tfoot><tr><td>Total</td></tr></tfoot>'),
+        2
+    )
+    pieces = re.findall(r'<table.*?</table>', html, re.DOTALL)
+    assert len(pieces) == 3
+    assert [piece.count('<caption>Numbers</caption>') for piece in pieces] == [1, 0, 0]
+    assert [piece.count('<tfoot>') for piece in pieces] == [0, 0, 1]
+    assert all('<col class="n">' in piece for piece in pieces)
+    assert cells(html) == [str(i) for i in range(5)]
+
+
+def test_table_with_several_bodies_is_left_whole():
+    source = table(5, after='\n<tbody>\n<tr><td>extra</td></tr>\n</tbody>')
+    assert split_long_tables(source, 2) == source
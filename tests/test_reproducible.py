@@ -0,0 +1,56 @@
+"""
+Tests for reproducible (byte-identical) PDF output.
+"""
+
+import pytest
+
+from md2pdf.constants import SOURCE_DATE_EPOCH_ENV
+from md2pdf.exceptions import ConversionError
+from md2pdf.utils import get_source_date
+
+
+@pytest.fixture
+def converter():
+    try:
+        from md2pdf.converter import MarkdownToPDFConverter
+    except (ImportError, OSError):  # WeasyPrint or its system libraries are missing
+        pytest.skip("WeasyPrint is not available")
+    return MarkdownToPDFConverter()
+
+
+def test_source_date_from_epoch(monkeypatch):
+    monkeypatch.setenv(SOURCE_DATE_EPOCH_ENV, '1700000000')
+    assert get_source_date() == '2023-11-14T22:13:20Z'
+
+
+def test_source_date_unset(monkeypatch):
+    monkeypatch.delenv(SOURCE_DATE_EPOCH_ENV, raising=False)
+    assert get_source_date() is None
+
+
+def test_source_date_invalid(monkeypatch):
+    monkeypatch.setenv(SOURCE_DATE_EPOCH_ENV, 'yesterday')
+    with pytest.raises(ConversionError):
+        get_source_date()
+
+
+def test_reproducible_conversions_are_byte_identical(converter, tmp_path, monkeypatch):
+    monkeypatch.setenv(SOURCE_DATE_EPOCH_ENV, '1700000000')
+    source = tmp_path / 'doc.md'
+    source.write_text('# Title\n\nSome *text* and a [link](https://example.com).\n', encoding='utf-8')
+
+    first, second = tmp_path / 'first.pdf', tmp_path / 'second.pdf'
+    converter.convert_files_to_pdf([source], first, reproducible=True)
+    converter.convert_files_to_pdf([source], second, reproducible=True)
+
+    assert first.read_bytes() == second.read_bytes()
+
+
+def test_reproducible_conversion_rejects_invalid_source_date(converter, tmp_path, monkeypatch):
+    monkeypatch.setenv(SOURCE_DATE_EPOCH_ENV, 'yesterday')
+    source = tmp_path / 'doc.md'
+    source.write_text('# Title\n', encoding='utf-8')
+
+    with pytest.raises(ConversionError):
+        converter.convert_files_to_pdf([source], tmp_path / 'doc.pdf', reproducible=True)
+    assert not (tmp_path / 'doc.pdf').exists()
@@ -0,0 +1,101 @@
+"""
+Tests for the allowlist HTML sanitizer.
+"""
+
+import re
+
+import pytest
+
+from md2pdf.validators import sanitize_html
+
+
+@pytest.mark.parametrize('markup', [
+    '<img src="chart.png" onerror="alert(1)">',
+    '<p onclick="alert(1)">text</p>',
+    '<a href="https://example.com" onmouseover="alert(1)">link</a>',
+    '<div ONLOAD="alert(1)">text</div>',
+    '<img src="chart.png" onerror=alert(1) />',
+])
+def test_event_handlers_are_removed(markup):
+    cleaned = sanitize_html(markup)
+    assert 'alert' not in cleaned
+    assert not re.search(r'\son\w+=', cleaned, re.IGNORECASE)
+
+
+@pytest.mark.parametrize('url', [
+    'javascript:alert(1)',
+    'JavaScript:alert(1)',
+    ' javascript:alert(1)',
+    'java\tscript:alert(1)',
+    '&#106;avascript:alert(1)',
+    '&#x6A;avascript:alert(1)',
+    'javascript&colon;alert(1)',
+    'jav&#x09;ascript:alert(1)',
+    'vbscript:msgbox(1)',
+    'data:text/html;base64,PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg==',
+])
+def test_unsafe_urls_are_removed(url):
+    cleaned = sanitize_html(f'<a href="{url}">link</a><img src="{url}">')
+    assert 'href' not in cleaned
+    assert 'src' not in cleaned
+    assert 'link' in cleaned
+
+
+@pytest.mark.parametrize('url', [
+    'https://example.com/page',
+    'mailto:docs@example.com',
+    'images/chart.png',
+    '#section-2',
+])
+def test_safe_urls_are_kept(url):
+    assert f'href="{url}"' in sanitize_html(f'<a href="{url}">link</a>')
+
+
+def test_data_images_are_kept_only_on_img():
+    url = 'data:image/png;base64,iVBORw0KGgo='
+    assert f'src="{url}"' in sanitize_html(f'<img src="{url}">')
+    assert 'href' not in sanitize_html(f'<a href="{url}">link</a>')
+
+
+@pytest.mark.parametrize('tag', ['script', 'style', 'iframe', 'object', 'noscript', 'template', 'svg', 'math'])
+def test_dropped_tags_lose_their_content(tag):
+    cleaned = sanitize_html(f'<p>before</p><{tag} id="x"><b>secret</b> secret</{tag}><p>after</p>')
+    assert cleaned == '<p>before</p><p>after</p>'
+
+
+@pytest.mark.parametrize('tag', ['iframe', 'object', 'svg', 'math'])
+def test_nested_dropped_tags_are_dropped_whole(tag):
+    cleaned = sanitize_html(f'<{tag}><{tag}>secret</{tag}> secret</{tag}><p>after</p>')
+    assert cleaned == '<p>after</p>'
+
+
+def test_svg_scripts_and_links_are_dropped():
+    cleaned = sanitize_html(
+        '<svg><a xlink:href="javascript:alert(1)"><text>click</text></a><script>alert(2)</script></svg>ok'
+    )
+    assert cleaned == 'ok'
+
+
+def test_unknown_tags_keep_their_text():
+    assert sanitize_html('<p><blink>visible</blink></p>') == '<p>visible</p>'
+
+
+@pytest.mark.parametrize('tag', ['section', 'article', 'header', 'footer', 'nav', 'aside', 'main'])
+def test_structural_tags_are_kept(tag):
+    markup = f'<{tag} class="box"><p>text</p></{tag}>'
+    assert sanitize_html(markup) == markup
+
+
+def test_styles_that_load_resources_are_removed():
+    cleaned = sanitize_html('<p style="background: url(https://example.com/x.png)">a</p><p style="color: red">b</p>')
+    assert cleaned == '<p>a</p><p style="color: red">b</p>'
+
+
+@pytest.mark.parametrize('prose', [
+    '<p>Set onload=true and onerror="retry" in the config file.</p>',
+    '<p>The <code>onclick=handler</code> attribute is not recommended.</p>',
+    '<pre><code>&lt;img src=x onerror=alert(1)&gt;</code></pre>',
+    '<p>Tom &amp; Jerry &lt;3 javascript:void(0)</p>',
+])
+def test_prose_is_left_untouched(prose):
+    assert sanitize_html(prose) == prose
@@ -0,0 +1,72 @@
+"""
+Tests for the spool-directory job queue.
+"""
+
+import json
+import threading
+
+from md2pdf.spool import SpoolWorker, get_job_status, submit_job
+
+
+def render_with(content, started=None, release=None):
+    """Stand-in for SpoolWorker._render that writes ``content`` as the job's PDF."""
+    def render(job_dir, job):
+        if started is not None:
+            started.set()
+            release.wait(10)
+        (job_dir / job['output']).write_bytes(content)
+    return render
+
+
+def test_job_is_rendered_and_finished(tmp_path):
+    source = tmp_path / 'doc.md'
+    source.write_text('# Doc\n', encoding='utf-8')
+    spool = tmp_path / 'spool'
+    job_id = submit_job(spool, [source])
+
+    worker = SpoolWorker(spool)
+    worker._render = render_with(b'pdf')
+    assert worker.run(once=True) == 1
+
+    assert get_job_status(spool, job_id)['state'] == 'done'
+    assert (spool / 'done' / job_id / 'output.pdf').read_bytes() == b'pdf'
+    assert not list((spool / 'claimed').iterdir())
+
+
+def test_expired_worker_cannot_overwrite_or_finish_a_reclaimed_job(tmp_path):
+    source = tmp_path / 'doc.md'
+    source.write_text('# Doc\n', encoding='utf-8')
+    spool = tmp_path / 'spool'
+    job_id = submit_job(spool, [source])
+
+    started, release = threading.Event(), threading.Event()
+    slow = SpoolWorker(spool, lease_timeout=60)
+    slow.worker_id = 'slow'
+    slow._render = render_with(b'slow', started, release)
+    # Every lease counts as expired for the second worker
+    fast = SpoolWorker(spool, lease_timeout=0)
+    fast.worker_id = 'fast'
+    fast._render = render_with(b'fast')
+
+    slow_dir = slow.claim_next()
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault('slow', slow.process(slow_dir)))
+    thread.start()
+    try:
+        assert started.wait(10)
+        assert fast.reclaim_expired() == [job_id]
+        fast_dir = fast.claim_next()
+        assert fast_dir is not None and fast_dir != slow_dir
+        assert get_job_status(spool, job_id)['state'] == 'claimed'
+        assert fast.process(fast_dir)
+    finally:
+        release.set()
+        thread.join(10)
+
+    assert results['slow'] is False
+    done = spool / 'done' / job_id
+    assert (done / 'output.pdf').read_bytes() == b'fast'
+    assert json.loads((done / 'status.json').read_text(encoding='utf-8'))['worker'] == 'fast'
+    assert not (spool / 'failed' / job_id).exists()
+    assert not list((spool / 'claimed').iterdir())
+    assert not list((spool / 'tmp').iterdir())
@@ -0,0 +1,20 @@
+"""
+Tests for handing HTML fragments between processes.
+"""
+
+import pytest
+
+from md2pdf.constants import TRANSFER_MIN_BYTES
+from md2pdf.transfer import export_fragment, join_fragments, read_fragment, release_fragments
+
+
+@pytest.mark.parametrize('method', ['auto', 'mmap', 'pickle'])
+def test_fragments_round_trip_and_join(method):
+    large = '<p>été ☃</p>\n' * (TRANSFER_MIN_BYTES // 10)
+    texts = [large, '<p>small</p>', large.upper()]
+    fragments = [export_fragment(text, method) for text in texts]
+    try:
+        assert [read_fragment(fragment) for fragment in fragments] == texts
+        assert join_fragments(fragments, '\n<hr>\n') == '\n<hr>\n'.join(texts)
+    finally:
+        release_fragments(fragments)